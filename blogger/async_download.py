@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Asyncio downloader for blog post pages.
+
+An alternative to the thread pool in download_posts.py for downloading
+large numbers of pages. All requests are made from a single event loop
+using aiohttp, so thousands of URLs can be in flight without a thread
+each. A concurrency limit bounds the number of downloads in progress
+overall and a semaphore for each host bounds those to any one server,
+with the same per-host rate limit as the threaded downloader.
+
+Where posts are saved and the progress messages are shared with
+download_posts.py through post_download.py, so both produce the same
+files.
+
+Requires the optional aiohttp dependency (uv sync --extra async).
+"""
+
+import asyncio
+import contextlib
+import time
+from urllib.parse import urlparse
+
+from http_session import DEFAULT_USER_AGENT, DEFAULT_RETRIES, DEFAULT_BACKOFF_FACTOR, RETRY_STATUS_CODES
+from post_download import prepare_post_download, save_post_download, check_journal, record_download
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_PER_HOST = 8
+REQUEST_TIMEOUT = 30
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket rate limiter for coroutines.
+
+    Tokens are added at `rate` per second up to `capacity`. Each call to
+    acquire() takes one token, waiting until one is available. Waiters are
+    served in turn.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Take a token, sleeping until one is available."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncHostLimiter:
+    """
+    Limits the number of requests in flight to each host, and the rate at
+    which they are made, so that requests to one server do not hold up
+    requests to another.
+    """
+
+    def __init__(self, per_host, rate=0, burst=1):
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.semaphores = {}
+        self.buckets = {}
+
+    @contextlib.asynccontextmanager
+    async def limit(self, url):
+        """Wait until a request to the host of `url` is permitted."""
+        host = urlparse(url).netloc
+
+        semaphore = self.semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.semaphores[host] = asyncio.Semaphore(self.per_host)
+
+        async with semaphore:
+            if self.rate > 0:
+                bucket = self.buckets.get(host)
+                if bucket is None:
+                    bucket = self.buckets[host] = AsyncTokenBucket(self.rate, self.burst)
+                await bucket.acquire()
+
+            yield
+
+
+def get_retry_delay(response, attempt, backoff_factor):
+    """
+    Get how long to wait before retrying a request, honouring a
+    Retry-After header given in seconds.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return int(retry_after)
+    return backoff_factor * (2 ** attempt)
+
+
+async def fetch_webpage_if_modified(session, url, cache_entry, messages, info=None,
+                                    retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Download webpage content from URL using a conditional GET, the asyncio
+    equivalent of download_posts.download_webpage_if_modified().
+
+    Transient failures are retried with exponential backoff. Errors are
+    added to messages rather than printed, so that output from concurrent
+    downloads does not interleave.
+
+    Returns tuple (status, content, cache_entry) where status is one of
+    'modified', 'not_modified' or 'error'. If info is a dictionary, the
+    'status_code', 'bytes' and 'attempts' of the download are added to it
+    where known.
+    """
+    if info is None:
+        info = {}
+
+    headers = {}
+    if cache_entry:
+        if cache_entry.get('etag'):
+            headers['If-None-Match'] = cache_entry['etag']
+        if cache_entry.get('last_modified'):
+            headers['If-Modified-Since'] = cache_entry['last_modified']
+
+    for attempt in range(retries + 1):
+        response = None
+        info['attempts'] = attempt + 1
+
+        try:
+            async with session.get(url, headers=headers) as response:
+                info['status_code'] = response.status
+
+                if response.status not in RETRY_STATUS_CODES or attempt == retries:
+                    if response.status == 304:
+                        return 'not_modified', None, cache_entry
+
+                    if response.status >= 400:
+                        messages.append(f"  Error: HTTP {response.status} for {url}")
+                        return 'error', None, None
+
+                    new_cache_entry = {
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                    }
+
+                    content = await response.read()
+                    info['bytes'] = len(content)
+
+                    # Try to decode using the response charset, fallback to latin-1 if that fails
+                    try:
+                        return 'modified', await response.text(), new_cache_entry
+                    except UnicodeDecodeError:
+                        return 'modified', content.decode('latin-1'), new_cache_entry
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            info.pop('status_code', None)
+            if attempt == retries:
+                messages.append(f"  Error: Network error for {url}: {e!r}")
+                return 'error', None, None
+
+        await asyncio.sleep(get_retry_delay(response, attempt, backoff_factor))
+
+
+async def download_post_async(session, post, posts_dir, host_limiter, refresh=False, retries=DEFAULT_RETRIES,
+                              journal=None):
+    """
+    Download a single post entry from the metadata, the asyncio equivalent
+    of download_posts.download_post().
+
+    Returns a tuple (status, messages).
+    """
+    resumed = check_journal(post, journal, posts_dir, refresh)
+    if resumed:
+        return resumed
+
+    status, messages, target = prepare_post_download(post, posts_dir, refresh)
+    if status is not None:
+        record_download(journal, post, status)
+        return status, messages
+
+    async with host_limiter.limit(target['url']):
+        messages.append("  Downloading...")
+        info = {}
+        start = time.monotonic()
+        status, html_content, cache_entry = await fetch_webpage_if_modified(
+            session, target['url'], target['cache_entry'], messages, info, retries)
+        duration = time.monotonic() - start
+
+    status = save_post_download(target, status, html_content, cache_entry, messages)
+    record_download(journal, post, status, info, duration)
+    return status, messages
+
+
+async def download_all_posts_async(posts_data, posts_dir, concurrency=DEFAULT_CONCURRENCY,
+                                   per_host=DEFAULT_PER_HOST, rate=2.0, burst=1, refresh=False,
+                                   retries=DEFAULT_RETRIES, journal=None):
+    """
+    Download all posts from the metadata concurrently on one event loop,
+    with at most `concurrency` downloads in progress and `per_host` of
+    them to each host, and requests to each host limited to `rate` per
+    second. Posts already dealt with according to the journal are skipped.
+
+    Returns a dictionary of statistics with counts for 'downloaded',
+    'not_modified', 'skipped', 'resumed' and 'error'.
+    """
+    stats = {'downloaded': 0, 'not_modified': 0, 'skipped': 0, 'resumed': 0, 'error': 0}
+    total = len(posts_data)
+
+    host_limiter = AsyncHostLimiter(per_host, rate, burst)
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency), limit_per_host=max(1, per_host))
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async def download(i, post):
+        async with limit:
+            return i, await download_post_async(session, post, posts_dir, host_limiter, refresh, retries, journal)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={'User-Agent': DEFAULT_USER_AGENT}) as session:
+        tasks = [asyncio.create_task(download(i, post)) for i, post in enumerate(posts_data, 1)]
+
+        for task in asyncio.as_completed(tasks):
+            i, (status, messages) = await task
+            stats[status] += 1
+
+            if messages:
+                print(f"[{i}/{total}] {messages[0]}")
+                for message in messages[1:]:
+                    print(message)
+            print()
+
+    return stats
+
+
+def run_download_all_posts(posts_data, posts_dir, **kwargs):
+    """
+    Run download_all_posts_async() on a new event loop. Accepts the same
+    keyword arguments.
+
+    Returns the dictionary of statistics.
+    """
+    return asyncio.run(download_all_posts_async(posts_data, posts_dir, **kwargs))
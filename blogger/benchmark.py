@@ -0,0 +1,1017 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmarks
+
+This script measures the performance of parts of the post extractor against
+the original.html files already downloaded into src/posts and src/guides.
+It does not access the network, image downloads being stubbed out.
+
+Usage:
+  python benchmark.py pipeline               # Time each stage across all posts
+  python benchmark.py pipeline --output results.json
+  python benchmark.py pipeline --compare results.json
+  python benchmark.py parse                  # Compare full and targeted parsing
+  python benchmark.py parse --limit 20       # Only use the first 20 pages
+  python benchmark.py comments               # Compare comment Markdown conversion
+  python benchmark.py urls                   # Compare blog URL rewriting
+  python benchmark.py quotes                 # Compare quoted section conversion
+  python benchmark.py postprocess            # Compare Markdown post-processing
+  python benchmark.py walker                 # Compare pairing comment elements
+  python benchmark.py metadata               # Compare finding the metadata elements
+  python benchmark.py startup                # Check extract_post.py starts within budget
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+import html2text
+
+import extract_post
+
+
+def find_corpus(project_root, limit=None):
+    """
+    Find the original.html files of all downloaded posts and guides.
+
+    Args:
+        project_root (Path): Root directory of the project
+        limit (int): Maximum number of files to return
+
+    Returns:
+        list: Sorted list of paths to original.html files
+    """
+    html_files = sorted(project_root.glob('src/posts/*/*/*/original.html'))
+    html_files += sorted(project_root.glob('src/guides/*/original.html'))
+
+    if limit:
+        html_files = html_files[:limit]
+
+    return html_files
+
+
+def measure(function, *args):
+    """
+    Measure the wall time and peak traced memory of a function call.
+
+    The call is made twice, once untraced for the timing, since tracing
+    memory allocations slows the code down, and once traced for memory.
+
+    Returns:
+        tuple: (seconds, peak_bytes)
+    """
+    gc.collect()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def benchmark_parse(html_files, parsers):
+    """
+    Compare full and targeted parsing of each page with each parser backend.
+
+    Args:
+        html_files (list): Paths to the HTML files to parse
+        parsers (list): Names of the parser backends to use
+    """
+    pages = [path.read_text(encoding='utf-8') for path in html_files]
+
+    print(f"Parsing {len(pages)} pages")
+    print()
+    print(f"{'Parser':<12} {'Mode':<10} {'Total (s)':>10} {'Mean (ms)':>10} {'Max peak (KB)':>14}")
+
+    for parser in parsers:
+        results = {}
+
+        for mode, targeted in (('full', False), ('targeted', True)):
+            total_time = 0.0
+            max_peak = 0
+
+            for html_content in pages:
+                elapsed, peak = measure(extract_post.parse_html, html_content, parser, targeted)
+                total_time += elapsed
+                max_peak = max(max_peak, peak)
+
+            results[mode] = (total_time, max_peak)
+
+            print(f"{parser:<12} {mode:<10} {total_time:>10.3f} "
+                  f"{total_time / len(pages) * 1000:>10.2f} {max_peak / 1024:>14.0f}")
+
+        full_time, full_peak = results['full']
+        targeted_time, targeted_peak = results['targeted']
+        print(f"{parser:<12} {'saving':<10} {1 - targeted_time / full_time:>10.0%} "
+              f"{'':>10} {1 - targeted_peak / full_peak:>14.0%}")
+
+
+def find_comment_bodies(html_files, count):
+    """
+    Find the comment bodies of the posts with the most comments.
+
+    Args:
+        html_files (list): Paths to the HTML files to search
+        count (int): Number of posts to return
+
+    Returns:
+        list: (path, list of comment body HTML) for each post, with the
+            posts having the most comments first
+    """
+    posts = []
+
+    for path in html_files:
+        soup = extract_post.parse_html(path.read_text(encoding='utf-8'))
+        comment_bodies = [str(body) for body in soup.find_all('dd', class_='comment-body')]
+        posts.append((path, comment_bodies))
+
+    posts.sort(key=lambda post: len(post[1]), reverse=True)
+    return posts[:count]
+
+
+def convert_comments_separately(comment_bodies):
+    """
+    Convert comments to Markdown the way the extractor originally did, with
+    a new html2text parser configured by hand for each comment.
+    """
+    results = []
+    for html_content in comment_bodies:
+        h = html2text.HTML2Text()
+        h.ignore_links = False
+        h.ignore_images = False
+        h.ignore_emphasis = False
+        h.body_width = 0
+        h.unicode_snob = True
+        h.escape_snob = True
+        results.append(h.handle(html_content).strip())
+    return results
+
+
+def convert_comments_shared(comment_bodies):
+    """Convert comments to Markdown one at a time with the extractor's shared converter."""
+    converter = extract_post.markdown_converter
+    return [converter.convert(html_content) for html_content in comment_bodies]
+
+
+def convert_comments_batched(comment_bodies):
+    """
+    Convert comments to Markdown in a single html2text pass, joined by a
+    marker paragraph which is then used to split the result.
+
+    Returns:
+        list: Markdown for each comment, or None if the result could not
+            be split back into the separate comments
+    """
+    separator = 'BENCHMARKCOMMENTSEPARATOR'
+    converter = extract_post.markdown_converter
+    markdown_content = converter.create_parser().handle(f"<p>{separator}</p>".join(comment_bodies))
+    results = [fragment.strip() for fragment in markdown_content.split(separator)]
+    return results if len(results) == len(comment_bodies) else None
+
+
+def benchmark_comments(html_files, count=10, repeat=5):
+    """
+    Compare ways of converting comments to Markdown for the posts with most
+    comments, and for the comments of all those posts together:
+
+      original  - a new parser configured by hand for each comment
+      shared    - the extractor's shared converter
+      batched   - all the comments joined and converted in a single pass
+
+    Args:
+        html_files (list): Paths to the HTML files to search
+        count (int): Number of posts to use
+        repeat (int): Number of times to repeat each measurement
+    """
+    posts = find_comment_bodies(html_files, count)
+    posts.append((Path('all'), [body for _, comment_bodies in posts for body in comment_bodies]))
+
+    print(f"Converting comments of the {len(posts) - 1} posts with most comments, best of {repeat}")
+    print()
+    print(f"{'Post':<40} {'Comments':>8} {'Original (ms)':>14} {'Shared (ms)':>12} {'Batched (ms)':>13}")
+
+    for path, comment_bodies in posts:
+        expected = convert_comments_separately(comment_bodies)
+        if convert_comments_shared(comment_bodies) != expected:
+            print(f"Warning: Shared conversion differs for {path}")
+        if convert_comments_batched(comment_bodies) != expected:
+            print(f"Warning: Batched conversion differs for {path}")
+
+        timings = [
+            min(timeit.repeat(lambda: function(comment_bodies), number=1, repeat=repeat))
+            for function in (convert_comments_separately, convert_comments_shared, convert_comments_batched)
+        ]
+
+        name = path.parent.name if path.name == 'original.html' else path.name
+        print(f"{name[:40]:<40} {len(comment_bodies):>8} {timings[0] * 1000:>14.2f} "
+              f"{timings[1] * 1000:>12.2f} {timings[2] * 1000:>13.2f}")
+
+
+def convert_urls_separately(markdown_content):
+    """
+    Convert blog URLs the way the extractor originally did, with separate
+    passes for linked and plain post and guide URLs.
+    """
+    def relative_path(year, month, slug):
+        return f"/guides/{slug}/" if year is None else f"/posts/{year}/{month}/{slug}/"
+
+    markdown_content = re.sub(
+        r'\[([^\]]+)\]\((https?://blog\.dscpl\.com\.au/(\d{4})/(\d{2})/([^/]+)\.html)\)',
+        lambda m: f"[{m.group(1)}]({relative_path(m.group(3), m.group(4), m.group(5))})", markdown_content)
+    markdown_content = re.sub(
+        r'\[([^\]]+)\]\((https?://blog\.dscpl\.com\.au/p/([^/]+)\.html)\)',
+        lambda m: f"[{m.group(1)}]({relative_path(None, None, m.group(3))})", markdown_content)
+    markdown_content = re.sub(
+        r'(?<!\]\()(https?://blog\.dscpl\.com\.au/(\d{4})/(\d{2})/([^/\s]+)\.html)(?!\))',
+        lambda m: f"[{relative_path(m.group(2), m.group(3), m.group(4))}]"
+                  f"({relative_path(m.group(2), m.group(3), m.group(4))})", markdown_content)
+    markdown_content = re.sub(
+        r'(?<!\]\()(https?://blog\.dscpl\.com\.au/p/([^/\s]+)\.html)(?!\))',
+        lambda m: f"[{relative_path(None, None, m.group(2))}]"
+                  f"({relative_path(None, None, m.group(2))})", markdown_content)
+    return markdown_content
+
+
+def find_markdown_documents(html_files):
+    """
+    Convert the content and comments of each page to Markdown, as the
+    extractor does before post-processing it.
+
+    Returns:
+        list: Markdown for each post body and comment
+    """
+    converter = extract_post.markdown_converter
+    documents = []
+
+    for path in html_files:
+        soup = extract_post.parse_html(path.read_text(encoding='utf-8'))
+        for element in soup.find_all(['div', 'dd'], class_=['post-body', 'comment-body']):
+            documents.append(converter.convert(str(element)))
+
+    return documents
+
+
+def benchmark_urls(html_files, repeat=5):
+    """
+    Compare rewriting blog URLs with separate passes for each kind of URL
+    against the extractor's single pass, over every post body and comment.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+        repeat (int): Number of times to repeat each measurement
+    """
+    documents = [
+        extract_post.convert_quoted_sections_to_code_blocks(markdown_content)
+        for markdown_content in find_markdown_documents(html_files)
+    ]
+    total_size = sum(len(markdown_content) for markdown_content in documents)
+
+    differences = sum(
+        1 for markdown_content in documents
+        if convert_urls_separately(markdown_content) != extract_post.convert_blog_urls(markdown_content)
+    )
+
+    def run(function):
+        for markdown_content in documents:
+            function(markdown_content)
+
+    separate = min(timeit.repeat(lambda: run(convert_urls_separately), number=1, repeat=repeat))
+    single = min(timeit.repeat(lambda: run(extract_post.convert_blog_urls), number=1, repeat=repeat))
+
+    print(f"Rewriting blog URLs in {len(documents)} documents ({total_size / 1024:.0f} KB), best of {repeat}")
+    print(f"Documents with different output: {differences}")
+    print()
+    print(f"{'Separate passes (ms)':>20} {'Single pass (ms)':>17} {'Speedup':>8}")
+    print(f"{separate * 1000:>20.2f} {single * 1000:>17.2f} {separate / single:>7.2f}x")
+
+
+def convert_quotes_separately(content):
+    """
+    Convert quoted sections to code blocks the way the extractor originally
+    did, testing each line against separate patterns, then scanning the
+    lines of code sections again to convert them.
+    """
+    code_patterns = [
+        (re.match, r'^>\s{4,}.*'),
+        (re.match, r'^>\s+>.*'),
+        (re.search, r'[$#]\s|>>>\s|bash-\d+\.\d+\$'),
+        (re.search, r'\b(def|class|import|from|if|for|while|try|except|with)\s'),
+        (re.search, r'\b(FROM|RUN|COPY|WORKDIR|USER|ENV|EXPOSE|CMD|ENTRYPOINT)\s'),
+        (re.search, r'\b(ls|cd|mkdir|rm|cp|mv|chmod|chown|apt-get|yum|pip|npm)\s'),
+    ]
+
+    lines = content.split('\n')
+    result_lines = []
+    i = 0
+
+    while i < len(lines):
+        if lines[i] != "> ":
+            result_lines.append(lines[i])
+            i += 1
+            continue
+
+        quoted_section = []
+        while i < len(lines) and lines[i].startswith('>'):
+            quoted_section.append(lines[i])
+            i += 1
+
+        if not any(function(pattern, line) for line in quoted_section for function, pattern in code_patterns):
+            result_lines.extend(quoted_section)
+            continue
+
+        code_lines = []
+        consecutive_blanks = 0
+        for line in quoted_section:
+            if line == ">     ":
+                consecutive_blanks += 1
+                if consecutive_blanks <= 1:
+                    code_lines.append("")
+            else:
+                consecutive_blanks = 0
+                code_lines.append(extract_post.remove_all_quote_levels(line))
+
+        while code_lines and not code_lines[0].strip():
+            code_lines.pop(0)
+        while code_lines and not code_lines[-1].strip():
+            code_lines.pop()
+
+        if code_lines:
+            result_lines.extend(["```"] + code_lines + ["```"])
+
+    return '\n'.join(result_lines)
+
+
+def make_pasted_log(lines):
+    """
+    Make a Markdown document quoting a long pasted log, with the only line
+    that looks like code at the end, and as many blank lines before it.
+    """
+    log_lines = [f">     [Mon Oct 0{n % 10} 10:00:00 2015] [info] Request number {n} served" for n in range(lines)]
+    return "Log output:\n\n" + "> \n" * lines + "\n".join(log_lines) + "\n> $ tail error.log\n\nDone."
+
+
+def benchmark_quotes(html_files, repeat=5):
+    """
+    Compare converting quoted sections to code blocks the original way
+    against the extractor's single pass, over every post body and comment,
+    and for pasted logs of increasing size.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+        repeat (int): Number of times to repeat each measurement
+    """
+    corpus = find_markdown_documents(html_files)
+    cases = [('corpus', corpus)] + [(f"log of {lines} lines", [make_pasted_log(lines)]) for lines in (1000, 10000, 50000)]
+
+    print(f"Converting quoted sections, best of {repeat}")
+    print()
+    print(f"{'Documents':<20} {'Count':>6} {'Original (ms)':>14} {'Single pass (ms)':>17} {'Speedup':>8}")
+
+    for name, documents in cases:
+        differences = sum(
+            1 for content in documents
+            if convert_quotes_separately(content) != extract_post.convert_quoted_sections_to_code_blocks(content)
+        )
+        if differences:
+            print(f"Warning: Output differs for {differences} of {name}")
+
+        def run(function):
+            for content in documents:
+                function(content)
+
+        original = min(timeit.repeat(lambda: run(convert_quotes_separately), number=1, repeat=repeat))
+        single = min(timeit.repeat(lambda: run(extract_post.convert_quoted_sections_to_code_blocks), number=1, repeat=repeat))
+
+        print(f"{name:<20} {len(documents):>6} {original * 1000:>14.2f} {single * 1000:>17.2f} {original / single:>7.2f}x")
+
+
+def postprocess_separately(markdown_content):
+    """
+    Post-process Markdown the way the extractor originally did, with each
+    stage making a full copy of the content.
+    """
+    return convert_urls_separately(convert_quotes_separately(markdown_content))
+
+
+def make_large_document(paragraphs):
+    """
+    Make a Markdown document with many paragraphs mentioning blog URLs and
+    a quoted section which looks like code.
+    """
+    paragraph = ("See [the previous post](http://blog.dscpl.com.au/2015/12/running-ipython-as-docker-container.html) "
+                 "and http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html for details.")
+    quoted = "> \n>     $ pip install mod_wsgi\n>     $ mod_wsgi-express start-server"
+    return "\n\n".join([paragraph] * paragraphs + [quoted])
+
+
+def benchmark_postprocess(html_files):
+    """
+    Compare the time and peak memory of post-processing Markdown the
+    original way against the extractor's streaming pipeline, for the
+    largest documents in the corpus and for synthetic large documents.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+    """
+    documents = sorted(find_markdown_documents(html_files), key=len, reverse=True)
+    cases = [(f"corpus {n + 1}", content) for n, content in enumerate(documents[:3])]
+    cases += [(f"{paragraphs} paragraphs", make_large_document(paragraphs)) for paragraphs in (10000, 50000)]
+
+    print("Post-processing Markdown")
+    print()
+    print(f"{'Document':<18} {'Size (KB)':>10} {'Original (ms)':>14} {'Peak (KB)':>10} "
+          f"{'Streaming (ms)':>15} {'Peak (KB)':>10}")
+
+    for name, content in cases:
+        if postprocess_separately(content) != extract_post.postprocess_markdown(content):
+            print(f"Warning: Output differs for {name}")
+
+        original_time, original_peak = measure(postprocess_separately, content)
+        streaming_time, streaming_peak = measure(extract_post.postprocess_markdown, content)
+
+        print(f"{name:<18} {len(content) / 1024:>10.0f} {original_time * 1000:>14.2f} {original_peak / 1024:>10.0f} "
+              f"{streaming_time * 1000:>15.2f} {streaming_peak / 1024:>10.0f}")
+
+
+def make_comment_page(comments):
+    """
+    Make a Blogger page with the given number of comments, marked up the
+    way Blogger does, every third being by the blog author.
+    """
+    entries = []
+    for n in range(comments):
+        comment_id = 1000000 + n
+        author_class = 'comment-author blog-author' if n % 3 == 0 else 'comment-author '
+        entries.append(
+            f"<dt class='{author_class}' id='c{comment_id}'>\n"
+            f"<a name='c{comment_id}'></a>\n"
+            f"<a href='https://www.blogger.com/profile/{n % 50}' rel='nofollow'>Commenter {n % 50}</a>\n"
+            f"said...\n</dt>\n"
+            f"<dd class='comment-body' id='Blog1_cmt-{comment_id}'>\n"
+            f"<p>\nComment {n} about <a href='http://blog.dscpl.com.au/2010/03/improved-wsgi-script-for-use-with.html'>"
+            f"the WSGI script</a>.<br /><br />It works with <i>mod_wsgi</i> {n % 5}.0.\n</p>\n</dd>\n"
+            f"<dd class='comment-footer'>\n<span class='comment-timestamp'>\n"
+            f"<a href='http://blog.dscpl.com.au/2010/03/synthetic.html?showComment={comment_id}#c{comment_id}' "
+            f"title='comment permalink'>\nMarch 29, 2010 at 7:06 PM\n</a>\n</span>\n</dd>\n"
+        )
+
+    return (
+        "<html><head><title>Graham Dumpleton: Synthetic</title></head><body>\n"
+        "<h2 class='date-header'><span>Monday, March 29, 2010</span></h2>\n"
+        "<h3 class='post-title entry-title'>Synthetic</h3>\n"
+        "<div class='post-body entry-content' id='post-body-1'><p>A post with many comments.</p></div>\n"
+        f"<div class='comments' id='comments'>\n<h4>{comments} comments:</h4>\n"
+        "<dl class='avatar-comment-indent' id='comments-block'>\n"
+        + "".join(entries) +
+        "</dl>\n</div>\n</body></html>\n"
+    )
+
+
+def find_comment_elements(comments_block):
+    """
+    Pair comment elements the way the extractor originally did, searching
+    forward through the document from each comment author for the next
+    comment body and footer.
+    """
+    return [
+        (comment_element,
+         comment_element.find_next('dd', class_='comment-body'),
+         comment_element.find_next('dd', class_='comment-footer'))
+        for comment_element in comments_block.find_all('dt', class_='comment-author')
+    ]
+
+
+def benchmark_walker(html_files, repeat=5):
+    """
+    Compare pairing the author, body and footer elements of comments by
+    searching forward from each author against the extractor's single walk
+    over the comments block, for the corpus and for synthetic pages of up
+    to 5,000 comments, along with the time to extract the whole page.
+
+    The time for each comment should stay flat as the number of comments
+    grows if extraction scales linearly.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+        repeat (int): Number of times to repeat each measurement
+    """
+    blocks = [extract_post.parse_html(html_file.read_text(encoding='utf-8')).find('dl', id='comments-block')
+              for html_file in html_files]
+    cases = [('corpus', [block for block in blocks if block is not None], None)]
+    cases += [(f"{comments} comments", None, comments) for comments in (500, 1000, 2000, 5000)]
+
+    print(f"Pairing comment elements, best of {repeat}")
+    print()
+    print(f"{'Page':<15} {'Comments':>9} {'Search (ms)':>12} {'Walk (ms)':>10} {'Speedup':>8} "
+          f"{'Extract (ms)':>13} {'Per comment (us)':>17}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, comment_blocks, comments in cases:
+            extract_time = None
+            if comment_blocks is None:
+                html_file = Path(temp_dir) / 'original.html'
+                html_file.write_text(make_comment_page(comments), encoding='utf-8')
+                comment_blocks = [extract_post.parse_html(html_file.read_text(encoding='utf-8')).find('dl', id='comments-block')]
+                with contextlib.redirect_stdout(io.StringIO()):
+                    extract_time = min(timeit.repeat(lambda: extract_post.extract_post_data(str(html_file)),
+                                                     number=1, repeat=max(1, repeat // 2)))
+
+            walked = [list(extract_post.iter_comment_elements(block)) for block in comment_blocks]
+            if walked != [find_comment_elements(block) for block in comment_blocks]:
+                print(f"Warning: Comments are paired differently for {name}")
+            total = sum(len(comments) for comments in walked)
+
+            search = min(timeit.repeat(lambda: [find_comment_elements(block) for block in comment_blocks],
+                                       number=1, repeat=repeat))
+            walk = min(timeit.repeat(lambda: [list(extract_post.iter_comment_elements(block)) for block in comment_blocks],
+                                     number=1, repeat=repeat))
+
+            extract_columns = f"{'':>13} {'':>17}"
+            if extract_time is not None:
+                extract_columns = f"{extract_time * 1000:>13.1f} {extract_time / total * 1e6:>17.1f}"
+
+            print(f"{name:<15} {total:>9} {search * 1000:>12.2f} {walk * 1000:>10.2f} {search / walk:>7.2f}x "
+                  + extract_columns)
+
+
+# Searches the extractor originally made for each metadata element
+METADATA_SEARCHES = {
+    'title': (['h3'], {'class_': 'post-title entry-title'}),
+    'content': (['div'], {'id': extract_post.POST_BODY_ID_PATTERN}),
+    'date': (['h2'], {'class_': 'date-header'}),
+    'author': (['span'], {'class_': 'fn'}),
+    'canonical': (['link'], {'rel': 'canonical'}),
+    'post_id': (['meta', {'itemprop': 'postId'}], {}),
+    'blog_id': (['meta', {'itemprop': 'blogId'}], {}),
+    'published': (['abbr'], {'class_': 'published'}),
+    'comments': (['div'], {'id': 'comments'}),
+    'labels': (['div'], {'class_': 'post-footer-line post-footer-line-2'}),
+    'blog_title': (['h1'], {'class_': 'title'}),
+    'page_title': (['title'], {}),
+    'og_title': (['meta'], {'property': 'og:title'}),
+    'og_description': (['meta'], {'property': 'og:description'}),
+    'og_url': (['meta'], {'property': 'og:url'}),
+}
+
+
+def find_metadata_separately(soup):
+    """
+    Find the metadata elements the way the extractor originally did, with a
+    separate soup.find() for each.
+    """
+    return {field: soup.find(*args, **kwargs) for field, (args, kwargs) in METADATA_SEARCHES.items()}
+
+
+def count_nodes_visited(soup, elements):
+    """
+    Count the nodes of a document visited to find the elements, by
+    separate soup.find() calls, each walking from the start of the
+    document to its element or through the whole document if there is
+    none, and by a single walk stopping at the last element found.
+
+    Returns:
+        tuple: (nodes in the document, nodes searched by separate calls,
+            nodes walked)
+    """
+    positions = {id(node): position for position, node in enumerate(soup.descendants, 1)}
+    found = [positions[id(element)] if element is not None else len(positions) for element in elements.values()]
+    return len(positions), sum(found), max(found, default=0)
+
+
+def benchmark_metadata(html_files, repeat=5):
+    """
+    Compare finding the elements the post data is read from with a
+    separate soup.find() for each against the extractor's single walk,
+    for targeted and full parses of every page.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+        repeat (int): Number of times to repeat each measurement
+    """
+    print(f"Finding metadata elements in {len(html_files)} pages, best of {repeat}")
+    print()
+    print(f"{'Parse':<10} {'Nodes':>10} {'Searched':>10} {'Walked':>10} "
+          f"{'Separate (ms)':>14} {'Walk (ms)':>10} {'Speedup':>8}")
+
+    for name, targeted in (('targeted', True), ('full', False)):
+        soups = [extract_post.parse_html(html_file.read_text(encoding='utf-8'), targeted=targeted)
+                 for html_file in html_files]
+
+        nodes = searched = walked = differences = 0
+        for soup in soups:
+            elements = extract_post.MetadataCollector().collect(soup)
+            if elements != find_metadata_separately(soup):
+                differences += 1
+
+            page_nodes, page_searched, page_walked = count_nodes_visited(soup, elements)
+            nodes += page_nodes
+            searched += page_searched
+            walked += page_walked
+
+        separate = min(timeit.repeat(lambda: [find_metadata_separately(soup) for soup in soups],
+                                     number=1, repeat=repeat))
+        walk = min(timeit.repeat(lambda: [extract_post.MetadataCollector().collect(soup) for soup in soups],
+                                 number=1, repeat=repeat))
+
+        if differences:
+            print(f"Warning: Different elements found in {differences} pages")
+        print(f"{name:<10} {nodes:>10} {searched:>10} {walked:>10} "
+              f"{separate * 1000:>14.2f} {walk * 1000:>10.2f} {separate / walk:>7.2f}x")
+
+
+# Percentiles reported for each stage of the pipeline
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values, percent):
+    """
+    Get a percentile of a list of values, using the nearest rank.
+
+    Args:
+        values (list): Values, which need not be sorted
+        percent (int): Percentile to get, from 0 to 100
+
+    Returns:
+        float: The value at that percentile
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-percent * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def summarise(values):
+    """Summarise values with their percentiles, maximum and total."""
+    summary = {f"p{percent}": percentile(values, percent) for percent in PERCENTILES}
+    summary['max'] = max(values)
+    summary['total'] = sum(values)
+    return summary
+
+
+def stub_download_image(image_url, output_dir, overwrite=False):
+    """Stand in for extract_post.download_image without any file or network access."""
+    return extract_post.get_image_filename(image_url)
+
+
+def get_pipeline_stages(html_file):
+    """
+    Get the stages of extracting a post, each as a function of no arguments
+    working on the output of the stage before, as the extractor does.
+
+    Args:
+        html_file (Path): Path to the original.html file
+
+    Returns:
+        list: (name, function) for each stage
+    """
+    html_content = html_file.read_text(encoding='utf-8')
+    soup = extract_post.parse_html(html_content)
+    fragments = [str(element) for element in soup.find_all(['div', 'dd'], class_=['post-body', 'comment-body'])]
+
+    converter = extract_post.markdown_converter
+    documents = [converter.convert(fragment) for fragment in fragments]
+    quoted = [extract_post.convert_quoted_sections_to_code_blocks(content) for content in documents]
+
+    return [
+        ('parse', lambda: extract_post.parse_html(html_content)),
+        ('html2text', lambda: [converter.convert(fragment) for fragment in fragments]),
+        ('quotes', lambda: [extract_post.convert_quoted_sections_to_code_blocks(content) for content in documents]),
+        ('urls', lambda: [extract_post.convert_blog_urls(content) for content in quoted]),
+        ('postprocess', lambda: [extract_post.postprocess_markdown(content) for content in documents]),
+        ('extract', lambda: extract_post.extract_post_data(str(html_file))),
+    ]
+
+
+def get_git_commit(project_root):
+    """Get the current git commit of the project, or None if unknown."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_pipeline(html_files, project_root, repeat=1):
+    """
+    Measure the time and peak memory of each stage of extracting every
+    post, with image downloads stubbed out, and summarise them as
+    percentiles across posts.
+
+    The extract stage is the whole of extract_post_data(), and so includes
+    the other stages. The postprocess stage is the quotes and urls stages
+    as the extractor runs them, streamed together.
+
+    Args:
+        html_files (list): Paths to the HTML files to use
+        project_root (Path): Root directory of the project
+        repeat (int): Number of times to time each stage, taking the best
+
+    Returns:
+        dict: Results which can be saved as JSON
+    """
+    times = {}
+    peaks = {}
+
+    with mock.patch.object(extract_post, 'download_image', stub_download_image):
+        for html_file in html_files:
+            for name, function in get_pipeline_stages(html_file):
+                elapsed, peak = float('inf'), 0
+                for _ in range(repeat):
+                    # Discard progress messages printed by the extractor
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run_elapsed, peak = measure(function)
+                    elapsed = min(elapsed, run_elapsed)
+
+                times.setdefault(name, []).append(elapsed * 1000)
+                peaks.setdefault(name, []).append(peak / 1024)
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': get_git_commit(project_root),
+        'python': platform.python_version(),
+        'parser': extract_post.select_parser(),
+        'posts': len(html_files),
+        'repeat': repeat,
+        'stages': {
+            name: {'time_ms': summarise(times[name]), 'peak_kb': summarise(peaks[name])}
+            for name in times
+        },
+    }
+
+
+def print_pipeline_results(results, baseline=None):
+    """
+    Print the results of benchmark_pipeline(), optionally compared against
+    the results of an earlier run.
+
+    Args:
+        results (dict): Results to print
+        baseline (dict): Earlier results to compare against
+    """
+    print(f"Extracting {results['posts']} pages with the {results['parser']} parser "
+          f"at commit {results['commit'] or 'unknown'}")
+    if baseline:
+        print(f"Compared with {baseline['posts']} pages at commit {baseline['commit'] or 'unknown'} "
+              f"created {baseline['created']}")
+    print()
+
+    columns = [f"p{percent}" for percent in PERCENTILES] + ['max']
+    header = ' '.join(f"{column:>9}" for column in columns)
+    print(f"{'Stage':<12} {'Time (ms)':<9} {header} {'Total':>9}   {'Peak (KB)':<9} {header}")
+
+    for name, stage in results['stages'].items():
+        time_ms = stage['time_ms']
+        peak_kb = stage['peak_kb']
+        print(f"{name:<12} {'':<9} " + ' '.join(f"{time_ms[column]:>9.2f}" for column in columns) +
+              f" {time_ms['total']:>9.1f}   {'':<9} " + ' '.join(f"{peak_kb[column]:>9.0f}" for column in columns))
+
+        baseline_stage = (baseline or {}).get('stages', {}).get(name)
+        if baseline_stage:
+            time_changes = [format_change(time_ms[column], baseline_stage['time_ms'][column]) for column in columns]
+            peak_changes = [format_change(peak_kb[column], baseline_stage['peak_kb'][column]) for column in columns]
+            total_change = format_change(time_ms['total'], baseline_stage['time_ms']['total'])
+            print(f"{'':<12} {'change':<9} " + ' '.join(time_changes) +
+                  f" {total_change}   {'':<9} " + ' '.join(peak_changes))
+
+
+def format_change(value, baseline):
+    """Format the relative change of a value from a baseline value."""
+    if not baseline:
+        return f"{'n/a':>9}"
+    return f"{value / baseline - 1:>+9.0%}"
+
+
+# Budget for the median wall time of starting extract_post.py in single
+# file mode, as editor hooks do on every save, and the modules which are
+# only imported when a post is actually processed.
+STARTUP_BUDGET_MS = 200
+DEFERRED_MODULES = ['bs4', 'html2text', 'requests']
+
+
+def parse_import_times(stderr):
+    """
+    Parse the output of python -X importtime.
+
+    Returns:
+        tuple: (set of the names of all modules imported, total
+            milliseconds taken by imports, being the sum of the cumulative
+            times of the modules imported at the top level)
+    """
+    modules = set()
+    total_us = 0
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)', line)
+        if match:
+            modules.add(match.group(3))
+            if not match.group(2):
+                total_us += int(match.group(1))
+    return modules, total_us / 1000
+
+
+def measure_startup(command, cwd, repeat):
+    """
+    Measure the wall time of running a command with python -X importtime.
+
+    Returns:
+        tuple: (list of milliseconds for each run, modules imported and
+            milliseconds taken by imports in the last run, as returned by
+            parse_import_times())
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                                cwd=cwd, capture_output=True, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times, parse_import_times(result.stderr)
+
+
+def find_unchanged_post(html_files):
+    """Find a post which single file mode would skip as unchanged, or None."""
+    manifest = extract_post.load_manifest(extract_post.MANIFEST_FILE)
+    for html_file in html_files:
+        if extract_post.is_post_up_to_date(manifest, html_file):
+            return html_file
+    return None
+
+
+def benchmark_startup(html_files, repeat=10, budget_ms=STARTUP_BUDGET_MS):
+    """
+    Measure how long extract_post.py takes to start, for --help and for
+    single file mode on a post which is skipped as unchanged, checking the
+    median against a budget and that the heavy modules in DEFERRED_MODULES
+    are not imported.
+
+    Args:
+        html_files (list): Paths to the HTML files to look for an unchanged
+            post in
+        repeat (int): Number of times to run each command
+        budget_ms (float): Budget for the median time in milliseconds
+
+    Returns:
+        bool: True if every command is within budget
+    """
+    script = Path(extract_post.__file__).resolve()
+
+    commands = [
+        ('interpreter', ['-c', 'pass']),
+        ('import', ['-c', 'import extract_post']),
+        ('--help', [script.name, '--help']),
+    ]
+
+    unchanged_post = find_unchanged_post(html_files)
+    if unchanged_post:
+        commands.append(('unchanged post', [script.name, str(unchanged_post)]))
+
+    print(f"Starting extract_post.py, {repeat} runs each, budget {budget_ms:.0f}ms median")
+    if not unchanged_post:
+        print("No post is unchanged since it was last extracted, run the extractor to time single file mode")
+    print()
+    print(f"{'Command':<16} {'Best (ms)':>10} {'Median (ms)':>12} {'Imports (ms)':>13}  Deferred modules imported")
+
+    passed = True
+
+    for name, command in commands:
+        times, (modules, total_import_ms) = measure_startup(command, script.parent, repeat)
+        median = statistics.median(times)
+        imported = [module for module in DEFERRED_MODULES if module in modules]
+
+        checked = name not in ('interpreter', 'import')
+        status = ''
+        if checked and (median > budget_ms or imported):
+            status = '  OVER BUDGET' if median > budget_ms else '  FAILED'
+            passed = False
+
+        print(f"{name:<16} {min(times):>10.1f} {median:>12.1f} {total_import_ms:>13.1f}  "
+              f"{', '.join(imported) or 'none'}{status}")
+
+    return passed
+
+
+def main():
+    """Main function to run the benchmarks."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the blog post extractor against downloaded pages',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark.py pipeline               # Time each stage across all posts
+  python benchmark.py pipeline --output results.json
+  python benchmark.py pipeline --compare results.json
+  python benchmark.py parse                  # Compare full and targeted parsing
+  python benchmark.py parse --limit 20       # Only use the first 20 pages
+  python benchmark.py comments               # Compare comment Markdown conversion
+  python benchmark.py urls                   # Compare blog URL rewriting
+  python benchmark.py quotes                 # Compare quoted section conversion
+  python benchmark.py postprocess            # Compare Markdown post-processing
+  python benchmark.py walker                 # Compare pairing comment elements
+  python benchmark.py metadata               # Compare finding the metadata elements
+  python benchmark.py startup                # Check extract_post.py starts within budget
+  python benchmark.py startup --budget 150   # Use a budget of 150ms
+        """
+    )
+
+    parser.add_argument(
+        'benchmark',
+        choices=['pipeline', 'parse', 'comments', 'urls', 'quotes', 'postprocess', 'walker', 'metadata',
+                 'startup'],
+        help='Benchmark to run'
+    )
+
+    parser.add_argument(
+        '--limit',
+        type=int,
+        help='Maximum number of pages to use'
+    )
+
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=1,
+        help='Number of times to time each pipeline stage, taking the best (default: 1)'
+    )
+
+    parser.add_argument(
+        '--budget',
+        type=float,
+        default=STARTUP_BUDGET_MS,
+        help=f'Budget for the median startup time in milliseconds (default: {STARTUP_BUDGET_MS})'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=Path,
+        help='Save the pipeline results as JSON to this file'
+    )
+
+    parser.add_argument(
+        '--compare',
+        type=Path,
+        help='Compare the pipeline results with those saved by an earlier run'
+    )
+
+    args = parser.parse_args()
+
+    # Get the directory containing this script
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+
+    html_files = find_corpus(project_root, args.limit)
+
+    if args.benchmark == 'pipeline':
+        baseline = None
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        results = benchmark_pipeline(html_files, project_root, args.repeat)
+        print_pipeline_results(results, baseline)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print()
+            print(f"Saved results to {args.output}")
+    elif args.benchmark == 'parse':
+        parsers = [name for name in extract_post.PARSER_BACKENDS if extract_post.select_parser(name)]
+        benchmark_parse(html_files, parsers)
+    elif args.benchmark == 'comments':
+        benchmark_comments(html_files)
+    elif args.benchmark == 'urls':
+        benchmark_urls(html_files)
+    elif args.benchmark == 'quotes':
+        benchmark_quotes(html_files)
+    elif args.benchmark == 'postprocess':
+        benchmark_postprocess(html_files)
+    elif args.benchmark == 'walker':
+        benchmark_walker(html_files)
+    elif args.benchmark == 'metadata':
+        benchmark_metadata(html_files)
+    elif args.benchmark == 'startup':
+        if not benchmark_startup(html_files, max(args.repeat, 10), args.budget):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Append-only journal of post download outcomes.
+
+Each line of the journal is a JSON record of one attempt to download a
+URL: its outcome, HTTP status code, size, duration and number of
+attempts, and whether a failure is permanent. Lines are flushed as they
+are written, so the journal survives the downloader dying partway
+through a run.
+
+The journal only resumes an interrupted run. When a run is started
+again after one which did not finish, the latest record for each URL
+decides what happens to it. URLs which were downloaded, found unchanged
+or skipped are confirmed and skipped, provided the downloaded file is
+still there, as are URLs which failed permanently, such as with a 404.
+Only URLs which failed transiently, such as with a timeout or a 503, and
+URLs not yet recorded are tried again.
+
+A run which finishes writes a marker record at the end of the journal.
+The records before the marker are then ignored, and the journal is
+started afresh by the next run, so a later run checks every URL again.
+"""
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+JOURNAL_FILE = Path(__file__).parent / 'download-journal.jsonl'
+
+# Outcomes which confirm that nothing more needs doing for a URL
+CONFIRMED_OUTCOMES = {'downloaded', 'not_modified', 'skipped'}
+
+# HTTP status codes of client errors which are worth retrying
+TRANSIENT_CLIENT_ERRORS = {408, 425, 429}
+
+
+def is_permanent_failure(status_code):
+    """
+    Check whether a failed download should not be retried by a later run.
+    Client errors such as 404 are permanent, while server errors, rate
+    limiting and failures with no HTTP status, such as network errors or
+    being unable to save the file, are transient.
+    """
+    return status_code is not None and 400 <= status_code < 500 and status_code not in TRANSIENT_CLIENT_ERRORS
+
+
+class DownloadJournal:
+    """
+    Records the outcome of each download in an append-only JSON lines
+    file, and uses the records from earlier runs to decide which URLs can
+    be skipped. Safe to share between threads.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, retry_permanent=False):
+        self.path = Path(path)
+        self.retry_permanent = retry_permanent
+        self.finished = False
+        self.entries = self.load()
+        self.lock = threading.Lock()
+        self.file = None
+
+    def load(self):
+        """
+        Load the latest record for each URL from the journal. Lines which
+        cannot be parsed, such as one left incomplete when a run died, are
+        ignored, as are the records of runs which finished.
+
+        Returns a dictionary mapping each URL to its latest record.
+        """
+        entries = {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get('finished'):
+                            entries = {}
+                            self.finished = True
+                            continue
+                        entries[entry['url']] = entry
+                        self.finished = False
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+        return entries
+
+    def get_completed(self, url):
+        """
+        Get the record of an earlier run which means the URL does not need
+        to be tried again, or None if it should be downloaded.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+
+        if entry['outcome'] in CONFIRMED_OUTCOMES:
+            return entry
+
+        if entry.get('permanent') and not self.retry_permanent:
+            return entry
+
+        return None
+
+    def record(self, url, outcome, status_code=None, size=None, duration=None, attempts=None):
+        """
+        Append the outcome of a download to the journal.
+
+        Args:
+            url (str): URL of the post
+            outcome (str): One of 'downloaded', 'not_modified', 'skipped'
+                or 'error'
+            status_code (int): HTTP status code of the final response
+            size (int): Number of bytes downloaded
+            duration (float): Seconds spent downloading
+            attempts (int): Number of requests made, including retries
+        """
+        entry = {
+            'url': url,
+            'outcome': outcome,
+            'status_code': status_code,
+            'bytes': size,
+            'duration': round(duration, 3) if duration is not None else None,
+            'attempts': attempts,
+            'permanent': outcome == 'error' and is_permanent_failure(status_code),
+            'time': datetime.now().isoformat(timespec='seconds'),
+        }
+
+        with self.lock:
+            if self.file is None:
+                self.open()
+
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            self.entries[url] = entry
+
+    def finish(self):
+        """
+        Mark the run as finished, so that its records are not used to
+        resume a later run, and close the journal file.
+        """
+        entry = {'finished': True, 'time': datetime.now().isoformat(timespec='seconds')}
+
+        with self.lock:
+            if self.file is None:
+                self.open()
+
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.close()
+            self.file = None
+            self.entries = {}
+            self.finished = True
+
+    def open(self):
+        """
+        Open the journal for appending, first ending any line left
+        incomplete when a run died so the next record starts on its own.
+        The journal of a run which finished is started afresh instead.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.finished:
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self.finished = False
+            return
+
+        with open(self.path, 'ab+') as f:
+            if f.tell() > 0:
+                f.seek(-1, 2)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Close the journal file."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
@@ -4,159 +4,182 @@ Script to download web pages from URLs in posts-metadata.json and save them
 to organized subdirectories based on year and month from the URL path.
 """
 
-import json
-import os
+import argparse
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urlparse
-import requests
 from requests.exceptions import RequestException, Timeout, HTTPError
 from requests.exceptions import ConnectionError as RequestsConnectionError
+from http_session import configure_session, get_session, DEFAULT_POOL_SIZE, DEFAULT_RETRIES
+from download_journal import DownloadJournal, JOURNAL_FILE
+from metadata_index import open_metadata_index
+from feed_ingest import ingest_feed, DEFAULT_BLOG_URL, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from post_paths import get_basename_from_url, get_post_location
+from post_download import (load_cache_entry, save_cache_entry, create_directory_if_not_exists, save_html_content,
+                           prepare_post_download, save_post_download, check_journal, record_download)
 
 
-def load_metadata(metadata_file):
-    """Load the posts metadata from JSON file."""
-    try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Metadata file '{metadata_file}' not found.")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in metadata file: {e}")
-        sys.exit(1)
-
-
-def extract_year_month_from_url(url):
+def download_webpage(url, user_agent=None):
     """
-    Extract year and month from URL path.
-    Expected format: http://blog.dscpl.com.au/YYYY/MM/filename.html
-    Returns tuple (year, month) or (None, None) if pattern doesn't match.
+    Download webpage content from URL.
+    Returns the HTML content as string, or None if download fails.
+    Uses the shared session so connections are reused between requests.
     """
-    parsed = urlparse(url)
-    path_parts = parsed.path.strip('/').split('/')
-    
-    if len(path_parts) >= 2:
-        year = path_parts[0]
-        month = path_parts[1]
-        
-        # Validate that year and month are numeric
-        if year.isdigit() and month.isdigit():
-            return year, month
-    
-    return None, None
+    status, content, _ = download_webpage_if_modified(url, user_agent=user_agent)
+    return content if status == 'modified' else None
 
 
-def is_guide_url(url):
+def download_webpage_if_modified(url, cache_entry=None, user_agent=None, info=None):
     """
-    Check if URL is a guide URL (contains /p/ pattern).
-    Expected format: http://blog.dscpl.com.au/p/filename.html
-    Returns True if it's a guide URL, False otherwise.
-    """
-    parsed = urlparse(url)
-    path_parts = parsed.path.strip('/').split('/')
+    Download webpage content from URL using a conditional GET.
     
-    if len(path_parts) >= 2 and path_parts[0] == 'p':
-        return True
+    If cache_entry holds an ETag or Last-Modified value from a previous
+    download, it is sent as If-None-Match/If-Modified-Since so the server
+    can reply with 304 Not Modified instead of the full page.
     
-    return False
-
-
-def get_filename_from_url(url):
-    """Extract filename from URL."""
-    parsed = urlparse(url)
-    return os.path.basename(parsed.path)
-
-
-def get_basename_from_url(url):
-    """Extract basename (without extension) from URL."""
-    parsed = urlparse(url)
-    filename = os.path.basename(parsed.path)
-    # Remove .html extension if present
-    if filename.endswith('.html'):
-        return filename[:-5]  # Remove last 5 characters (.html)
-    return filename
-
-
-def download_webpage(url, user_agent=None):
-    """
-    Download webpage content from URL.
-    Returns the HTML content as string, or None if download fails.
+    Returns tuple (status, content, cache_entry) where status is one of
+    'modified', 'not_modified' or 'error'. content is only set when the
+    status is 'modified', and cache_entry holds the validators from the
+    response to record for the next request.
+    
+    If info is a dictionary, the 'status_code', 'bytes' and 'attempts' of
+    the download are added to it where known.
     """
-    if user_agent is None:
-        user_agent = 'Mozilla/5.0 (compatible; BlogDownloader/1.0)'
+    if info is None:
+        info = {}
     
-    headers = {'User-Agent': user_agent}
+    headers = {}
+    if user_agent is not None:
+        headers['User-Agent'] = user_agent
+    
+    if cache_entry:
+        if cache_entry.get('etag'):
+            headers['If-None-Match'] = cache_entry['etag']
+        if cache_entry.get('last_modified'):
+            headers['If-Modified-Since'] = cache_entry['last_modified']
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_session().get(url, headers=headers, timeout=30)
+        
+        # Retries made by the session are recorded in the retry history
+        info['status_code'] = response.status_code
+        info['bytes'] = len(response.content)
+        retries = getattr(response.raw, 'retries', None)
+        info['attempts'] = len(retries.history) + 1 if retries is not None else 1
+        
+        if response.status_code == 304:
+            return 'not_modified', None, cache_entry
+        
         response.raise_for_status()  # Raises HTTPError for bad responses
         
+        new_cache_entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        
         # Try to decode as UTF-8, fallback to latin-1 if that fails
         try:
-            return response.text
+            return 'modified', response.text, new_cache_entry
         except UnicodeDecodeError:
-            return response.content.decode('latin-1')
+            return 'modified', response.content.decode('latin-1'), new_cache_entry
                 
     except HTTPError as e:
         print(f"Error: HTTP {e.response.status_code} for {url}")
-        return None
+        return 'error', None, None
     except (RequestsConnectionError, Timeout) as e:
         print(f"Error: Network error for {url}: {e}")
-        return None
+        return 'error', None, None
     except RequestException as e:
         print(f"Error: Request error downloading {url}: {e}")
-        return None
+        return 'error', None, None
 
 
-def create_directory_if_not_exists(directory_path):
-    """Create directory if it doesn't exist."""
-    try:
-        Path(directory_path).mkdir(parents=True, exist_ok=True)
-        return True
-    except (OSError, PermissionError) as e:
-        print(f"Error: Cannot create directory '{directory_path}': {e}")
-        return False
+class TokenBucket:
+    """
+    Token bucket rate limiter.
 
+    Tokens are added at `rate` per second up to `capacity`. Each call to
+    acquire() takes one token, blocking until one is available. Safe to
+    share between threads.
+    """
 
-def save_html_content(content, file_path):
-    """Save HTML content to file."""
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return True
-    except (OSError, PermissionError, UnicodeEncodeError) as e:
-        print(f"Error: Cannot save file '{file_path}': {e}")
-        return False
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Maintains a separate token bucket for each host so that requests to
+    one server do not hold up requests to another.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        """Wait until a request to the host of `url` is permitted."""
+        if self.rate <= 0:
+            return
+
+        host = urlparse(url).netloc
+
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self.buckets[host] = bucket
+
+        bucket.acquire()
 
 
-def process_single_url(url, posts_dir, overwrite=False):
-    """Process a single URL and download it to the appropriate directory."""
+def process_single_url(url, posts_dir, overwrite=False, refresh=False):
+    """
+    Process a single URL and download it to the appropriate directory.
+    With refresh, an existing file is re-fetched using a conditional GET
+    and only replaced if the server reports it has changed.
+    """
     print(f"Processing single URL: {url}")
     
     # Get basename from URL (without .html extension)
-    basename = get_basename_from_url(url)
-    if not basename:
+    if not get_basename_from_url(url):
         print("Error: Cannot extract basename from URL")
         return False
     
-    # Check if this is a guide URL (contains /p/ pattern)
-    if is_guide_url(url):
-        # For guide URLs, create path: guides/basename/
-        guides_dir = posts_dir.parent / 'guides'
-        subdir = guides_dir / basename
-        print("Target directory (guide):", subdir)
-    else:
-        # Regular post URL with YYYY/MM pattern
-        year, month = extract_year_month_from_url(url)
-        if not year or not month:
-            print("Error: Cannot extract year/month from URL")
-            return False
-        
-        # Create subdirectory path: posts/YYYY/MM/filename/
-        subdir = posts_dir / year / month / basename
-        print("Target directory (post):", subdir)
+    # Guides are saved to guides/basename/ and posts to posts/YYYY/MM/basename/
+    kind, _, _, _, directory = get_post_location(url)
+    if kind is None:
+        print("Error: Cannot extract year/month from URL")
+        return False
+    
+    subdir = posts_dir.parent / directory
+    print(f"Target directory ({kind}):", subdir)
     
     # Create directory if it doesn't exist
     if not create_directory_if_not_exists(subdir):
@@ -165,30 +188,256 @@ def process_single_url(url, posts_dir, overwrite=False):
     # Save as original.html inside the subdirectory
     file_path = subdir / "original.html"
     
-    # Check if file already exists (unless overwrite is True)
-    if file_path.exists() and not overwrite:
+    # Check if file already exists (unless overwrite or refresh is True)
+    if file_path.exists() and not (overwrite or refresh):
         print(f"File already exists, skipping: {file_path}")
-        print("Use --overwrite flag to force download")
+        print("Use --overwrite flag to force download or --refresh to update if changed")
         return False
     
+    # Only make the request conditional when refreshing an existing file
+    cache_entry = None
+    if refresh and not overwrite and file_path.exists():
+        cache_entry = load_cache_entry(subdir, url)
+    
     # Download the webpage
     print("Downloading...")
-    html_content = download_webpage(url)
+    status, html_content, cache_entry = download_webpage_if_modified(url, cache_entry)
+    
+    if status == 'not_modified':
+        print(f"Not modified, keeping: {file_path}")
+        return True
     
-    if html_content is None:
+    if status == 'error':
         print("Failed to download")
         return False
     
     # Save the content
     if save_html_content(html_content, file_path):
+        save_cache_entry(subdir, cache_entry)
         print(f"Saved: {file_path}")
         return True
     else:
         return False
 
 
+def download_post(post, posts_dir, rate_limiter, refresh=False, journal=None):
+    """
+    Download a single post entry from the metadata. With refresh, existing
+    files are re-fetched using a conditional GET rather than skipped.
+    Posts already dealt with according to the journal are skipped, and
+    the outcome of each post is recorded in it.
+
+    Returns a tuple (status, messages) where status is one of 'downloaded',
+    'not_modified', 'skipped', 'resumed' or 'error', and messages is the list of progress lines to
+    report for the post. Messages are collected rather than printed so that
+    output from concurrent downloads does not interleave.
+    """
+    resumed = check_journal(post, journal, posts_dir, refresh)
+    if resumed:
+        return resumed
+
+    status, messages, target = prepare_post_download(post, posts_dir, refresh)
+    if status is not None:
+        record_download(journal, post, status)
+        return status, messages
+
+    # Wait for the rate limiter to be respectful to the server
+    rate_limiter.acquire(target['url'])
+
+    # Download the webpage
+    messages.append("  Downloading...")
+    info = {}
+    start = time.monotonic()
+    status, html_content, cache_entry = download_webpage_if_modified(target['url'], target['cache_entry'], info=info)
+    duration = time.monotonic() - start
+
+    status = save_post_download(target, status, html_content, cache_entry, messages)
+    record_download(journal, post, status, info, duration)
+    return status, messages
+
+
+def download_all_posts(posts_data, posts_dir, workers=1, rate=2.0, burst=1, refresh=False, journal=None):
+    """
+    Download all posts from the metadata using a bounded pool of worker
+    threads, with requests to each host limited to `rate` per second.
+
+    Returns a dictionary of statistics with counts for 'downloaded',
+    'not_modified', 'skipped', 'resumed' and 'error'.
+    """
+    rate_limiter = HostRateLimiter(rate, burst)
+    stats = {'downloaded': 0, 'not_modified': 0, 'skipped': 0, 'resumed': 0, 'error': 0}
+    total = len(posts_data)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(download_post, post, posts_dir, rate_limiter, refresh, journal): i
+            for i, post in enumerate(posts_data, 1)
+        }
+
+        for future in as_completed(futures):
+            i = futures[future]
+            status, messages = future.result()
+            stats[status] += 1
+
+            if messages:
+                print(f"[{i}/{total}] {messages[0]}")
+                for message in messages[1:]:
+                    print(message)
+            print()
+
+    return stats
+
+
+def page_size_arg(value):
+    """Parse a --page-size argument, which must be within what Blogger allows."""
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MAX_PAGE_SIZE}, got {page_size}")
+    
+    return page_size
+
+
 def main():
     """Main function to process all posts or a single URL."""
+    parser = argparse.ArgumentParser(
+        description='Download blog post pages listed in posts-metadata.json',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python download_posts.py                    # Download all posts from metadata
+  python download_posts.py --workers 8        # Download all posts using 8 threads
+  python download_posts.py --refresh          # Update all posts which have changed
+  python download_posts.py --retry-permanent  # Also retry URLs which failed with a client error
+  python download_posts.py --async --concurrency 200 --rate 0  # Download all posts using asyncio
+  python download_posts.py --feed             # Save all posts from the blog feed and regenerate metadata
+  python download_posts.py --feed --refresh   # Also update pages saved from the feed which have changed
+  python download_posts.py <URL>              # Download single URL
+  python download_posts.py <URL> --overwrite  # Download single URL, overwrite if exists
+  python download_posts.py <URL> --refresh    # Download single URL, update if changed
+        """
+    )
+
+    parser.add_argument(
+        'url',
+        nargs='?',
+        help='URL to download (optional - if not provided, downloads all posts from metadata)'
+    )
+
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='Overwrite existing file (only applies to single URL mode)'
+    )
+
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Re-fetch existing files using a conditional GET, replacing them only if changed'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of concurrent downloads (default: 1)'
+    )
+
+    parser.add_argument(
+        '--journal',
+        type=Path,
+        default=JOURNAL_FILE,
+        help=f'Journal of download outcomes used to resume interrupted runs (default: {JOURNAL_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--no-journal',
+        action='store_true',
+        help='Do not record or resume from the journal'
+    )
+
+    parser.add_argument(
+        '--retry-permanent',
+        action='store_true',
+        help='Retry URLs recorded in the journal as permanently failed, such as with a 404'
+    )
+
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Download all posts from one asyncio event loop using aiohttp instead of threads'
+    )
+
+    parser.add_argument(
+        '--feed',
+        action='store_true',
+        help='Save all posts and guides from the Blogger feed and regenerate posts-metadata.json from it'
+    )
+
+    parser.add_argument(
+        '--blog-url',
+        default=DEFAULT_BLOG_URL,
+        help=f'Base URL of the blog whose feed is read with --feed (default: {DEFAULT_BLOG_URL})'
+    )
+
+    parser.add_argument(
+        '--page-size',
+        type=page_size_arg,
+        default=DEFAULT_PAGE_SIZE,
+        help=f'Number of feed entries requested at a time with --feed, 1 to {MAX_PAGE_SIZE} (default: {DEFAULT_PAGE_SIZE})'
+    )
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=None,
+        help='Maximum downloads in progress with --async (default: 100)'
+    )
+
+    parser.add_argument(
+        '--per-host',
+        type=int,
+        default=None,
+        help='Maximum downloads in progress to each host with --async (default: 8)'
+    )
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=2.0,
+        help='Maximum requests per second to each host, 0 to disable (default: 2.0)'
+    )
+
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=1,
+        help='Number of requests to a host allowed in a burst (default: 1)'
+    )
+
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f'Number of keep-alive connections per host (default: {DEFAULT_POOL_SIZE})'
+    )
+
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f'Number of retries for transient failures (default: {DEFAULT_RETRIES})'
+    )
+
+    args = parser.parse_args()
+
+    # Size the connection pool so that every worker can hold a connection
+    configure_session(pool_size=max(args.pool_size, args.workers), retries=args.retries)
+
     # Get the directory containing this script
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
@@ -197,27 +446,52 @@ def main():
     metadata_file = project_root / 'blogger/posts-metadata.json'
     posts_dir = project_root / 'src/posts'
     
-    # Check for command line arguments
-    if len(sys.argv) > 1:
-        # Check for help
-        if sys.argv[1] in ['-h', '--help']:
-            print("Usage:")
-            print("  python download_posts.py                    # Download all posts from metadata")
-            print("  python download_posts.py <URL>              # Download single URL")
-            print("  python download_posts.py <URL> --overwrite  # Download single URL, overwrite if exists")
-            return
+    if args.feed:
+        # Feed mode - save the posts in the feed and regenerate the metadata
+        if args.url:
+            print("Error: --feed cannot be used with a URL")
+            sys.exit(1)
         
-        # Single URL mode
-        url = sys.argv[1]
-        overwrite = '--overwrite' in sys.argv
+        print(f"Feed mode: {args.blog_url} ({args.page_size} entries per request)")
+        print("Posts will be saved to:", posts_dir)
+        if args.refresh:
+            print("Refresh mode: pages saved from the feed will be replaced if changed")
+        print()
         
+        stats = ingest_feed(args.blog_url, posts_dir, metadata_file, args.page_size, args.refresh)
+        if stats is None:
+            sys.exit(1)
+        
+        print("=" * 50)
+        print("Feed Summary:")
+        print(f"  Saved: {stats['downloaded']}")
+        if args.refresh:
+            print(f"  Not modified: {stats['not_modified']}")
+        print(f"  Skipped: {stats['skipped']}")
+        print(f"  Errors: {stats['error']}")
+        print(f"  Total processed: {sum(stats.values())}")
+        return
+    
+    if args.url:
+        # Single URL mode
         print("Single URL mode")
         print("Posts will be saved to:", posts_dir)
-        if overwrite:
+        if args.overwrite:
             print("Overwrite mode: existing files will be replaced")
+        elif args.refresh:
+            print("Refresh mode: existing files will be replaced if changed")
+        
+        index = open_metadata_index(metadata_file)
+        if index is not None:
+            post = index.get_by_url(args.url)
+            index.close()
+            if post:
+                print(f"Post: {post.get('title', 'Unknown')} ({post.get('date')})")
+            else:
+                print("Note: URL is not in the posts metadata")
         print()
         
-        success = process_single_url(url, posts_dir, overwrite)
+        success = process_single_url(args.url, posts_dir, args.overwrite, args.refresh)
         if success:
             print("Download completed successfully")
         else:
@@ -226,94 +500,65 @@ def main():
     
     # Normal mode - process all posts from metadata
     print(f"Loading metadata from: {metadata_file}")
-    posts_data = load_metadata(metadata_file)
+    index = open_metadata_index(metadata_file)
+    if index is None:
+        sys.exit(1)
+    
+    posts_data = index.all_posts()
+    index.close()
     
     print(f"Found {len(posts_data)} posts to process")
     print("Posts will be saved to:", posts_dir)
-    
-    # Statistics
-    downloaded = 0
-    skipped = 0
-    errors = 0
-    
-    for i, post in enumerate(posts_data, 1):
-        original_url = post.get('originalUrl')
-        title = post.get('title', 'Unknown')
-        
-        if not original_url:
-            print(f"[{i}/{len(posts_data)}] Skipping post with no URL: {title}")
-            skipped += 1
-            continue
+    if args.use_async:
+        # Only import the asyncio downloader, and aiohttp, when used
+        import async_download
         
-        print(f"[{i}/{len(posts_data)}] Processing: {title}")
-        print(f"  URL: {original_url}")
+        if async_download.aiohttp is None:
+            print("Error: --async requires aiohttp, install it with: uv sync --extra async")
+            sys.exit(1)
         
-        # Get basename from URL (without .html extension)
-        basename = get_basename_from_url(original_url)
-        if not basename:
-            print("  Warning: Cannot extract basename from URL, skipping")
-            skipped += 1
-            continue
-        
-        # Check if this is a guide URL (contains /p/ pattern)
-        if is_guide_url(original_url):
-            # For guide URLs, create path: guides/basename/
-            guides_dir = posts_dir.parent / 'guides'
-            subdir = guides_dir / basename
-            print("  Target directory (guide):", subdir)
-        else:
-            # Regular post URL with YYYY/MM pattern
-            year, month = extract_year_month_from_url(original_url)
-            if not year or not month:
-                print("  Warning: Cannot extract year/month from URL, skipping")
-                skipped += 1
-                continue
-            
-            # Create subdirectory path: posts/YYYY/MM/filename/
-            subdir = posts_dir / year / month / basename
-            print("  Target directory (post):", subdir)
-        
-        # Create directory if it doesn't exist
-        if not create_directory_if_not_exists(subdir):
-            errors += 1
-            continue
-        
-        # Save as original.html inside the subdirectory
-        file_path = subdir / "original.html"
-        
-        # Check if file already exists (normal mode never overwrites)
-        if file_path.exists():
-            print(f"  File already exists, skipping: {file_path}")
-            skipped += 1
-            continue
-        
-        # Download the webpage
-        print("  Downloading...")
-        html_content = download_webpage(original_url)
-        
-        if html_content is None:
-            print("  Failed to download")
-            errors += 1
-            continue
-        
-        # Save the content
-        if save_html_content(html_content, file_path):
-            print(f"  Saved: {file_path}")
-            downloaded += 1
-        else:
-            errors += 1
-        
-        # Add a small delay to be respectful to the server
-        time.sleep(0.5)
-        print()
+        concurrency = args.concurrency or async_download.DEFAULT_CONCURRENCY
+        per_host = args.per_host or async_download.DEFAULT_PER_HOST
+        print(f"Asyncio mode: {concurrency} concurrent downloads, {per_host} per host")
+    elif args.workers > 1:
+        print(f"Concurrent mode: {args.workers} workers")
+    if args.refresh:
+        print("Refresh mode: existing files will be replaced if changed")
+    
+    journal = None
+    if not args.no_journal:
+        journal = DownloadJournal(args.journal, args.retry_permanent)
+        if journal.entries and not args.refresh:
+            print(f"Resuming from journal: {args.journal} ({len(journal.entries)} URLs recorded)")
+    print()
+    
+    if args.use_async:
+        stats = async_download.run_download_all_posts(
+            posts_data, posts_dir, concurrency=concurrency, per_host=per_host, rate=args.rate,
+            burst=args.burst, refresh=args.refresh, retries=args.retries, journal=journal)
+    else:
+        stats = download_all_posts(posts_data, posts_dir, args.workers, args.rate, args.burst, args.refresh, journal)
+    
+    if journal:
+        journal.finish()
+    
+    downloaded = stats['downloaded']
+    not_modified = stats['not_modified']
+    skipped = stats['skipped']
+    resumed = stats['resumed']
+    errors = stats['error']
     
     # Print summary
     print("=" * 50)
     print("Download Summary:")
     print(f"  Downloaded: {downloaded}")
+    if args.refresh:
+        print(f"  Not modified: {not_modified}")
     print(f"  Skipped: {skipped}")
+    if journal:
+        print(f"  Resumed from journal: {resumed}")
     print(f"  Errors: {errors}")
-    print(f"  Total processed: {downloaded + skipped + errors}")
+    print(f"  Total processed: {downloaded + not_modified + skipped + resumed + errors}")
 
 
 if __name__ == '__main__':
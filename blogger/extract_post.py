@@ -9,19 +9,207 @@ Usage:
   python extract_post.py                           # Process all posts from metadata
   python extract_post.py <html_file_path>          # Process single HTML file
   python extract_post.py <html_file_path> --overwrite  # Process single file, overwrite existing images
+  python extract_post.py --jobs 8                  # Process all posts using 8 worker processes
+  python extract_post.py --force                   # Process all posts, even if unchanged
+  python extract_post.py --force --profile-slowest 5  # Save profiles of the 5 slowest posts
+  python extract_post.py --watch                   # Re-extract posts as their HTML files change
 """
 
+import contextlib
+import functools
+import io
 import json
+import os
 import sys
+import time
 import argparse
+import cProfile
+import heapq
+import marshal
 from pathlib import Path
-from bs4 import BeautifulSoup
+import importlib.util
 import re
-import html2text
-import requests
 from urllib.parse import urlparse
 import hashlib
 from datetime import datetime
+import image_store
+from post_paths import is_guide_url
+from http_session import configure_session, get_session, get_session_options, DEFAULT_POOL_SIZE, DEFAULT_RETRIES
+
+
+# BeautifulSoup tree builders which can be used to parse pages, in order of
+# preference. lxml is C accelerated and much faster than the pure Python
+# html.parser, but is an optional dependency so html.parser is the fallback.
+PARSER_BACKENDS = ['lxml', 'html.parser']
+
+# Modules each parser backend needs, checked for without importing them
+PARSER_MODULES = {'lxml': 'lxml', 'html.parser': 'html.parser'}
+
+# Classes identifying the elements read by extract_post_data, other than
+# those identified by id or by more than a class, keyed by tag name.
+TARGET_ELEMENT_CLASSES = {
+    'h1': 'title',
+    'h2': 'date-header',
+    'h3': 'post-title',
+    'span': 'fn',
+    'abbr': 'published',
+}
+
+POST_BODY_ID_PATTERN = re.compile(r'post-body-\d+')
+
+# Maximum number of images in a post which are downloaded at the same time.
+# This should not exceed the size of the HTTP session connection pool.
+IMAGE_DOWNLOAD_WORKERS = 8
+
+# Size of the chunks in which images are streamed to disk
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Manifest recording the hash of each extracted HTML file, used to skip
+# posts whose input and extractor code have not changed.
+MANIFEST_FILE = Path(__file__).parent / 'extract-manifest.json'
+
+# Source files which determine the extractor output. Changing any of them
+# changes the extractor version and so invalidates the manifest.
+EXTRACTOR_SOURCES = [Path(__file__)]
+
+# Distributions of the libraries which affect the generated output. Their
+# installed versions are included in the extractor version, read from the
+# package metadata so that checking whether posts are up to date does not
+# need to import them.
+EXTRACTOR_LIBRARIES = ['beautifulsoup4', 'html2text']
+
+# Machine-readable report of the timings of the last batch run
+REPORT_FILE = Path(__file__).parent / 'extract-report.json'
+
+# Directory the profiles of the slowest posts are saved to
+PROFILE_DIR = Path(__file__).parent / 'extract-profiles'
+
+# Stages of processing a post which are timed, in the order they happen
+TIMED_STAGES = ['parse', 'metadata', 'images', 'body', 'comments', 'write']
+
+
+def select_parser(name='auto'):
+    """
+    Select the BeautifulSoup tree builder used to parse pages.
+    
+    Args:
+        name (str): Name of the parser backend, or 'auto' to use the first
+            installed backend from PARSER_BACKENDS
+        
+    Returns:
+        str: Name of the parser backend, or None if it is not installed
+    """
+    candidates = PARSER_BACKENDS if name == 'auto' else [name]
+    
+    # BeautifulSoup is only imported when a page is parsed, so check the
+    # backend is installed without importing it
+    for candidate in candidates:
+        if candidate in PARSER_MODULES and importlib.util.find_spec(PARSER_MODULES[candidate]) is not None:
+            return candidate
+    
+    return None
+
+
+def is_extracted_element(name, attrs):
+    """
+    Determine whether a tag is one of the page regions read by
+    extract_post_data.
+    
+    Args:
+        name (str): Tag name
+        attrs (dict): Raw tag attributes
+        
+    Returns:
+        bool: True if the tag (and its children) should be parsed
+    """
+    # Attribute values may be strings or lists of values depending on the
+    # BeautifulSoup version, so normalise them to a string.
+    def attr(key):
+        value = attrs.get(key) or ''
+        return value if isinstance(value, str) else ' '.join(value)
+    
+    if name == 'title':
+        return True
+    
+    if name == 'div':
+        return (
+            attr('id') == 'comments'
+            or POST_BODY_ID_PATTERN.match(attr('id')) is not None
+            or attr('class') == 'post-footer-line post-footer-line-2'
+        )
+    
+    if name == 'meta':
+        return attr('itemprop') in ('postId', 'blogId') or attr('property') in ('og:title', 'og:description', 'og:url')
+    
+    if name == 'link':
+        return 'canonical' in attr('rel').split()
+    
+    target_class = TARGET_ELEMENT_CLASSES.get(name)
+    if target_class is not None:
+        return target_class in attr('class').split()
+    
+    return False
+
+
+@functools.cache
+def get_region_strainer_class():
+    """
+    Get the SoupStrainer subclass which only allows tags matched by
+    is_extracted_element to be created at the top level of the document.
+    
+    The class is made on first use so that BeautifulSoup is not imported
+    until a page is parsed.
+    
+    Returns:
+        type: SoupStrainer subclass
+    """
+    from bs4 import SoupStrainer
+    
+    class ExtractedRegionStrainer(SoupStrainer):
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            # Hook used by BeautifulSoup 4.13 and later
+            return is_extracted_element(name, attrs or {})
+        
+        def search_tag(self, markup_name=None, markup_attrs={}):
+            # Hook used by BeautifulSoup versions before 4.13
+            return is_extracted_element(markup_name, markup_attrs or {})
+    
+    return ExtractedRegionStrainer
+
+
+def create_region_strainer():
+    """
+    Create a SoupStrainer which only allows tags matched by
+    is_extracted_element to be created at the top level of the document.
+    Anything nested inside a matched tag is always parsed.
+    
+    Returns:
+        SoupStrainer: Strainer to pass as parse_only
+    """
+    return get_region_strainer_class()()
+
+
+def parse_html(html_content, parser=None, targeted=True):
+    """
+    Parse a Blogger page with BeautifulSoup.
+    
+    A targeted parse only builds the parts of the tree which are read by
+    extract_post_data, skipping the sidebar, widgets and scripts which make
+    up most of the page.
+    
+    Args:
+        html_content (str): HTML content of the page
+        parser (str): BeautifulSoup tree builder to use, or None to select
+            the fastest available
+        targeted (bool): Whether to only parse the regions that are needed
+        
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    from bs4 import BeautifulSoup
+    
+    parse_only = create_region_strainer() if targeted else None
+    return BeautifulSoup(html_content, parser or select_parser(), parse_only=parse_only)
 
 
 def convert_date_to_iso(date_text):
@@ -59,10 +247,41 @@ def convert_date_to_iso(date_text):
     return date_text
 
 
+def get_image_filename(image_url):
+    """
+    Get the local filename for an image, which is based on a hash of its
+    URL but keeps the original file extension.
+    
+    Args:
+        image_url (str): URL of the image
+        
+    Returns:
+        str: Local filename of the image
+    """
+    # Parse the URL to get the original file extension
+    parsed_url = urlparse(image_url)
+    original_filename = Path(parsed_url.path).name
+    
+    # Extract file extension, default to .png if none found
+    if original_filename and '.' in original_filename:
+        file_extension = Path(original_filename).suffix
+    else:
+        file_extension = '.png'
+    
+    # Always generate filename using MD5 hash for consistency, but preserve extension
+    url_hash = hashlib.md5(image_url.encode('utf-8')).hexdigest()[:8]
+    return f"image_{url_hash}{file_extension}"
+
+
 def download_image(image_url, output_dir, overwrite=False):
     """
     Download an image from a URL and save it to the output directory.
     
+    The image is streamed into the image download cache and copied into the
+    output directory. An image already in the cache for the same URL is not
+    downloaded again. An existing file which does not match the size and
+    checksum recorded for the URL is downloaded again.
+    
     Args:
         image_url (str): URL of the image to download
         output_dir (Path): Directory to save the image to
@@ -72,33 +291,39 @@ def download_image(image_url, output_dir, overwrite=False):
         str: Local filename of the downloaded image, or None if download failed
     """
     try:
-        # Parse the URL to get the original file extension
-        parsed_url = urlparse(image_url)
-        original_filename = Path(parsed_url.path).name
-        
-        # Extract file extension, default to .png if none found
-        if original_filename and '.' in original_filename:
-            file_extension = Path(original_filename).suffix
-        else:
-            file_extension = '.png'
-        
-        # Always generate filename using MD5 hash for consistency, but preserve extension
-        url_hash = hashlib.md5(image_url.encode('utf-8')).hexdigest()[:8]
-        filename = f"image_{url_hash}{file_extension}"
+        filename = get_image_filename(image_url)
+        file_extension = Path(filename).suffix
         
-        # Check if file already exists
+        # Check if file already exists, and is complete if it was recorded
         output_path = output_dir / filename
+        record = image_store.lookup_url(image_url)
         if output_path.exists() and not overwrite:
-            print(f"Image already exists, skipping: {filename}")
+            if record is None or image_store.is_image_complete(output_path, record):
+                print(f"Image already exists, skipping: {filename}")
+                return filename
+            print(f"Image is incomplete, downloading again: {filename}")
+        
+        # Reuse the image if another post already downloaded the same URL
+        if record is not None and not overwrite:
+            image_store.copy_file(image_store.get_record_path(record), output_path)
+            print(f"Image found in download cache: {filename}")
             return filename
         
-        # Download the image
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
+        # Download the image, streaming it into the download cache
+        with get_session().get(image_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            
+            # Content-Length only gives the size of the image if not encoded
+            expected_size = None
+            if 'Content-Encoding' not in response.headers and 'Content-Length' in response.headers:
+                expected_size = int(response.headers['Content-Length'])
+            
+            record = image_store.add_image_stream(
+                response.iter_content(chunk_size=IMAGE_CHUNK_SIZE), file_extension, expected_size)
         
-        # Save to output directory
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        # Record the download and copy the image into the output directory
+        image_store.record_url(image_url, record)
+        image_store.copy_file(image_store.get_record_path(record), output_path)
         
         return filename
     except Exception as e:
@@ -106,177 +331,250 @@ def download_image(image_url, output_dir, overwrite=False):
         return None
 
 
-def extract_and_download_images(content_element, output_dir, overwrite=False):
+def extract_and_download_images(content_element, output_dir, overwrite=False, workers=IMAGE_DOWNLOAD_WORKERS,
+                                failed_images=None):
     """
     Extract image URLs from content and download them.
     
+    Images are downloaded concurrently using a bounded pool of threads so a
+    slow image does not hold up the others. The image references are then
+    updated in document order, so the result does not depend on the order
+    in which the downloads complete. Images which cannot be downloaded
+    keep their remote URL.
+    
     Args:
         content_element: BeautifulSoup element containing the content
         output_dir (Path): Directory to save images to
         overwrite (bool): Whether to overwrite existing image files
+        workers (int): Maximum number of images to download at once
+        failed_images (list): If given, the URLs of images which could not
+            be downloaded are added to it
         
     Returns:
-        tuple: (markdown_content, list of downloaded image filenames)
+        list: Downloaded image filenames, in document order
     """
     # Find all images in the content
-    images = content_element.find_all('img')
+    images = [img for img in content_element.find_all('img') if img.get('src')]
     downloaded_images = []
     
-    # Download each image and update the content
+    if not images:
+        return downloaded_images
+    
+    # Download each distinct image URL once, even if used more than once
+    image_urls = list(dict.fromkeys(img['src'] for img in images))
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(image_urls)))) as executor:
+        local_filenames = dict(zip(image_urls, executor.map(
+            lambda image_url: download_image(image_url, output_dir, overwrite), image_urls)))
+    
+    # Update each image to point to the local file
     for img in images:
-        src = img.get('src')
-        if src:
-            # Download the image
-            local_filename = download_image(src, output_dir, overwrite)
-            if local_filename:
-                downloaded_images.append(local_filename)
-                # Update the src to point to the local file
-                img['src'] = local_filename
+        local_filename = local_filenames[img['src']]
+        if local_filename:
+            downloaded_images.append(local_filename)
+            img['src'] = local_filename
+    
+    if failed_images is not None:
+        failed_images.extend(image_url for image_url, local_filename in local_filenames.items() if not local_filename)
     
     return downloaded_images
 
 
-def convert_blog_urls_to_relative(markdown_content):
+class MarkdownConverter:
     """
-    Convert blog URLs in markdown links to relative paths.
-    
-    Converts URLs like:
-    [text](http://blog.dscpl.com.au/2015/12/running-ipython-as-docker-container.html)
-    to:
-    [text](/posts/2015/12/running-ipython-as-docker-container/)
-    
-    And guide URLs like:
-    [text](http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html)
-    to:
-    [text](/guides/decorators-and-monkey-patching/)
-    
-    Args:
-        markdown_content (str): The markdown content to process
-        
-    Returns:
-        str: Markdown content with converted URLs
+    Converts HTML to Markdown using html2text with the settings used for
+    both post content and comments.
+    
+    An html2text parser holds state from the document it converted, so a
+    new one is created for each conversion. Creating one is cheap compared
+    to the conversion itself, and converting the comments of a post in a
+    single joined pass was measured to be slower, not faster, since
+    html2text then works on a longer document. See
+    `python benchmark.py comments`.
     """
-    # Pattern to match markdown links with regular blog URLs (YYYY/MM pattern)
-    regular_pattern = r'\[([^\]]+)\]\((https?://blog\.dscpl\.com\.au/(\d{4})/(\d{2})/([^/]+)\.html)\)'
-    
-    def replace_regular_url(match):
-        link_text = match.group(1)
-        year = match.group(3)
-        month = match.group(4)
-        post_slug = match.group(5)
-        
-        # Convert to relative path format
-        relative_path = f"/posts/{year}/{month}/{post_slug}/"
-        return f"[{link_text}]({relative_path})"
     
-    # Pattern to match markdown links with guide URLs (/p/ pattern)
-    guide_pattern = r'\[([^\]]+)\]\((https?://blog\.dscpl\.com\.au/p/([^/]+)\.html)\)'
+    # Options applied to each html2text parser
+    OPTIONS = {
+        'ignore_links': False,  # Keep links
+        'ignore_images': False,  # Keep images
+        'ignore_emphasis': False,  # Keep bold/italic formatting
+        'body_width': 0,  # Don't wrap lines
+        'unicode_snob': True,  # Use unicode characters
+        'escape_snob': True,  # Escape special characters
+    }
     
-    def replace_guide_url(match):
-        link_text = match.group(1)
-        guide_slug = match.group(3)
+    def create_parser(self):
+        """Create a new html2text parser with the converter's options."""
+        import html2text
         
-        # Convert to relative path format
-        relative_path = f"/guides/{guide_slug}/"
-        return f"[{link_text}]({relative_path})"
+        parser = html2text.HTML2Text()
+        for name, value in self.OPTIONS.items():
+            setattr(parser, name, value)
+        return parser
     
-    # Replace regular post URLs
-    converted_content = re.sub(regular_pattern, replace_regular_url, markdown_content)
-    
-    # Replace guide URLs
-    converted_content = re.sub(guide_pattern, replace_guide_url, converted_content)
+    def convert(self, html_content):
+        """
+        Convert HTML content to Markdown.
+        
+        Args:
+            html_content (str): HTML content to convert
+            
+        Returns:
+            str: Markdown content with surrounding whitespace stripped
+        """
+        return self.create_parser().handle(html_content).strip()
+
+
+# Converter shared by all posts and comments
+markdown_converter = MarkdownConverter()
+
+
+# Blog post and guide URLs, such as:
+#   http://blog.dscpl.com.au/2015/12/running-ipython-as-docker-container.html
+#   http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html
+# The year and month groups are only set for posts.
+BLOG_HOST = 'blog.dscpl.com.au'
+BLOG_URL_PREFIX = r'https?://blog\.dscpl\.com\.au/'
+
+# Plain blog URL which is not the target of a markdown link. The slug
+# cannot contain '[' so that it never runs into the text of a link.
+PLAIN_BLOG_URL = (
+    r'(?<!\]\()' + BLOG_URL_PREFIX +
+    r'(?:(?P<plain_year>\d{4})/(?P<plain_month>\d{2})|p)/(?P<plain_slug>[^/\s\[]+)\.html(?!\))'
+)
+
+# Markdown link to a blog URL
+LINKED_BLOG_URL = (
+    r'\[(?P<text>[^\]]+)\]\(' + BLOG_URL_PREFIX +
+    r'(?:(?P<year>\d{4})/(?P<month>\d{2})|p)/(?P<slug>[^/]+)\.html\)'
+)
+
+PLAIN_BLOG_URL_PATTERN = re.compile(PLAIN_BLOG_URL)
+BLOG_URL_PATTERN = re.compile(f"{LINKED_BLOG_URL}|{PLAIN_BLOG_URL}")
+
+
+def get_relative_blog_path(year, month, slug):
+    """Get the relative path of a post, or of a guide if year is None."""
+    if year is None:
+        return f"/guides/{slug}/"
+    return f"/posts/{year}/{month}/{slug}/"
+
+
+def replace_blog_url(match):
+    """Replace a match of BLOG_URL_PATTERN or PLAIN_BLOG_URL_PATTERN."""
+    if match.group('plain_slug') is not None:
+        relative_path = get_relative_blog_path(
+            match.group('plain_year'), match.group('plain_month'), match.group('plain_slug'))
+        return f"[{relative_path}]({relative_path})"
     
-    return converted_content
+    # Plain URLs in the link text are converted too
+    link_text = PLAIN_BLOG_URL_PATTERN.sub(replace_blog_url, match.group('text'))
+    relative_path = get_relative_blog_path(match.group('year'), match.group('month'), match.group('slug'))
+    return f"[{link_text}]({relative_path})"
 
 
-def convert_plain_blog_urls_to_markdown_links(markdown_content):
+def convert_blog_urls(markdown_content):
     """
-    Convert plain blog URLs to markdown links.
+    Convert blog URLs to relative paths in a single pass.
     
-    Converts URLs like:
-    http://blog.dscpl.com.au/2014/12/hosting-python-wsgi-applications-using.html
+    Converts markdown links like:
+    [text](http://blog.dscpl.com.au/2015/12/running-ipython-as-docker-container.html)
     to:
-    [/posts/2014/12/hosting-python-wsgi-applications-using/](/posts/2014/12/hosting-python-wsgi-applications-using/)
+    [text](/posts/2015/12/running-ipython-as-docker-container/)
     
     And guide URLs like:
-    http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html
+    [text](http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html)
     to:
-    [/guides/decorators-and-monkey-patching/](/guides/decorators-and-monkey-patching/)
+    [text](/guides/decorators-and-monkey-patching/)
+    
+    Plain URLs, not already in markdown links, are converted to links like:
+    [/posts/2014/12/hosting-python-wsgi-applications-using/](/posts/2014/12/hosting-python-wsgi-applications-using/)
     
     Args:
         markdown_content (str): The markdown content to process
         
     Returns:
-        str: Markdown content with plain URLs converted to markdown links
+        str: Markdown content with converted URLs
     """
-    # Pattern to match plain regular blog URLs (not already in markdown links)
-    # This regex uses negative lookbehind and lookahead to ensure the URL is not already in a markdown link
-    regular_pattern = r'(?<!\]\()(https?://blog\.dscpl\.com\.au/(\d{4})/(\d{2})/([^/\s]+)\.html)(?!\))'
-    
-    def replace_regular_plain_url(match):
-        year = match.group(2)
-        month = match.group(3)
-        post_slug = match.group(4)
-        
-        # Convert to relative path format
-        relative_path = f"/posts/{year}/{month}/{post_slug}/"
-        return f"[{relative_path}]({relative_path})"
-    
-    # Pattern to match plain guide URLs (not already in markdown links)
-    guide_pattern = r'(?<!\]\()(https?://blog\.dscpl\.com\.au/p/([^/\s]+)\.html)(?!\))'
-    
-    def replace_guide_plain_url(match):
-        guide_slug = match.group(2)
-        
-        # Convert to relative path format
-        relative_path = f"/guides/{guide_slug}/"
-        return f"[{relative_path}]({relative_path})"
-    
-    # Replace regular post URLs
-    converted_content = re.sub(regular_pattern, replace_regular_plain_url, markdown_content)
-    
-    # Replace guide URLs
-    converted_content = re.sub(guide_pattern, replace_guide_plain_url, converted_content)
+    # Most comments do not mention the blog at all
+    if BLOG_HOST not in markdown_content:
+        return markdown_content
     
-    return converted_content
+    return BLOG_URL_PATTERN.sub(replace_blog_url, markdown_content)
 
 
-def should_be_code_block(quoted_lines):
+# Patterns for lines of a quoted section which suggest it is code, combined
+# so that each line is only searched once. These match code indentation (4+
+# spaces after >), nested quote characters, command prompts, and Python,
+# Dockerfile and shell command keywords.
+CODE_LINE_PATTERN = re.compile(
+    r'^>\s{4,}'
+    r'|^>\s+>'
+    r'|[$#]\s|>>>\s|bash-\d+\.\d+\$'
+    r'|\b(?:def|class|import|from|if|for|while|try|except|with)\s'
+    r'|\b(?:FROM|RUN|COPY|WORKDIR|USER|ENV|EXPOSE|CMD|ENTRYPOINT)\s'
+    r'|\b(?:ls|cd|mkdir|rm|cp|mv|chmod|chown|apt-get|yum|pip|npm)\s'
+)
+
+
+class QuotedSection:
+    """
+    Collects the lines of a quoted section, determining whether it should
+    be converted to a code block and preparing the code lines as each line
+    is added, so the section is only processed once.
     """
-    Determine if a quoted section should be converted to a code block.
     
-    Args:
-        quoted_lines (list): List of lines from a quoted section
+    def __init__(self):
+        self.lines = []
+        self.code_lines = []
+        self.is_code = False
+        self.consecutive_blanks = 0
+    
+    def add(self, line):
+        """
+        Add the next line of the quoted section.
         
-    Returns:
-        bool: True if this should be converted to a code block
-    """
-    for line in quoted_lines:
-        # Check for code indentation pattern (4+ spaces after >)
-        if re.match(r'^>\s{4,}.*', line):
-            return True
+        Args:
+            line (str): Line starting with '>'
+        """
+        self.lines.append(line)
+        
+        # Once any line looks like code the whole section is code
+        if not self.is_code and CODE_LINE_PATTERN.search(line):
+            self.is_code = True
         
-        # Check for nested quote characters
-        if re.match(r'^>\s+>.*', line):
-            return True
+        # Collapse internal blank lines (before fixing indentation)
+        if line == ">     ":
+            self.consecutive_blanks += 1
+            if self.consecutive_blanks <= 1:  # Allow only one blank line
+                self.code_lines.append("")
+        else:
+            self.consecutive_blanks = 0
+            # Remove all quote levels while preserving indentation
+            self.code_lines.append(remove_all_quote_levels(line))
+    
+    def get_result_lines(self):
+        """
+        Get the lines which replace the quoted section.
         
-        # Check for command prompts
-        if re.search(r'[$#]\s|>>>\s|bash-\d+\.\d+\$', line):
-            return True
+        Returns:
+            list: A fenced code block if the section looks like code, which
+                is empty if there is no actual content, otherwise the
+                original quoted lines
+        """
+        if not self.is_code:
+            return self.lines
         
-        # Check for code patterns
-        if re.search(r'\b(def|class|import|from|if|for|while|try|except|with)\s', line):
-            return True
+        code_content = trim_blank_lines(self.code_lines)
+        if not code_content:
+            return []
         
-        # Check for Dockerfile patterns
-        if re.search(r'\b(FROM|RUN|COPY|WORKDIR|USER|ENV|EXPOSE|CMD|ENTRYPOINT)\s', line):
-            return True
+        # language = detect_language(code_content)
+        language = ""
         
-        # Check for shell command patterns
-        if re.search(r'\b(ls|cd|mkdir|rm|cp|mv|chmod|chown|apt-get|yum|pip|npm)\s', line):
-            return True
-    
-    return False
+        return ["```" + language] + code_content + ["```"]
 
 
 def remove_quote_prefix(line):
@@ -366,44 +664,133 @@ def trim_blank_lines(lines):
     Returns:
         list: List of lines with leading/trailing blanks removed
     """
-    # Remove leading blank lines
-    while lines and not lines[0].strip():
-        lines.pop(0)
+    start = 0
+    end = len(lines)
+    
+    # Skip leading blank lines
+    while start < end and not lines[start].strip():
+        start += 1
     
-    # Remove trailing blank lines
-    while lines and not lines[-1].strip():
-        lines.pop()
+    # Skip trailing blank lines
+    while end > start and not lines[end - 1].strip():
+        end -= 1
     
-    return lines
+    return lines[start:end]
 
 
-def convert_quoted_to_code(quoted_lines):
+def iter_lines(content):
     """
-    Convert quoted lines to clean code lines.
+    Iterate over the lines of content, as split on newlines, without first
+    making a list of all of them.
     
     Args:
-        quoted_lines (list): List of quoted lines
+        content (str): Text to split
         
-    Returns:
-        list: List of cleaned code lines
+    Yields:
+        str: Each line without its newline
+    """
+    start = 0
+    while True:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+
+def iter_code_blocks(lines):
     """
-    code_lines = []
-    consecutive_blanks = 0
+    Convert problematic quoted sections to proper markdown code blocks.
     
-    for line in quoted_lines:
-        # Collapse internal blank lines (before fixing indentation)
-        if line == ">     ":
-            consecutive_blanks += 1
-            if consecutive_blanks <= 1:  # Allow only one blank line
-                code_lines.append("")
+    A quoted section starts with a line containing just "> " and continues
+    while lines start with ">". Each line is only processed once, and only
+    the current quoted section is held in memory, so this takes linear
+    time even for large pasted logs or code.
+    
+    Args:
+        lines (iterable): Lines of markdown content
+        
+    Yields:
+        str: Lines with quoted sections converted to code blocks
+    """
+    quoted_section = None
+    
+    for line in lines:
+        if quoted_section is not None:
+            # Collect all consecutive quoted lines
+            if line.startswith('>'):
+                quoted_section.add(line)
+                continue
+            
+            yield from quoted_section.get_result_lines()
+            quoted_section = None
+        
+        if line == "> ":
+            # Found start of quoted section
+            quoted_section = QuotedSection()
+            quoted_section.add(line)
         else:
-            consecutive_blanks = 0
-            # Remove all quote levels while preserving indentation
-            clean_line = remove_all_quote_levels(line)
-            code_lines.append(clean_line)
+            yield line
+    
+    if quoted_section is not None:
+        yield from quoted_section.get_result_lines()
+
+
+def iter_blog_url_paragraphs(lines):
+    """
+    Convert blog URLs to relative paths one paragraph at a time.
+    
+    Paragraphs are separated by empty lines, and only the current paragraph
+    is held in memory. The text of a link can span empty lines though, so
+    while a '[' has been seen without a ']' after it the paragraph is not
+    ended, and it runs on until the brackets are closed or, failing that,
+    to the end of the content, as if converting the whole content at once.
+    
+    Args:
+        lines (iterable): Lines of markdown content
+        
+    Yields:
+        str: Each paragraph with converted URLs, including the newline
+            after its empty line, so they join to the whole content
+    """
+    paragraph = []
+    unclosed = False
+    
+    for line in lines:
+        # A paragraph ends with an empty line, once another line follows
+        if paragraph and not paragraph[-1] and not unclosed:
+            yield convert_blog_urls('\n'.join(paragraph)) + '\n'
+            paragraph = []
+        
+        paragraph.append(line)
+        
+        # Whether the last bracket seen opens link text not yet closed
+        opening, closing = line.rfind('['), line.rfind(']')
+        if opening != closing:
+            unclosed = opening > closing
+    
+    yield convert_blog_urls('\n'.join(paragraph))
+
+
+def postprocess_markdown(markdown_content):
+    """
+    Post-process Markdown from html2text, converting problematic quoted
+    sections to code blocks and blog URLs to relative paths.
     
-    # Remove leading/trailing blank lines
-    return trim_blank_lines(code_lines)
+    The stages are chained generators, so the content is streamed through
+    them a line or paragraph at a time rather than each stage making a
+    full copy of the content.
+    
+    Args:
+        markdown_content (str): Markdown content to process
+        
+    Returns:
+        str: Processed markdown content
+    """
+    lines = iter_lines(markdown_content)
+    lines = iter_code_blocks(lines)
+    return ''.join(iter_blog_url_paragraphs(lines))
 
 
 def convert_quoted_sections_to_code_blocks(content):
@@ -416,41 +803,7 @@ def convert_quoted_sections_to_code_blocks(content):
     Returns:
         str: Processed markdown content with quoted sections converted to code blocks
     """
-    lines = content.split('\n')
-    result_lines = []
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i]
-
-        if line == "> ":
-            # Found start of quoted section
-            quoted_section = []
-            
-            # Collect all consecutive quoted lines
-            while i < len(lines) and lines[i].startswith('>'):
-                quoted_section.append(lines[i])
-                i += 1
-            
-            # Analyze if this should be a code block
-            if should_be_code_block(quoted_section):
-                # Convert to code block
-                code_content = convert_quoted_to_code(quoted_section)
-                if code_content:  # Only add if there's actual content
-                    # language = detect_language(code_content)
-                    language = ""
-                    
-                    result_lines.append("```" + language)
-                    result_lines.extend(code_content)
-                    result_lines.append("```")
-            else:
-                # Keep as regular quoted section
-                result_lines.extend(quoted_section)
-        else:
-            result_lines.append(line)
-            i += 1
-    
-    return '\n'.join(result_lines)
+    return '\n'.join(iter_code_blocks(iter_lines(content)))
 
 
 def escape_yaml_string(text):
@@ -469,181 +822,432 @@ def escape_yaml_string(text):
     return text.replace("\\", "\\\\").replace('"', '\\"')
 
 
-def create_markdown_file(post_data, output_path):
+def write_if_changed(output_path, content):
     """
-    Create a standalone Markdown file with YAML front matter for 11ty/Hugo.
+    Write content to a file only if it differs from what the file already
+    holds, so that unchanged files keep their modification time and are
+    not rebuilt by Eleventy. The file is replaced atomically, so it is never
+    left partly written.
     
     Args:
-        post_data (dict): Extracted post data
-        output_path (Path): Path for the Markdown file
-    """
-    with open(output_path, 'w', encoding='utf-8') as f:
-        # Write YAML front matter
-        f.write("---\n")
-        
-        # Determine layout based on URL - guides use "guide" layout, posts use "post" layout
-        if post_data.get('url') and is_guide_url(post_data['url']):
-            f.write("layout: guide\n")
-        else:
-            f.write("layout: post\n")
-            
-        f.write(f"title: \"{escape_yaml_string(post_data['title'])}\"\n")
-        
-        # Only write author if it's not empty
-        if post_data.get('author') and post_data['author'].strip():
-            f.write(f"author: \"{escape_yaml_string(post_data['author'])}\"\n")
-        
-        # Only write date if it's not empty
-        if post_data.get('date') and post_data['date'].strip():
-            f.write(f"date: \"{escape_yaml_string(post_data['date'])}\"\n")
-        
-        f.write(f"url: \"{escape_yaml_string(post_data['url'])}\"\n")
-        
-        # Add post ID and blog ID if available
-        if post_data.get('post_id'):
-            f.write(f"post_id: \"{escape_yaml_string(post_data['post_id'])}\"\n")
-        if post_data.get('blog_id'):
-            f.write(f"blog_id: \"{escape_yaml_string(post_data['blog_id'])}\"\n")
-        
-        # Add labels as tags if any
-        if post_data['labels']:
-            f.write(f"tags: {post_data['labels']}\n")
-        
-        # Add downloaded images if any
-        if post_data.get('downloaded_images'):
-            f.write(f"images: {post_data['downloaded_images']}\n")
-        
-        # Add comment count
-        f.write(f"comments: {len(post_data['comments'])}\n")
-        
-        # Add metadata if available
-        if post_data.get('metadata'):
-            metadata = post_data['metadata']
-            if metadata.get('published_timestamp'):
-                f.write(f"published_timestamp: \"{escape_yaml_string(metadata['published_timestamp'])}\"\n")
-            if metadata.get('blog_title'):
-                f.write(f"blog_title: \"{escape_yaml_string(metadata['blog_title'])}\"\n")
+        output_path (Path): Path of the file
+        content (str): Text to write
         
-        f.write("---\n\n")
-        
-        # Write the content
-        f.write(post_data['content'])
-        
-        # Write comments if any
-        if post_data['comments']:
-            f.write("\n\n---\n\n## Comments\n\n")
-            for comment in post_data['comments']:
-                f.write(f"### {comment['author']} - {comment['timestamp']}\n\n")
-                f.write(f"{comment['content']}\n\n")
+    Returns:
+        bool: True if the file was written, False if it was unchanged
+    """
+    # Files are written with the platform's line endings, so compare
+    # against the content as it would be written
+    expected = content.replace('\n', os.linesep) if os.linesep != '\n' else content
+    
+    try:
+        with open(output_path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == expected:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    
+    temp_file = output_path.with_name(output_path.name + '.tmp')
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_file, output_path)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
+    
+    return True
 
 
-def extract_post_data(html_file_path, overwrite=False):
+def render_markdown(post_data):
     """
-    Extract blog post data from an HTML file.
+    Render a standalone Markdown file with YAML front matter for 11ty/Hugo.
     
     Args:
-        html_file_path (str): Path to the HTML file
-        overwrite (bool): Whether to overwrite existing image files
+        post_data (dict): Extracted post data
         
     Returns:
-        dict: Extracted post data
+        str: Content of the Markdown file
     """
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    f = io.StringIO()
     
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Write YAML front matter
+    f.write("---\n")
     
-    # Initialize the result dictionary
-    post_data = {
-        'title': None,
-        'content': None,
-        'date': None,
-        'author': None,
-        'url': None,
-        'post_id': None,
-        'blog_id': None,
-        'comments': [],
-        'labels': [],
-        'metadata': {}
-    }
+    # Determine layout based on URL - guides use "guide" layout, posts use "post" layout
+    if post_data.get('url') and is_guide_url(post_data['url']):
+        f.write("layout: guide\n")
+    else:
+        f.write("layout: post\n")
+        
+    f.write(f"title: \"{escape_yaml_string(post_data['title'])}\"\n")
     
-    # Extract title
-    title_element = soup.find('h3', class_='post-title entry-title')
-    if title_element:
-        post_data['title'] = title_element.get_text(strip=True)
+    # Only write author if it's not empty
+    if post_data.get('author') and post_data['author'].strip():
+        f.write(f"author: \"{escape_yaml_string(post_data['author'])}\"\n")
     
-    # Extract content and convert HTML to Markdown
-    content_element = soup.find('div', id=re.compile(r'post-body-\d+'))
-    if content_element:
-        # Download images and update references
-        output_dir = Path(html_file_path).parent
-        downloaded_images = extract_and_download_images(content_element, output_dir, overwrite)
-        post_data['downloaded_images'] = downloaded_images
+    # Only write date if it's not empty
+    if post_data.get('date') and post_data['date'].strip():
+        f.write(f"date: \"{escape_yaml_string(post_data['date'])}\"\n")
+    
+    f.write(f"url: \"{escape_yaml_string(post_data['url'])}\"\n")
+    
+    # Add post ID and blog ID if available
+    if post_data.get('post_id'):
+        f.write(f"post_id: \"{escape_yaml_string(post_data['post_id'])}\"\n")
+    if post_data.get('blog_id'):
+        f.write(f"blog_id: \"{escape_yaml_string(post_data['blog_id'])}\"\n")
+    
+    # Add labels as tags if any
+    if post_data['labels']:
+        f.write(f"tags: {post_data['labels']}\n")
+    
+    # Add downloaded images if any
+    if post_data.get('downloaded_images'):
+        f.write(f"images: {post_data['downloaded_images']}\n")
+    
+    # Add comment count
+    f.write(f"comments: {len(post_data['comments'])}\n")
+    
+    # Add metadata if available
+    if post_data.get('metadata'):
+        metadata = post_data['metadata']
+        if metadata.get('published_timestamp'):
+            f.write(f"published_timestamp: \"{escape_yaml_string(metadata['published_timestamp'])}\"\n")
+        if metadata.get('blog_title'):
+            f.write(f"blog_title: \"{escape_yaml_string(metadata['blog_title'])}\"\n")
+    
+    f.write("---\n\n")
+    
+    # Write the content
+    f.write(post_data['content'])
+    
+    # Write comments if any
+    if post_data['comments']:
+        f.write("\n\n---\n\n## Comments\n\n")
+        for comment in post_data['comments']:
+            f.write(f"### {comment['author']} - {comment['timestamp']}\n\n")
+            f.write(f"{comment['content']}\n\n")
+    
+    return f.getvalue()
+
+
+def create_markdown_file(post_data, output_path):
+    """
+    Create a standalone Markdown file with YAML front matter for 11ty/Hugo,
+    leaving the file untouched if its content would not change.
+    
+    Args:
+        post_data (dict): Extracted post data
+        output_path (Path): Path for the Markdown file
         
-        # Convert HTML to Markdown with better code block handling
-        h = html2text.HTML2Text()
-        h.ignore_links = False  # Keep links
-        h.ignore_images = False  # Keep images
-        h.ignore_emphasis = False  # Keep bold/italic formatting
-        h.body_width = 0  # Don't wrap lines
-        h.unicode_snob = True  # Use unicode characters
-        h.escape_snob = True  # Escape special characters
+    Returns:
+        bool: True if the file was written, False if it was unchanged
+    """
+    return write_if_changed(output_path, render_markdown(post_data))
+
+
+def iter_comment_elements(comments_block):
+    """
+    Pair each comment author element in a comments block with the body and
+    footer elements which follow it.
+    
+    The block is a dl with a dt for each comment author followed by dd
+    elements for the comment body and footer. Its children are walked once
+    in order, rather than searching forward through the document from each
+    author for the next body and footer, and a comment missing its body or
+    footer does not pick up those of the next comment.
+    
+    Args:
+        comments_block: BeautifulSoup element for dl#comments-block
+        
+    Yields:
+        tuple: (author_element, body_element, footer_element), with the
+            body and footer being None if the comment has none
+    """
+    author_element = body_element = footer_element = None
+    
+    for child in comments_block.find_all(['dt', 'dd'], recursive=False):
+        classes = child.get('class', [])
+        
+        if child.name == 'dt':
+            if author_element is not None:
+                yield author_element, body_element, footer_element
+            
+            author_element = child if 'comment-author' in classes else None
+            body_element = footer_element = None
+        elif author_element is None:
+            continue
+        elif body_element is None and 'comment-body' in classes:
+            body_element = child
+        elif footer_element is None and 'comment-footer' in classes:
+            footer_element = child
+    
+    if author_element is not None:
+        yield author_element, body_element, footer_element
+
+
+def matches_attribute(value, expected):
+    """
+    Check whether a tag attribute value matches, the way BeautifulSoup's
+    find() does for attribute filters.
+    
+    Args:
+        value: Attribute value, a list for multi-valued attributes such as
+            class and rel, or None if the attribute is missing
+        expected: String to compare with, or compiled pattern to search for
+        
+    Returns:
+        bool: True if the value matches
+    """
+    if value is None:
+        return False
+    
+    if isinstance(value, list):
+        # A multi-valued attribute matches any one of its values, or all
+        # of them written out as in the document
+        return any(matches_attribute(item, expected) for item in value) or matches_attribute(' '.join(value), expected)
+    
+    if isinstance(expected, re.Pattern):
+        return expected.search(value) is not None
+    
+    return value == expected
+
+
+class MetadataCollector:
+    """
+    Finds the elements of a page read by extract_post_data in a single walk
+    over the document, in place of a separate soup.find() for each, most of
+    which would search through the post body and comments.
+    
+    Each field is the first element in document order matching its rule,
+    the same element soup.find() would return, and the walk stops once
+    every field has been found. See `python benchmark.py metadata`.
+    """
+    
+    # Rules for each field as (field, attribute, expected value) keyed by
+    # tag name, a rule without an attribute matching any tag of that name
+    RULES = {
+        'title': [('page_title', None, None)],
+        'h1': [('blog_title', 'class', 'title')],
+        'h2': [('date', 'class', 'date-header')],
+        'h3': [('title', 'class', 'post-title entry-title')],
+        'span': [('author', 'class', 'fn')],
+        'abbr': [('published', 'class', 'published')],
+        'link': [('canonical', 'rel', 'canonical')],
+        'meta': [
+            ('post_id', 'itemprop', 'postId'),
+            ('blog_id', 'itemprop', 'blogId'),
+            ('og_title', 'property', 'og:title'),
+            ('og_description', 'property', 'og:description'),
+            ('og_url', 'property', 'og:url'),
+        ],
+        'div': [
+            ('content', 'id', POST_BODY_ID_PATTERN),
+            ('comments', 'id', 'comments'),
+            ('labels', 'class', 'post-footer-line post-footer-line-2'),
+        ],
+    }
+    
+    # Names of all the fields collected
+    FIELDS = [field for rules in RULES.values() for field, _, _ in rules]
+    
+    def __init__(self):
+        self.elements = dict.fromkeys(self.FIELDS)
+        self.remaining = len(self.FIELDS)
+    
+    def visit(self, element):
+        """Record the element against any fields it is the first match for."""
+        for field, attribute, expected in self.RULES.get(element.name, ()):
+            if self.elements[field] is None and (
+                    attribute is None or matches_attribute(element.get(attribute), expected)):
+                self.elements[field] = element
+                self.remaining -= 1
+    
+    def collect(self, soup):
+        """
+        Walk the document, visiting each tag until all fields are found.
         
-        # Get the HTML content and convert to Markdown
-        html_content = str(content_element)
-        markdown_content = h.handle(html_content).strip()
+        Args:
+            soup (BeautifulSoup): Parsed document
+            
+        Returns:
+            dict: Element found for each field, or None if there is none
+        """
+        rules = self.RULES
         
-        # Post-process to convert problematic quoted sections to code blocks
-        markdown_content = convert_quoted_sections_to_code_blocks(markdown_content)
+        for element in soup.descendants:
+            if element.name in rules:
+                self.visit(element)
+                if not self.remaining:
+                    break
         
-        # Convert blog URLs to relative paths
-        markdown_content = convert_blog_urls_to_relative(markdown_content)
+        return self.elements
+
+
+class StageTimer:
+    """
+    Records the wall time spent in each stage of processing a post.
+    
+    Each call to lap() records the time since the previous call, or since
+    the timer was created, against the named stage, so code only needs
+    marking at the end of each stage. Each stage is lapped once per post.
+    """
+    
+    def __init__(self):
+        self.timings = {}
+        self.last_lap = time.perf_counter()
+    
+    def lap(self, stage):
+        """
+        Add the time since the previous lap to a stage.
         
-        # Convert plain blog URLs to markdown links
-        markdown_content = convert_plain_blog_urls_to_markdown_links(markdown_content)
+        Args:
+            stage (str): Name of the stage which has just finished
+        """
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last_lap
+        self.last_lap = now
+
+
+def extract_post_data(html_file_path, overwrite=False, parser=None, targeted=True, timer=None, failed_images=None):
+    """
+    Extract blog post data from an HTML file.
+    
+    Args:
+        html_file_path (str): Path to the HTML file
+        overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use, or None to select
+            the fastest available
+        targeted (bool): Whether to only parse the page regions that are used
+        timer (StageTimer): Timer to record the time of each stage in
+        failed_images (list): If given, the URLs of images which could not
+            be downloaded are added to it
         
-        post_data['content'] = markdown_content
+    Returns:
+        dict: Extracted post data
+    """
+    if timer is None:
+        timer = StageTimer()
+    
+    with open(html_file_path, 'r', encoding='utf-8') as file:
+        html_content = file.read()
+    
+    soup = parse_html(html_content, parser, targeted)
+    timer.lap('parse')
+    
+    # Find the elements the post data is read from in one walk
+    elements = MetadataCollector().collect(soup)
+    
+    # Initialize the result dictionary
+    post_data = {
+        'title': None,
+        'content': None,
+        'date': None,
+        'author': None,
+        'url': None,
+        'post_id': None,
+        'blog_id': None,
+        'comments': [],
+        'labels': [],
+        'metadata': {}
+    }
+    
+    # Extract title
+    title_element = elements['title']
+    if title_element:
+        post_data['title'] = title_element.get_text(strip=True)
     
     # Extract date
-    date_element = soup.find('h2', class_='date-header')
+    date_element = elements['date']
     if date_element:
         date_text = date_element.get_text(strip=True)
         post_data['date'] = convert_date_to_iso(date_text)
     
     # Extract author
-    author_element = soup.find('span', class_='fn')
+    author_element = elements['author']
     if author_element:
         post_data['author'] = author_element.get_text(strip=True)
     
     # Extract canonical URL
-    canonical_link = soup.find('link', rel='canonical')
+    canonical_link = elements['canonical']
     if canonical_link:
         post_data['url'] = canonical_link.get('href')
     
     # Extract post ID and blog ID from meta tags
-    post_meta = soup.find('meta', {'itemprop': 'postId'})
+    post_meta = elements['post_id']
     if post_meta:
         post_data['post_id'] = post_meta.get('content')
     
-    blog_meta = soup.find('meta', {'itemprop': 'blogId'})
+    blog_meta = elements['blog_id']
     if blog_meta:
         post_data['blog_id'] = blog_meta.get('content')
     
     # Extract publication timestamp
-    timestamp_element = soup.find('abbr', class_='published')
+    timestamp_element = elements['published']
     if timestamp_element:
         timestamp = timestamp_element.get('title')
         if timestamp:
             post_data['metadata']['published_timestamp'] = timestamp
     
+    # Extract labels/tags
+    labels_section = elements['labels']
+    if labels_section:
+        labels_links = labels_section.find_all('a', href=re.compile(r'/search/label/'))
+        for label_link in labels_links:
+            post_data['labels'].append(label_link.get_text(strip=True))
+    
+    # Extract additional metadata
+    # Blog title
+    blog_title_element = elements['blog_title']
+    if blog_title_element:
+        post_data['metadata']['blog_title'] = blog_title_element.get_text(strip=True)
+    
+    # Page title
+    title_tag = elements['page_title']
+    if title_tag:
+        post_data['metadata']['page_title'] = title_tag.get_text(strip=True)
+    
+    # Open Graph data
+    og_title = elements['og_title']
+    if og_title:
+        post_data['metadata']['og_title'] = og_title.get('content')
+    
+    og_description = elements['og_description']
+    if og_description:
+        post_data['metadata']['og_description'] = og_description.get('content')
+    
+    og_url = elements['og_url']
+    if og_url:
+        post_data['metadata']['og_url'] = og_url.get('content')
+    
+    timer.lap('metadata')
+    
+    # Extract content and convert HTML to Markdown
+    content_element = elements['content']
+    if content_element:
+        # Download images and update references
+        output_dir = Path(html_file_path).parent
+        downloaded_images = extract_and_download_images(content_element, output_dir, overwrite,
+                                                        failed_images=failed_images)
+        post_data['downloaded_images'] = downloaded_images
+        timer.lap('images')
+        
+        # Get the HTML content and convert to Markdown, then convert
+        # problematic quoted sections to code blocks and blog URLs,
+        # linked or plain, to relative paths
+        markdown_content = markdown_converter.convert(str(content_element))
+        post_data['content'] = postprocess_markdown(markdown_content)
+        timer.lap('body')
+    
     # Extract comments
-    comments_section = soup.find('div', id='comments')
+    comments_section = elements['comments']
     if comments_section:
         # Check if there are actual comments
         comments_block = comments_section.find('dl', id='comments-block')
-        if comments_block and comments_block.find_all('dt'):
+        if comments_block:
             # Extract individual comments
-            for comment_element in comments_block.find_all('dt', class_='comment-author'):
+            for comment_element, content_element, comment_footer in iter_comment_elements(comments_block):
                 comment_data = {
                     'comment_id': None,
                     'author': None,
@@ -681,33 +1285,13 @@ def extract_post_data(html_file_path, overwrite=False):
                             break
                 
                 
-                # Extract comment content and convert HTML to Markdown
-                content_element = comment_element.find_next('dd', class_='comment-body')
+                # Extract comment content and convert HTML to Markdown,
+                # converting quoted sections and blog URLs too
                 if content_element:
-                    # Convert HTML to Markdown for comments too
-                    h = html2text.HTML2Text()
-                    h.ignore_links = False
-                    h.ignore_images = False
-                    h.ignore_emphasis = False
-                    h.body_width = 0
-                    h.unicode_snob = True
-                    h.escape_snob = True
-                    
-                    html_content = str(content_element)
-                    comment_markdown = h.handle(html_content).strip()
-                    
-                    # Convert problematic quoted sections to code blocks in comments too
-                    comment_markdown = convert_quoted_sections_to_code_blocks(comment_markdown)
-                    
-                    # Convert blog URLs to relative paths in comments too
-                    comment_markdown = convert_blog_urls_to_relative(comment_markdown)
-                    
-                    # Convert plain blog URLs to markdown links in comments too
-                    comment_markdown = convert_plain_blog_urls_to_markdown_links(comment_markdown)
-                    comment_data['content'] = comment_markdown
+                    comment_markdown = markdown_converter.convert(str(content_element))
+                    comment_data['content'] = postprocess_markdown(comment_markdown)
                 
                 # Extract comment timestamp and permalink
-                comment_footer = comment_element.find_next('dd', class_='comment-footer')
                 if comment_footer:
                     timestamp_span = comment_footer.find('span', class_='comment-timestamp')
                     if timestamp_span:
@@ -722,161 +1306,226 @@ def extract_post_data(html_file_path, overwrite=False):
             # No comments found
             post_data['comments'] = []
     
-    # Extract labels/tags
-    labels_section = soup.find('div', class_='post-footer-line post-footer-line-2')
-    if labels_section:
-        labels_links = labels_section.find_all('a', href=re.compile(r'/search/label/'))
-        for label_link in labels_links:
-            post_data['labels'].append(label_link.get_text(strip=True))
+    timer.lap('comments')
     
-    # Extract additional metadata
-    # Blog title
-    blog_title_element = soup.find('h1', class_='title')
-    if blog_title_element:
-        post_data['metadata']['blog_title'] = blog_title_element.get_text(strip=True)
+    return post_data
+
+
+def get_extractor_version():
+    """
+    Compute a version string identifying the extractor code.
     
-    # Page title
-    title_tag = soup.find('title')
-    if title_tag:
-        post_data['metadata']['page_title'] = title_tag.get_text(strip=True)
+    The version is a hash of the extractor source files and the installed
+    versions of the libraries which affect the generated output, so any
+    change to the extractor or upgrading a library invalidates previously
+    recorded extractions.
     
-    # Open Graph data
-    og_title = soup.find('meta', property='og:title')
-    if og_title:
-        post_data['metadata']['og_title'] = og_title.get('content')
+    Returns:
+        str: Extractor version hash
+    """
+    global extractor_version
     
-    og_description = soup.find('meta', property='og:description')
-    if og_description:
-        post_data['metadata']['og_description'] = og_description.get('content')
+    if extractor_version is not None:
+        return extractor_version
     
-    og_url = soup.find('meta', property='og:url')
-    if og_url:
-        post_data['metadata']['og_url'] = og_url.get('content')
+    # Only import the package metadata reader when needed
+    import importlib.metadata
     
-    return post_data
+    digest = hashlib.sha256()
+    
+    for source_file in EXTRACTOR_SOURCES:
+        digest.update(source_file.read_bytes())
+    
+    for library in EXTRACTOR_LIBRARIES:
+        try:
+            version = importlib.metadata.version(library)
+        except importlib.metadata.PackageNotFoundError:
+            version = None
+        digest.update(f"{library}={version}\n".encode('utf-8'))
+    
+    extractor_version = digest.hexdigest()[:16]
+    return extractor_version
 
 
-def load_metadata(metadata_file):
-    """Load the posts metadata from JSON file."""
-    try:
-        with open(metadata_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Metadata file '{metadata_file}' not found.")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in metadata file: {e}")
-        return None
+# Cached by get_extractor_version()
+extractor_version = None
 
 
-def extract_year_month_from_url(url):
-    """
-    Extract year and month from URL path.
-    Expected format: http://blog.dscpl.com.au/YYYY/MM/filename.html
-    Returns tuple (year, month) or (None, None) if pattern doesn't match.
+def hash_file(file_path):
     """
-    parsed = urlparse(url)
-    path_parts = parsed.path.strip('/').split('/')
+    Compute the SHA-256 hash of a file's contents.
     
-    if len(path_parts) >= 2:
-        year = path_parts[0]
-        month = path_parts[1]
+    Args:
+        file_path (Path): Path to the file
         
-        # Validate that year and month are numeric
-        if year.isdigit() and month.isdigit():
-            return year, month
-    
-    return None, None
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-def is_guide_url(url):
+def load_manifest(manifest_file):
     """
-    Check if URL is a guide URL (contains /p/ pattern).
-    Expected format: http://blog.dscpl.com.au/p/filename.html
-    Returns True if it's a guide URL, False otherwise.
+    Load the extraction manifest, discarding it if it was recorded by a
+    different version of the extractor.
+    
+    Args:
+        manifest_file (Path): Path to the manifest file
+        
+    Returns:
+        dict: Manifest with 'extractor_version' and 'posts' entries
     """
-    parsed = urlparse(url)
-    path_parts = parsed.path.strip('/').split('/')
+    extractor_version = get_extractor_version()
     
-    if len(path_parts) >= 2 and path_parts[0] == 'p':
-        return True
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        manifest = None
     
-    return False
+    if not isinstance(manifest, dict) or manifest.get('extractor_version') != extractor_version:
+        manifest = {'extractor_version': extractor_version, 'posts': {}}
+    
+    return manifest
 
 
-def get_basename_from_url(url):
-    """Extract basename (without extension) from URL."""
-    parsed = urlparse(url)
-    filename = parsed.path.split('/')[-1]
-    # Remove .html extension if present
-    if filename.endswith('.html'):
-        return filename[:-5]  # Remove last 5 characters (.html)
-    return filename
+def save_manifest(manifest, manifest_file):
+    """
+    Save the extraction manifest, replacing the old file atomically.
+    
+    Args:
+        manifest (dict): Manifest to save
+        manifest_file (Path): Path to the manifest file
+    """
+    temp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_file, manifest_file)
+    except OSError as e:
+        print(f"Warning: Cannot save manifest '{manifest_file}': {e}")
 
 
-def url_to_html_path(url, posts_dir):
+def get_manifest_key(html_file_path):
     """
-    Convert a URL to the expected HTML file path based on the download structure.
+    Get the key for an HTML file in the manifest. This is the path relative
+    to the project root where possible, so the manifest is portable.
     
     Args:
-        url (str): The original URL
-        posts_dir (Path): Base posts directory
+        html_file_path (Path): Path to the HTML file
         
     Returns:
-        Path: Path to the original.html file, or None if URL format is invalid
+        str: Manifest key
     """
-    # Check if this is a guide URL (contains /p/ pattern)
-    if is_guide_url(url):
-        basename = get_basename_from_url(url)
-        if not basename:
-            return None
-        
-        # For guide URLs, create path: guides/basename/original.html
-        guides_dir = posts_dir.parent / 'guides'
-        return guides_dir / basename / "original.html"
-    else:
-        # Regular post URL with YYYY/MM pattern
-        year, month = extract_year_month_from_url(url)
-        if not year or not month:
-            return None
-        
-        basename = get_basename_from_url(url)
-        if not basename:
-            return None
+    project_root = Path(__file__).resolve().parent.parent
+    resolved_path = Path(html_file_path).resolve()
+    try:
+        return resolved_path.relative_to(project_root).as_posix()
+    except ValueError:
+        return resolved_path.as_posix()
+
+
+def is_post_up_to_date(manifest, html_file_path):
+    """
+    Check whether a post was already extracted from the current contents of
+    its HTML file and the outputs still exist.
+    
+    The file size and modification time are checked first, so the contents
+    only need to be hashed when the file has been touched.
+    
+    Args:
+        manifest (dict): Extraction manifest
+        html_file_path (Path): Path to the HTML file
         
-        # Create path: posts/YYYY/MM/filename/original.html
-        return posts_dir / year / month / basename / "original.html"
+    Returns:
+        bool: True if the post does not need to be extracted again
+    """
+    entry = manifest['posts'].get(get_manifest_key(html_file_path))
+    if not entry:
+        return False
+    
+    output_dir = html_file_path.parent
+    if not (output_dir / "data.json").exists() or not (output_dir / "index.md").exists():
+        return False
+    
+    stat = html_file_path.stat()
+    if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    
+    if entry.get('sha256') != hash_file(html_file_path):
+        return False
+    
+    # Contents are unchanged, remember the new modification time
+    entry['size'] = stat.st_size
+    entry['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def update_manifest_entry(manifest, html_file_path):
+    """
+    Record the current contents of an HTML file as extracted.
+    
+    Args:
+        manifest (dict): Extraction manifest
+        html_file_path (Path): Path to the HTML file
+    """
+    stat = html_file_path.stat()
+    manifest['posts'][get_manifest_key(html_file_path)] = {
+        'sha256': hash_file(html_file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
 
 
-def process_single_post(html_file_path, overwrite=False):
+def process_single_post(html_file_path, overwrite=False, parser=None, timer=None):
     """
     Process a single HTML file and extract post data.
     
     Args:
         html_file_path (Path): Path to the HTML file
         overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use
+        timer (StageTimer): Timer to record the time of each stage in
         
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (success, files_changed, failed_images), where files_changed
+            is the number of output files which were written because their
+            content changed, and failed_images lists the URLs of images
+            which could not be downloaded. A post with failed images should
+            not be recorded as extracted, so they are tried again.
     """
+    if timer is None:
+        timer = StageTimer()
+    
+    failed_images = []
+    
     try:
         # Extract post data
-        post_data = extract_post_data(str(html_file_path), overwrite)
+        post_data = extract_post_data(str(html_file_path), overwrite, parser, timer=timer, failed_images=failed_images)
         
         # Generate output filenames (always index.md and data.json)
         output_dir = html_file_path.parent
         json_output_path = output_dir / "data.json"
         md_output_path = output_dir / "index.md"
         
-        # Write to JSON file (always recreate)
-        with open(json_output_path, 'w', encoding='utf-8') as json_file:
-            json.dump(post_data, json_file, indent=2, ensure_ascii=False)
-        
-        # Create standalone Markdown file (always recreate)
-        create_markdown_file(post_data, md_output_path)
+        # Write the JSON and standalone Markdown files, only replacing them
+        # if their content has changed
+        json_changed = write_if_changed(json_output_path, json.dumps(post_data, indent=2, ensure_ascii=False))
+        md_changed = create_markdown_file(post_data, md_output_path)
+        timer.lap('write')
         
-        print(f"Successfully extracted post data to: {json_output_path}")
-        print(f"Created Markdown file: {md_output_path}")
+        if json_changed:
+            print(f"Successfully extracted post data to: {json_output_path}")
+        else:
+            print(f"Post data unchanged, kept: {json_output_path}")
+        if md_changed:
+            print(f"Created Markdown file: {md_output_path}")
+        else:
+            print(f"Markdown file unchanged, kept: {md_output_path}")
         print(f"Title: {post_data['title']}")
         print(f"Author: {post_data['author']}")
         print(f"Date: {post_data['date']}")
@@ -886,80 +1535,525 @@ def process_single_post(html_file_path, overwrite=False):
         # Report downloaded images
         if 'downloaded_images' in post_data and post_data['downloaded_images']:
             print(f"Downloaded images: {', '.join(post_data['downloaded_images'])}")
+        if failed_images:
+            print(f"Failed images, will be tried again next run: {len(failed_images)}")
         
-        return True
+        return True, json_changed + md_changed, failed_images
         
     except Exception as e:
         print(f"Error processing file {html_file_path}: {e}")
-        return False
+        return False, 0, failed_images
+
+
+def process_single_post_timed(html_file_path, overwrite=False, parser=None, profile=False):
+    """
+    Process a single HTML file, recording the time of each stage and
+    optionally profiling it.
+    
+    Args:
+        html_file_path (Path): Path to the HTML file
+        overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use
+        profile (bool): Whether to profile processing with cProfile
+        
+    Returns:
+        tuple: (success, files_changed, failed_images, timings,
+            profile_stats), where timings maps each stage to seconds and
+            profile_stats is the raw cProfile data, or None if not profiling
+    """
+    timer = StageTimer()
+    profiler = cProfile.Profile() if profile else None
+    
+    if profiler:
+        profiler.enable()
+    try:
+        success, files_changed, failed_images = process_single_post(html_file_path, overwrite, parser, timer)
+    finally:
+        if profiler:
+            profiler.disable()
+    
+    profile_stats = None
+    if profiler:
+        profiler.create_stats()
+        profile_stats = profiler.stats
+    
+    return success, files_changed, failed_images, timer.timings, profile_stats
+
+
+# Marker used in place of a file path for posts which are unchanged
+UNCHANGED = object()
+
+
+def process_single_post_captured(html_file_path, overwrite=False, parser=None, profile=False):
+    """
+    Process a single HTML file, capturing the progress output rather than
+    printing it. Used by worker processes so that output from posts being
+    processed in parallel can be reported in a deterministic order.
+    
+    Args:
+        html_file_path (Path): Path to the HTML file
+        overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use
+        profile (bool): Whether to profile processing with cProfile
+        
+    Returns:
+        tuple: (success, captured_output, files_changed, failed_images, timings,
+            profile_stats)
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        success, files_changed, failed_images, timings, profile_stats = process_single_post_timed(
+            html_file_path, overwrite, parser, profile)
+    return success, output.getvalue(), files_changed, failed_images, timings, profile_stats
+
+
+def init_worker(session_options):
+    """
+    Set up a worker process, configuring its shared HTTP session with the
+    options used by the parent, which are not inherited by processes that
+    are spawned rather than forked.
+    """
+    configure_session(**session_options)
+
+
+def process_posts_in_pool(html_file_paths, jobs, overwrite=False, parser=None, profile=False,
+                          process=process_single_post_captured):
+    """
+    Process posts in a pool of worker processes, yielding the result of
+    each in the order given, as soon as it and all those before it are done.
+    
+    A worker process dying, such as by running out of memory or crashing in
+    a C extension, breaks the whole pool and every post not yet finished,
+    even while posts are still being submitted. The posts which were in
+    progress are then processed again one at a time, so that only the post
+    which killed its worker fails, and a new pool is started for the rest.
+    
+    Args:
+        html_file_paths (list): Paths of the HTML files to process
+        jobs (int): Number of worker processes
+        overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use
+        profile (bool): Whether to profile processing with cProfile
+        process (callable): Function processing a post in a worker, taking
+            the above arguments and returning the same tuple as
+            process_single_post_captured()
+        
+    Yields:
+        tuple: (html_file_path, result) where result is the tuple returned
+            by process, or a failure for a post whose worker died
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    def create_pool(workers):
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                   initargs=(get_session_options(),))
+    
+    def get_result(future, html_file_path):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return False, f"Error processing file {html_file_path}: {e}\n", 0, [], {}, None
+    
+    remaining = list(html_file_paths)
+    
+    while remaining:
+        futures = []
+        index = 0
+        
+        with create_pool(jobs) as executor:
+            try:
+                # Submitting fails too once a worker has died
+                for path in remaining:
+                    futures.append(executor.submit(process, path, overwrite, parser, profile))
+                
+                for index, (html_file_path, future) in enumerate(zip(remaining, futures)):
+                    yield html_file_path, get_result(future, html_file_path)
+                return
+            except BrokenProcessPool:
+                pass
+        
+        # Posts are started in order, so those in progress when the pool
+        # broke are the first ones which did not finish. Posts which were
+        # never submitted go to the new pool.
+        suspects = jobs
+        restart = len(futures)
+        
+        for position in range(index, len(futures)):
+            html_file_path, future = remaining[position], futures[position]
+            
+            if future.exception() is None:
+                yield html_file_path, future.result()
+                continue
+            
+            if not isinstance(future.exception(), BrokenProcessPool):
+                yield html_file_path, get_result(future, html_file_path)
+                continue
+            
+            if not suspects:
+                restart = position
+                break
+            
+            suspects -= 1
+            with create_pool(1) as solo:
+                try:
+                    yield html_file_path, get_result(solo.submit(process, html_file_path, overwrite, parser, profile),
+                                                     html_file_path)
+                except BrokenProcessPool:
+                    yield html_file_path, (False, f"Error processing file {html_file_path}: worker process died\n",
+                                           0, [], {}, None)
+        
+        remaining = remaining[restart:]
 
 
-def process_all_posts(posts_dir, overwrite=False):
+def save_profiles(profiles, profile_dir=PROFILE_DIR):
+    """
+    Save the profiles of the slowest posts, replacing any saved by an
+    earlier run. The files can be read with pstats or tools like snakeviz.
+    
+    Args:
+        profiles (list): (seconds, html_file_path, profile_stats) for each
+            post, slowest first
+        profile_dir (Path): Directory to save the profiles to
+        
+    Returns:
+        dict: Path of the saved profile for each HTML file path
+    """
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    for old_profile in profile_dir.glob('*.prof'):
+        old_profile.unlink()
+    
+    saved = {}
+    for rank, (_, html_file_path, profile_stats) in enumerate(profiles, 1):
+        profile_path = profile_dir / f"{rank:02d}-{html_file_path.parent.name}.prof"
+        with open(profile_path, 'wb') as f:
+            marshal.dump(profile_stats, f)
+        saved[html_file_path] = profile_path
+    
+    return saved
+
+
+def process_all_posts(posts_dir, overwrite=False, jobs=1, force=False, parser=None, profile_slowest=0):
     """
     Process all posts from the metadata file.
     
+    Posts whose HTML file is unchanged since it was last extracted by the
+    same version of the extractor are skipped, unless force is set.
+    
     Args:
         posts_dir (Path): Base posts directory
         overwrite (bool): Whether to overwrite existing image files
+        jobs (int): Number of worker processes to spread posts across
+        force (bool): Whether to process posts even if they are unchanged
+        parser (str): BeautifulSoup tree builder to use
+        profile_slowest (int): Number of the slowest posts to save cProfile
+            profiles of, all posts being profiled if not 0
         
     Returns:
-        tuple: (successful_count, failed_count)
+        tuple: (successful_count, failed_count, unchanged_count,
+            files_changed_count, post_timings), where files_changed_count
+            is the number of output files written because their content
+            changed and post_timings has the path, success, files changed,
+            total seconds, time of each stage and any saved profile of each
+            processed post
     """
     # Get the directory containing this script
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     
-    # Load metadata
-    metadata_file = project_root / 'blogger/posts-metadata.json'
-    posts_data = load_metadata(metadata_file)
+    # Look up the posts, and where each is downloaded to, in the metadata index
+    from metadata_index import open_metadata_index
+    
+    index = open_metadata_index()
+    if index is None:
+        return 0, 0, 0, 0, []
+    
+    posts_data = index.get_html_paths(posts_dir)
+    index.close()
     
     if not posts_data:
-        return 0, 0
+        return 0, 0, 0, 0, []
     
     print(f"Found {len(posts_data)} posts to process")
     print(f"Posts directory: {posts_dir}")
     if overwrite:
         print("Overwrite mode: existing images will be replaced")
+    if jobs > 1:
+        print(f"Parallel mode: {jobs} worker processes")
+    if force:
+        print("Force mode: unchanged posts will be processed")
     print()
     
-    successful = 0
-    failed = 0
+    manifest = load_manifest(MANIFEST_FILE)
+    
+    # Work out the HTML file for each post up front. Each entry holds the
+    # progress messages for the post and the file to process, or None if
+    # the post cannot be processed. Unchanged posts are given the file
+    # name UNCHANGED so they are reported but not processed.
+    work = []
     
-    for i, post in enumerate(posts_data, 1):
+    for i, (post, html_file_path) in enumerate(posts_data, 1):
         original_url = post.get('originalUrl')
         title = post.get('title', 'Unknown')
         
         if not original_url:
-            print(f"[{i}/{len(posts_data)}] Skipping post with no URL: {title}")
-            failed += 1
+            work.append(([f"[{i}/{len(posts_data)}] Skipping post with no URL: {title}"], None))
             continue
         
-        print(f"[{i}/{len(posts_data)}] Processing: {title}")
-        print(f"  URL: {original_url}")
+        messages = [
+            f"[{i}/{len(posts_data)}] Processing: {title}",
+            f"  URL: {original_url}",
+        ]
         
-        # Convert URL to HTML file path
-        html_file_path = url_to_html_path(original_url, posts_dir)
         if not html_file_path:
-            print("  Warning: Cannot determine HTML file path from URL, skipping")
-            failed += 1
+            messages.append("  Warning: Cannot determine HTML file path from URL, skipping")
+            work.append((messages, None))
             continue
         
         if not html_file_path.exists():
-            print(f"  Warning: HTML file not found: {html_file_path}, skipping")
-            failed += 1
+            messages.append(f"  Warning: HTML file not found: {html_file_path}, skipping")
+            work.append((messages, None))
             continue
         
-        print(f"  Processing: {html_file_path}")
+        if not (force or overwrite) and is_post_up_to_date(manifest, html_file_path):
+            messages.append(f"  Unchanged, skipping: {html_file_path}")
+            work.append((messages, UNCHANGED))
+            continue
         
-        # Process the post
-        if process_single_post(html_file_path, overwrite):
+        messages.append(f"  Processing: {html_file_path}")
+        work.append((messages, html_file_path))
+    
+    successful = 0
+    failed = 0
+    unchanged = 0
+    files_changed = 0
+    post_timings = []
+    slowest_profiles = []
+    
+    def record_result(html_file_path, success, post_files_changed, failed_images, timings, profile_stats):
+        """Count the result of processing a post and record its timings."""
+        nonlocal successful, failed, files_changed
+        
+        files_changed += post_files_changed
+        
+        if success:
+            # Posts with images which failed are processed again next run
+            if not failed_images:
+                update_manifest_entry(manifest, html_file_path)
             successful += 1
         else:
             failed += 1
         
-        print()
+        seconds = sum(timings.values())
+        post_timings.append({
+            'path': str(html_file_path.relative_to(project_root)),
+            'success': success,
+            'files_changed': post_files_changed,
+            'seconds': seconds,
+            'stages': timings,
+        })
+        
+        # Keep only the profiles of the slowest posts
+        if profile_stats is not None:
+            entry = (seconds, len(post_timings), html_file_path, profile_stats)
+            if len(slowest_profiles) < profile_slowest:
+                heapq.heappush(slowest_profiles, entry)
+            else:
+                heapq.heappushpop(slowest_profiles, entry)
+    
+    profile = profile_slowest > 0
+    
+    if jobs > 1:
+        # Process everything in the pool, but report results in metadata
+        # order so the output is the same regardless of completion order.
+        results = process_posts_in_pool(
+            [html_file_path for _, html_file_path in work if html_file_path not in (None, UNCHANGED)],
+            jobs, overwrite, parser, profile)
+        
+        for messages, html_file_path in work:
+            print("\n".join(messages))
+            
+            if html_file_path is UNCHANGED:
+                unchanged += 1
+                continue
+            
+            if html_file_path is None:
+                failed += 1
+                continue
+            
+            _, (success, output, post_files_changed, failed_images, timings, profile_stats) = next(results)
+            
+            print(output, end='')
+            record_result(html_file_path, success, post_files_changed, failed_images, timings, profile_stats)
+            print()
+    else:
+        for messages, html_file_path in work:
+            print("\n".join(messages))
+            
+            if html_file_path is UNCHANGED:
+                unchanged += 1
+                continue
+            
+            if html_file_path is None:
+                failed += 1
+                continue
+            
+            # Process the post
+            record_result(html_file_path, *process_single_post_timed(html_file_path, overwrite, parser, profile))
+            print()
+    
+    save_manifest(manifest, MANIFEST_FILE)
+    
+    if profile:
+        slowest_profiles.sort(reverse=True)
+        saved = save_profiles([(seconds, path, stats) for seconds, _, path, stats in slowest_profiles])
+        for post in post_timings:
+            profile_path = saved.get(project_root / post['path'])
+            if profile_path:
+                post['profile'] = str(profile_path.relative_to(project_root))
+    
+    return successful, failed, unchanged, files_changed, post_timings
+
+
+def make_run_report(summary, post_timings, elapsed):
+    """
+    Make a machine-readable report of a batch run, with the time of each
+    stage of each post and the totals for the whole run.
+    
+    Args:
+        summary (dict): Counts of successful, failed and unchanged posts,
+            and of files changed
+        post_timings (list): Timings of each processed post
+        elapsed (float): Wall time of the whole run in seconds
+        
+    Returns:
+        dict: The report
+    """
+    stage_totals = {stage: 0.0 for stage in TIMED_STAGES}
+    for post in post_timings:
+        for stage, seconds in post['stages'].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+    
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'extractor_version': get_extractor_version(),
+        'elapsed_seconds': elapsed,
+        'summary': summary,
+        'stage_seconds': stage_totals,
+        'slowest': [post['path'] for post in sorted(post_timings, key=lambda post: post['seconds'], reverse=True)[:10]],
+        'posts': post_timings,
+    }
+
+
+def write_run_report(report_file, report):
+    """
+    Write a run report as JSON, creating its directory if needed.
+    
+    Args:
+        report_file (Path): Path of the JSON report
+        report (dict): Report from make_run_report()
+        
+    Returns:
+        bool: True if the report was written
+    """
+    temp_file = report_file.with_name(report_file.name + '.tmp')
+    
+    try:
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        os.replace(temp_file, report_file)
+    except OSError as e:
+        print(f"Warning: Cannot save run report '{report_file}': {e}")
+        try:
+            temp_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+    
+    return True
+
+
+def format_stage_timings(timings):
+    """Format the seconds spent in each stage, in the order they happen."""
+    stages = [stage for stage in TIMED_STAGES if stage in timings]
+    return ', '.join(f"{stage} {timings[stage]:.3f}s" for stage in stages)
+
+
+def watch_posts(patterns, overwrite=False, parser=None, force=False, interval=None):
+    """
+    Watch HTML files for changes, extracting each post again when its file
+    is saved, until interrupted.
+    
+    Posts are processed in this one long running process, so after the
+    first they do not pay the cost of starting Python and importing the
+    libraries used. Saves are debounced by the watcher, so a burst of
+    writes to a file results in the post being processed once.
+    
+    Args:
+        patterns (list): (directory, glob pattern) pairs of the HTML files
+            to watch
+        overwrite (bool): Whether to overwrite existing image files
+        parser (str): BeautifulSoup tree builder to use
+        force (bool): Whether to process posts even if they are unchanged,
+            such as when a file is saved without changes
+        interval (float): Seconds between checks for changes
+    """
+    import post_watcher
+    
+    watcher = post_watcher.PollingWatcher(patterns, interval or post_watcher.DEFAULT_INTERVAL)
+    manifest = load_manifest(MANIFEST_FILE)
+    
+    # Import and set up the parser and converter now rather than when the
+    # first post is saved
+    parse_html('<html></html>', parser)
+    markdown_converter.convert('')
+    
+    print(f"Watching {len(watcher)} files for changes, press Ctrl+C to stop")
+    print()
+    
+    try:
+        for changed in watcher.watch():
+            for html_file_path in changed:
+                if not force and is_post_up_to_date(manifest, html_file_path):
+                    print(f"Unchanged since last extraction, skipping: {html_file_path}")
+                    continue
+                
+                print(f"Changed: {html_file_path}")
+                
+                timer = StageTimer()
+                success, files_changed, failed_images = process_single_post(html_file_path, overwrite, parser, timer)
+                if success and not failed_images:
+                    update_manifest_entry(manifest, html_file_path)
+                    save_manifest(manifest, MANIFEST_FILE)
+                
+                # Report the time from the file being saved to the output being written
+                try:
+                    latency = time.time() - html_file_path.stat().st_mtime
+                except OSError:
+                    latency = None
+                
+                print(f"Files changed: {files_changed}")
+                print(f"Timings: {format_stage_timings(timer.timings)}")
+                if latency is not None:
+                    print(f"Updated {latency:.2f}s after save" if success else f"Failed {latency:.2f}s after save")
+                print()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+
+def report_image_cache_usage(content_dirs):
+    """
+    Print the space used by the image download cache and by post images,
+    which are separate copies.
+    """
+    usage = image_store.get_cache_usage(content_dirs)
     
-    return successful, failed
+    print("Image Download Cache:")
+    print(f"  Cached images: {usage['images']} ({usage['cached_bytes']} bytes)")
+    print(f"  Post images: {usage['post_images']} ({usage['post_bytes']} bytes)")
 
 
 def main():
@@ -972,6 +2066,10 @@ Examples:
   python extract_post.py                           # Process all posts from metadata
   python extract_post.py posts/2007/03/resistance-is-futile/original.html
   python extract_post.py posts/2007/03/resistance-is-futile/original.html --overwrite
+  python extract_post.py --jobs 8                  # Process all posts using 8 worker processes
+  python extract_post.py --force                   # Process all posts, even if unchanged
+  python extract_post.py --force --profile-slowest 5  # Save profiles of the 5 slowest posts
+  python extract_post.py --watch                   # Re-extract posts as their HTML files change
         """
     )
     
@@ -987,13 +2085,108 @@ Examples:
         help='Overwrite existing image files (only applies to single file mode)'
     )
     
+    parser.add_argument(
+        '--parser',
+        choices=['auto'] + PARSER_BACKENDS,
+        default='auto',
+        help='HTML parser backend, auto selects the fastest installed (default: auto)'
+    )
+    
+    parser.add_argument(
+        '--import-images',
+        action='store_true',
+        help='Add existing post images to the image download cache and exit'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Process posts even if the HTML file and extractor are unchanged'
+    )
+    
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes to use (only applies to batch mode, default: 1)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running, re-extracting posts as their HTML files change (only the given file if one is)'
+    )
+    
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        metavar='SECONDS',
+        help='Seconds between checks for changed files in watch mode (default: 0.25)'
+    )
+    
+    parser.add_argument(
+        '--report',
+        type=Path,
+        default=REPORT_FILE,
+        help=f'Path of the JSON report of stage timings written after batch runs (default: {REPORT_FILE.name})'
+    )
+    
+    parser.add_argument(
+        '--profile-slowest',
+        type=int,
+        default=0,
+        metavar='N',
+        help=f'Profile each post with cProfile and save the profiles of the N slowest to {PROFILE_DIR.name}/ (only applies to batch mode)'
+    )
+    
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f'Number of keep-alive connections per host for image downloads (default: {DEFAULT_POOL_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f'Number of retries for transient image download failures (default: {DEFAULT_RETRIES})'
+    )
+    
     args = parser.parse_args()
     
+    configure_session(pool_size=args.pool_size, retries=args.retries)
+    
+    html_parser = select_parser(args.parser)
+    if html_parser is None:
+        print(f"Error: HTML parser '{args.parser}' is not installed.")
+        sys.exit(1)
+    
     # Get the directory containing this script
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     posts_dir = project_root / 'src/posts'
     
+    content_dirs = [posts_dir, project_root / 'src/guides']
+    
+    if args.import_images:
+        # Image cache import mode
+        imported = image_store.import_image_files(content_dirs)
+        print(f"Imported {imported} images into: {image_store.IMAGE_STORE_DIR}")
+        report_image_cache_usage(content_dirs)
+        return
+    
+    if args.watch:
+        # Watch mode
+        if args.html_file_path:
+            html_file_path = Path(args.html_file_path).resolve()
+            patterns = [(html_file_path.parent, html_file_path.name)]
+        else:
+            patterns = [(posts_dir, '*/*/*/original.html'), (project_root / 'src/guides', '*/original.html')]
+        
+        watch_posts(patterns, args.overwrite, html_parser, args.force, args.poll_interval)
+        return
+    
     if args.html_file_path:
         # Single file mode
         html_file_path = Path(args.html_file_path)
@@ -1003,12 +2196,36 @@ Examples:
             sys.exit(1)
         
         print(f"Processing single file: {html_file_path}")
+        
+        from metadata_index import open_metadata_index
+        
+        index = open_metadata_index()
+        if index is not None:
+            post = index.get_by_html_path(html_file_path, posts_dir)
+            index.close()
+            if post:
+                print(f"Post: {post.get('title', 'Unknown')} ({post.get('originalUrl')})")
+            else:
+                print("Note: File is not where any post in the metadata is saved")
         if args.overwrite:
             print("Overwrite mode: existing images will be replaced")
         print()
         
-        success = process_single_post(html_file_path, args.overwrite)
+        manifest = load_manifest(MANIFEST_FILE)
+        
+        if not (args.force or args.overwrite) and is_post_up_to_date(manifest, html_file_path):
+            print("Unchanged since last extraction, skipping (use --force to process anyway)")
+            return
+        
+        timer = StageTimer()
+        success, files_changed, failed_images = process_single_post(html_file_path, args.overwrite, html_parser, timer)
         if success:
+            # Posts with images which failed are processed again next run
+            if not failed_images:
+                update_manifest_entry(manifest, html_file_path)
+                save_manifest(manifest, MANIFEST_FILE)
+            print(f"Files changed: {files_changed}")
+            print(f"Timings: {format_stage_timings(timer.timings)}")
             print("Processing completed successfully")
         else:
             print("Processing failed")
@@ -1018,13 +2235,34 @@ Examples:
         print("Batch processing mode - processing all posts from metadata")
         print()
         
-        successful, failed = process_all_posts(posts_dir, args.overwrite)
+        start = time.perf_counter()
+        successful, failed, unchanged, files_changed, post_timings = process_all_posts(
+            posts_dir, args.overwrite, args.jobs, args.force, html_parser, args.profile_slowest)
+        elapsed = time.perf_counter() - start
         
         print("=" * 50)
         print("Processing Summary:")
         print(f"  Successful: {successful}")
         print(f"  Failed: {failed}")
-        print(f"  Total processed: {successful + failed}")
+        print(f"  Unchanged: {unchanged}")
+        print(f"  Total processed: {successful + failed + unchanged}")
+        print(f"  Files changed: {files_changed}")
+        
+        summary = {'successful': successful, 'failed': failed, 'unchanged': unchanged, 'files_changed': files_changed}
+        report = make_run_report(summary, post_timings, elapsed)
+        report_saved = write_run_report(args.report, report)
+        
+        print("Timings:")
+        print(f"  Elapsed: {elapsed:.2f}s")
+        print(f"  Stages: {format_stage_timings(report['stage_seconds'])}")
+        for path in report['slowest'][:3]:
+            print(f"  Slow: {path}")
+        if report_saved:
+            print(f"  Report: {args.report}")
+        if args.profile_slowest:
+            print(f"  Profiles: {PROFILE_DIR}")
+        
+        report_image_cache_usage(content_dirs)
         
         if failed > 0:
             sys.exit(1)
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Ingest blog posts from the Blogger JSON feed.
+
+Downloading the pages listed in posts-metadata.json takes one request for
+each post, and the metadata file has to be maintained by hand. The feeds
+of a Blogger blog return up to 500 entries in each request, so this module
+pages through the posts feed and the pages (guides) feed with max-results
+and start-index, which needs a handful of requests for the whole blog.
+
+Each entry is saved as an original.html in the usual layout:
+  posts/YYYY/MM/<slug>/original.html
+  guides/<slug>/original.html
+
+The feed does not include the page template, so the page is rendered from
+the entry using the markup of the Blogger template which extract_post.py
+reads: the title, date header, post body, author, timestamp, labels, and
+the meta and link tags in the head. The feed does not include comments
+either, so pages which were downloaded from the blog are never replaced
+by pages rendered from the feed.
+
+posts-metadata.json is then regenerated from the feed, with the posts in
+order of publication followed by the guides, as in the original file. It
+is only replaced if its content changes.
+"""
+
+import html
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode
+
+from requests.exceptions import RequestException
+from http_session import get_session
+from post_download import create_directory_if_not_exists, save_html_content
+from post_paths import get_post_location
+
+
+DEFAULT_BLOG_URL = 'http://blog.dscpl.com.au'
+
+# Blogger returns at most 500 entries for each request
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = MAX_PAGE_SIZE
+
+# Feed paths, relative to the blog URL, for each kind of entry
+FEED_PATHS = {
+    'post': 'feeds/posts/default',
+    'guide': 'feeds/pages/default',
+}
+
+# First line of pages rendered from the feed, used to tell them apart from
+# pages downloaded from the blog
+FEED_PAGE_MARKER = '<!-- Rendered from the Blogger feed -->'
+
+# Length of the og:description snippet, as used by Blogger
+DESCRIPTION_LENGTH = 140
+
+ENTRY_ID_PATTERN = re.compile(r'blog-(\d+)\.(?:post|page)-(\d+)')
+
+
+def get_text(value):
+    """Get the text of a feed element, which the JSON feed holds in '$t'."""
+    if isinstance(value, dict):
+        return value.get('$t')
+    return value
+
+
+def fetch_feed(feed_url, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Fetch all entries of a feed, requesting page_size entries at a time
+    until a page comes back short or the total in the feed is reached.
+
+    Args:
+        feed_url (str): URL of the feed, without query parameters
+        page_size (int): Number of entries to request at a time
+
+    Returns:
+        tuple: (feed title, list of entries), or (None, None) if a page
+            cannot be fetched
+    """
+    entries = []
+    title = None
+    start_index = 1
+
+    while True:
+        query = urlencode({'alt': 'json', 'max-results': page_size, 'start-index': start_index})
+        url = f"{feed_url}?{query}"
+
+        try:
+            response = get_session().get(url, timeout=30)
+            response.raise_for_status()
+            feed = response.json()['feed']
+        except RequestException as e:
+            print(f"Error: Cannot fetch feed {url}: {e}")
+            return None, None
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Error: Invalid feed {url}: {e!r}")
+            return None, None
+
+        title = title or get_text(feed.get('title'))
+        page = feed.get('entry', [])
+        entries.extend(page)
+
+        total = int(get_text(feed.get('openSearch$totalResults')) or 0)
+        print(f"  Fetched entries {start_index}-{start_index + len(page) - 1} of {total}")
+
+        if len(page) < page_size or len(entries) >= total:
+            return title, entries
+
+        start_index += len(page)
+
+
+def parse_feed_entry(entry):
+    """
+    Get the fields of a feed entry used to render its page.
+
+    Args:
+        entry (dict): Entry from the JSON feed
+
+    Returns:
+        dict: Fields of the entry, or None if it has no page URL
+    """
+    url = None
+    for link in entry.get('link', []):
+        if link.get('rel') == 'alternate':
+            url = link.get('href')
+
+    if not url:
+        return None
+
+    authors = entry.get('author') or [{}]
+    match = ENTRY_ID_PATTERN.search(get_text(entry.get('id')) or '')
+
+    return {
+        'url': url,
+        'title': get_text(entry.get('title')) or '',
+        'content': get_text(entry.get('content')) or '',
+        'published': get_text(entry.get('published')),
+        'author': get_text(authors[0].get('name')),
+        'author_url': get_text(authors[0].get('uri')),
+        'labels': [category['term'] for category in entry.get('category', []) if category.get('term')],
+        'blog_id': match.group(1) if match else None,
+        'post_id': match.group(2) if match else None,
+    }
+
+
+def parse_timestamp(timestamp):
+    """Parse a feed timestamp such as '2007-03-06T22:00:00.000+11:00'."""
+    return datetime.fromisoformat(timestamp)
+
+
+def format_utc_timestamp(timestamp):
+    """
+    Convert a feed timestamp to UTC in the format of posts-metadata.json,
+    such as '2007-03-06T11:00:00Z', keeping milliseconds only if not zero.
+    """
+    published = parse_timestamp(timestamp).astimezone(timezone.utc)
+    text = published.strftime('%Y-%m-%dT%H:%M:%S')
+    if published.microsecond:
+        text += f".{published.microsecond // 1000:03d}"
+    return text + 'Z'
+
+
+def format_local_timestamp(timestamp):
+    """
+    Format a feed timestamp as on the blog's pages, to the second in the
+    time zone of the blog, such as '2007-03-06T22:00:00+11:00'.
+    """
+    return parse_timestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def make_description(content):
+    """Make the og:description snippet of the text of a post."""
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', content))
+    text = ' '.join(text.split())
+    if len(text) > DESCRIPTION_LENGTH:
+        text = text[:DESCRIPTION_LENGTH] + '...'
+    return text
+
+
+def render_page(post, kind, blog_title, blog_url):
+    """
+    Render the page of a feed entry using the Blogger template markup read
+    by extract_post.py. Guides have no date header or post footer, as on
+    the blog.
+
+    Args:
+        post (dict): Fields of the entry from parse_feed_entry()
+        kind (str): 'post' or 'guide'
+        blog_title (str): Title of the blog
+        blog_url (str): Base URL of the blog, used for label links
+
+    Returns:
+        str: HTML of the page
+    """
+    def attr(value):
+        return html.escape(value or '', quote=True)
+
+    # Titles in the feed have HTML entities escaped, as they are kept in
+    # posts-metadata.json, while the page shows the plain text
+    title = html.unescape(post['title'])
+    lines = [
+        FEED_PAGE_MARKER,
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        f"<link href='{attr(post['url'])}' rel='canonical'/>",
+        f"<meta content='{attr(post['url'])}' property='og:url'/>",
+        f"<meta content='{attr(title)}' property='og:title'/>",
+        f"<meta content='{attr(make_description(post['content']))}' property='og:description'/>",
+        f"<title>{html.escape(f'{blog_title}: {title}')}</title>",
+        "</head>",
+        "<body>",
+        f"<h1 class='title'>{html.escape(blog_title)}</h1>",
+    ]
+
+    if kind == 'post' and post['published']:
+        published = parse_timestamp(post['published'])
+        lines.append(f"<h2 class='date-header'><span>{published:%A, %B} {published.day}, {published.year}</span></h2>")
+
+    lines += [
+        "<div class='post hentry'>",
+        f"<meta content='{attr(post['blog_id'])}' itemprop='blogId'/>",
+        f"<meta content='{attr(post['post_id'])}' itemprop='postId'/>",
+        f"<h3 class='post-title entry-title' itemprop='name'>{html.escape(title)}</h3>",
+        f"<div class='post-body entry-content' id='post-body-{attr(post['post_id'])}'>",
+        post['content'],
+        "<div style='clear: both;'></div>",
+        "</div>",
+    ]
+
+    if kind == 'post':
+        labels = ',\n'.join(
+            f"<a href='{attr(blog_url)}/search/label/{attr(label)}' rel='tag'>{html.escape(label)}</a>"
+            for label in post['labels']
+        )
+        lines += [
+            "<div class='post-footer'>",
+            "<div class='post-footer-line post-footer-line-1'>",
+            f"<span class='post-author vcard'>Posted by <span class='fn'>"
+            f"<a class='g-profile' href='{attr(post['author_url'])}' rel='author'>{html.escape(post['author'] or '')}</a>"
+            "</span></span>",
+            f"<a class='timestamp-link' href='{attr(post['url'])}' rel='bookmark'>"
+            f"<abbr class='published' title='{attr(format_local_timestamp(post['published']))}'></abbr></a>",
+            "</div>",
+            "<div class='post-footer-line post-footer-line-2'>",
+            "<span class='post-labels'>",
+        ]
+        if labels:
+            lines += ["Labels:", labels]
+        lines += [
+            "</span>",
+            "</div>",
+            "</div>",
+        ]
+
+    lines += [
+        "</div>",
+        "</body>",
+        "</html>",
+        "",
+    ]
+
+    return '\n'.join(lines)
+
+
+def is_feed_page(file_path):
+    """Check whether a page was rendered from the feed rather than downloaded."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.readline().rstrip('\n') == FEED_PAGE_MARKER
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def save_feed_page(post, kind, blog_title, blog_url, posts_dir, refresh=False):
+    """
+    Save the page of a feed entry to the post or guide directory for its
+    URL. Existing pages are skipped unless refreshing, in which case pages
+    rendered from the feed earlier are replaced if they have changed.
+    Pages downloaded from the blog are always kept, as they include the
+    comments which the feed does not.
+
+    Returns:
+        tuple: (status, messages) where status is one of 'downloaded',
+            'not_modified', 'skipped' or 'error'
+    """
+    messages = [f"Processing: {post['title']}", f"  URL: {post['url']}"]
+
+    location_kind, _, _, _, directory = get_post_location(post['url'])
+    if location_kind != kind:
+        messages.append(f"  Warning: URL does not match the layout of a {kind}, skipping")
+        return 'skipped', messages
+
+    subdir = posts_dir.parent / directory
+    file_path = subdir / 'original.html'
+    content = render_page(post, kind, blog_title, blog_url)
+
+    if file_path.exists():
+        if not refresh:
+            messages.append(f"  File already exists, skipping: {file_path}")
+            return 'skipped', messages
+
+        if not is_feed_page(file_path):
+            messages.append(f"  Downloaded page kept, it has comments the feed does not: {file_path}")
+            return 'skipped', messages
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                messages.append(f"  Not modified, keeping: {file_path}")
+                return 'not_modified', messages
+
+    if not create_directory_if_not_exists(subdir) or not save_html_content(content, file_path):
+        return 'error', messages
+
+    messages.append(f"  Saved: {file_path}")
+    return 'downloaded', messages
+
+
+def make_metadata(feed_posts):
+    """
+    Make the entries of posts-metadata.json from the feed entries: the
+    posts in order of publication, then the guides, which have no date.
+
+    Args:
+        feed_posts (list): (kind, fields) tuples of the feed entries
+
+    Returns:
+        list: Metadata entries
+    """
+    # The feeds list the newest entries first, so entries published at the
+    # same time are kept in order of publication too
+    feed_posts = feed_posts[::-1]
+
+    posts = sorted(
+        (post for kind, post in feed_posts if kind == 'post' and post['published']),
+        key=lambda post: parse_timestamp(post['published'])
+    )
+    guides = sorted(
+        (post for kind, post in feed_posts if kind == 'guide'),
+        key=lambda post: post['published'] or ''
+    )
+
+    metadata = [
+        {'originalUrl': post['url'], 'title': post['title'], 'date': format_utc_timestamp(post['published'])}
+        for post in posts
+    ]
+    metadata += [{'originalUrl': guide['url'], 'title': guide['title']} for guide in guides]
+
+    return metadata
+
+
+def save_metadata(metadata, metadata_file):
+    """
+    Save the metadata entries in the format of posts-metadata.json,
+    replacing the file atomically only if its content changes.
+
+    Returns:
+        bool: True if the file was changed, False if unchanged, None on error
+    """
+    content = json.dumps(metadata, indent=2)
+
+    try:
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: Cannot read metadata file '{metadata_file}': {e}")
+
+    temp_path = Path(metadata_file).with_name(Path(metadata_file).name + '.tmp')
+
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, metadata_file)
+        return True
+    except OSError as e:
+        print(f"Error: Cannot save metadata file '{metadata_file}': {e}")
+        temp_path.unlink(missing_ok=True)
+        return None
+
+
+def ingest_feed(blog_url, posts_dir, metadata_file, page_size=DEFAULT_PAGE_SIZE, refresh=False):
+    """
+    Fetch the posts and guides feeds of a blog, save the page of each entry
+    and regenerate the metadata file. The metadata file is left as it is
+    if either feed cannot be fetched.
+
+    Args:
+        blog_url (str): Base URL of the blog
+        posts_dir (Path): Base posts directory
+        metadata_file (Path): Path of posts-metadata.json
+        page_size (int): Number of entries to request at a time
+        refresh (bool): Whether to replace pages rendered from the feed
+            earlier if they have changed
+
+    Returns:
+        dict: Statistics with counts for 'downloaded', 'not_modified',
+            'skipped' and 'error', or None if a feed cannot be fetched or
+            has no entries
+    """
+    blog_url = blog_url.rstrip('/')
+    feed_posts = []
+    blog_title = None
+
+    for kind, feed_path in FEED_PATHS.items():
+        feed_url = f"{blog_url}/{feed_path}"
+        print(f"Fetching feed: {feed_url}")
+
+        title, entries = fetch_feed(feed_url, page_size)
+        if entries is None:
+            return None
+
+        blog_title = blog_title or title
+        for entry in entries:
+            post = parse_feed_entry(entry)
+            if post is not None:
+                feed_posts.append((kind, post))
+
+    # Never replace the metadata with an empty list, such as for the wrong URL
+    if not feed_posts:
+        print("Error: No entries found in the feeds")
+        return None
+
+    print(f"Found {len(feed_posts)} entries in the feeds")
+    print()
+
+    stats = {'downloaded': 0, 'not_modified': 0, 'skipped': 0, 'error': 0}
+    total = len(feed_posts)
+
+    for i, (kind, post) in enumerate(feed_posts, 1):
+        status, messages = save_feed_page(post, kind, blog_title or '', blog_url, posts_dir, refresh)
+        stats[status] += 1
+
+        print(f"[{i}/{total}] {messages[0]}")
+        for message in messages[1:]:
+            print(message)
+        print()
+
+    metadata = make_metadata(feed_posts)
+    changed = save_metadata(metadata, metadata_file)
+    if changed is None:
+        stats['error'] += 1
+    elif changed:
+        print(f"Regenerated metadata: {metadata_file} ({len(metadata)} entries)")
+    else:
+        print(f"Metadata unchanged: {metadata_file} ({len(metadata)} entries)")
+
+    return stats
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session used by the download and extraction scripts.
+
+A single requests.Session is kept per process so that connections to the
+same host are kept alive and reused between page and image downloads,
+rather than each request opening a new TCP and TLS connection. Transient
+failures are retried with exponential backoff using urllib3's Retry.
+
+The session, and requests itself, are only created and imported when the
+first request is made, so scripts which end up making no requests start
+quickly.
+"""
+
+import threading
+
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (compatible; BlogDownloader/1.0)'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+# HTTP status codes which are considered transient and worth retrying
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_options = {}
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR, user_agent=DEFAULT_USER_AGENT):
+    """
+    Create a requests session with connection pooling and retry policy.
+    
+    Args:
+        pool_size (int): Maximum number of connections kept per host
+        retries (int): Number of times to retry a failed request
+        backoff_factor (float): Backoff factor for delay between retries
+        user_agent (str): User-Agent header sent with each request
+        
+    Returns:
+        requests.Session: Configured session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # Return the final response so callers still see the HTTP status
+        raise_on_status=False,
+    )
+    
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = user_agent
+    
+    return session
+
+
+def configure_session(**kwargs):
+    """
+    Set the options the shared session is created with, replacing any
+    existing session. Accepts the same keyword arguments as
+    create_session(). The session is created when next needed.
+    """
+    global _session, _session_options
+    
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_options = kwargs
+
+
+def get_session_options():
+    """Get the options the shared session is created with, as set by configure_session()."""
+    with _session_lock:
+        return dict(_session_options)
+
+
+def get_session():
+    """Return the shared session, creating it with the configured options if needed."""
+    global _session
+    
+    with _session_lock:
+        if _session is None:
+            _session = create_session(**_session_options)
+        return _session
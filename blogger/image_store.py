@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Download cache of images shared by all posts.
+
+Each distinct image downloaded is cached once, named by the SHA-256 hash
+of its content, and copied into the post directories which use it. Each
+post directory therefore contains an independent, normal file which
+Eleventy copies through, and editing the image of one post never changes
+another.
+
+The cache only saves downloading: an image is only downloaded once however
+many posts use it. It does not save any space. Every post directory holds
+its own copy of each image it uses, and the cache is one more copy of
+each image on disk.
+
+A record keyed by a hash of the image URL holds the checksum and size of
+the image downloaded from that URL. This means an image used by another
+post does not need to be downloaded again, and a file left incomplete by an
+interrupted run can be detected and fetched again.
+
+Images are streamed to a temporary file and only renamed into the store
+once complete, so the store never contains partial images.
+
+Layout:
+  image-store/objects/ab/<sha256 of content><ext>
+  image-store/urls/cd/<sha256 of URL>.json
+  image-store/tmp/
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+
+IMAGE_STORE_DIR = Path(__file__).parent / 'image-store'
+
+# Image file extensions found in post directories, matching those which
+# Eleventy copies through from src/posts and src/guides.
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+def get_object_path(content_hash, file_extension, store_dir=IMAGE_STORE_DIR):
+    """
+    Get the path in the store of the image with the given content hash.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the image content
+        file_extension (str): File extension of the image
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        Path: Path of the stored image
+    """
+    return store_dir / 'objects' / content_hash[:2] / f"{content_hash}{file_extension}"
+
+
+def get_url_path(image_url, store_dir=IMAGE_STORE_DIR):
+    """
+    Get the path in the store of the record for the image at a URL.
+
+    Args:
+        image_url (str): URL of the image
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        Path: Path of the URL record
+    """
+    url_hash = hashlib.sha256(image_url.encode('utf-8')).hexdigest()
+    return store_dir / 'urls' / url_hash[:2] / f"{url_hash}.json"
+
+
+def get_temp_path(path):
+    """Get a temporary path alongside path which is unique to this thread."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def copy_file(source, target):
+    """
+    Copy source to target, replacing any existing file atomically. The
+    copy is independent of the source, unlike a hard link, so changing one
+    never changes the other.
+
+    Args:
+        source (Path): Existing file
+        target (Path): Path to copy it to
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = get_temp_path(target)
+
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def add_image_stream(chunks, file_extension, expected_size=None, store_dir=IMAGE_STORE_DIR):
+    """
+    Add image content to the store from an iterable of chunks, unless
+    identical content is already stored.
+
+    The content is written to a temporary file while its checksum is
+    calculated, and only renamed into place once it is complete.
+
+    Args:
+        chunks (iterable): Chunks of image content as bytes
+        file_extension (str): File extension of the image
+        expected_size (int): Size the content should be, if known
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        dict: Record of the stored image with 'sha256', 'size' and
+            'extension' entries
+
+    Raises:
+        IOError: If the content is not the expected size
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    temp_dir = store_dir / 'tmp'
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = get_temp_path(temp_dir / 'image')
+
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+
+        if expected_size is not None and size != expected_size:
+            raise IOError(f"Incomplete image, received {size} of {expected_size} bytes")
+
+        record = {'sha256': digest.hexdigest(), 'size': size, 'extension': file_extension}
+        object_path = get_object_path(record['sha256'], file_extension, store_dir)
+
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, object_path)
+
+        return record
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def add_image(content, file_extension, store_dir=IMAGE_STORE_DIR):
+    """
+    Add image content to the store, unless identical content is already
+    stored.
+
+    Args:
+        content (bytes): Image content
+        file_extension (str): File extension of the image
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        dict: Record of the stored image
+    """
+    return add_image_stream([content], file_extension, len(content), store_dir)
+
+
+def get_record_path(record, store_dir=IMAGE_STORE_DIR):
+    """Get the path of the stored image described by a record."""
+    return get_object_path(record['sha256'], record['extension'], store_dir)
+
+
+def record_url(image_url, record, store_dir=IMAGE_STORE_DIR):
+    """
+    Record the image downloaded from a URL.
+
+    Args:
+        image_url (str): URL of the image
+        record (dict): Record of the stored image
+        store_dir (Path): Root directory of the image store
+    """
+    url_path = get_url_path(image_url, store_dir)
+    url_path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_path = get_temp_path(url_path)
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(record, url=image_url), f, indent=2)
+    os.replace(temp_path, url_path)
+
+
+def lookup_url(image_url, store_dir=IMAGE_STORE_DIR):
+    """
+    Look up the stored image previously downloaded from a URL.
+
+    Args:
+        image_url (str): URL of the image
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        dict: Record of the stored image, or None if the URL has not been
+            downloaded or the stored image is missing
+    """
+    try:
+        with open(get_url_path(image_url, store_dir), 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if get_record_path(record, store_dir).stat().st_size != record['size']:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return record
+
+
+def hash_file(file_path):
+    """Calculate the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_image_complete(image_path, record):
+    """
+    Check whether an image file matches the size and checksum in a record.
+
+    Args:
+        image_path (Path): Image file in a post directory
+        record (dict): Record of the stored image
+
+    Returns:
+        bool: True if the file holds the complete image
+    """
+    try:
+        if image_path.stat().st_size != record['size']:
+            return False
+        return hash_file(image_path) == record['sha256']
+    except OSError:
+        return False
+
+
+def import_image_file(image_path, store_dir=IMAGE_STORE_DIR):
+    """
+    Add an existing image file to the store, unless identical content is
+    already stored. A file which is a hard link, as made by earlier
+    versions of the store, is replaced by an independent copy.
+
+    Args:
+        image_path (Path): Image file in a post directory
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        bool: True if the image was added to the store, False if already
+            stored
+    """
+    content = image_path.read_bytes()
+    object_path = get_object_path(hashlib.sha256(content).hexdigest(), image_path.suffix, store_dir)
+
+    imported = not object_path.exists()
+    if imported:
+        add_image(content, image_path.suffix, store_dir)
+
+    if image_path.stat().st_nlink > 1:
+        copy_file(object_path, image_path)
+
+    return imported
+
+
+def import_image_files(content_dirs, store_dir=IMAGE_STORE_DIR):
+    """
+    Import the images in the post directories under content_dirs into the
+    store, so that posts using them do not download them again.
+
+    Args:
+        content_dirs (list): Directories to search for images
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        int: Number of images imported
+    """
+    imported = 0
+
+    for image_path in iter_image_files(content_dirs):
+        if import_image_file(image_path, store_dir):
+            imported += 1
+
+    return imported
+
+
+def iter_image_files(content_dirs):
+    """Find the image files in the post directories under content_dirs, in sorted order."""
+    for content_dir in content_dirs:
+        for image_path in sorted(Path(content_dir).rglob('*')):
+            if image_path.suffix.lower() in IMAGE_EXTENSIONS and image_path.is_file():
+                yield image_path
+
+
+def get_cache_usage(content_dirs, store_dir=IMAGE_STORE_DIR):
+    """
+    Calculate the space used by the images in the download cache and by
+    the images in the post directories. The two are separate copies, so
+    the total on disk is the sum of both.
+
+    Args:
+        content_dirs (list): Directories to search for post images
+        store_dir (Path): Root directory of the image store
+
+    Returns:
+        dict: 'images' and 'cached_bytes' in the cache, and 'post_images'
+            and 'post_bytes' in the post directories
+    """
+    usage = {'images': 0, 'cached_bytes': 0, 'post_images': 0, 'post_bytes': 0}
+
+    for object_path in (store_dir / 'objects').glob('*/*'):
+        usage['images'] += 1
+        usage['cached_bytes'] += object_path.stat().st_size
+
+    for image_path in iter_image_files(content_dirs):
+        usage['post_images'] += 1
+        usage['post_bytes'] += image_path.stat().st_size
+
+    return usage
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+SQLite index of the posts metadata.
+
+posts-metadata.json is a list of posts, so finding the metadata for one
+URL, or the posts for one month, means loading and scanning the whole
+file. This module keeps an index of it in posts-metadata.db, with a row
+for each post holding its URL, slug, year, month, date and the directory
+it is downloaded to, so that both download_posts.py and extract_post.py
+can look posts up directly.
+
+The index records the size, modification time and SHA-256 checksum of
+the JSON file it was built from. When the JSON file changes it is loaded
+again and only the rows of posts which were added, changed or removed are
+written, each row recording a checksum of its entry.
+
+Layout of a row's directory, relative to src/, as worked out by post_paths.py:
+  posts/YYYY/MM/<slug>
+  guides/<slug>
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from post_paths import get_post_location
+
+
+METADATA_FILE = Path(__file__).parent / 'posts-metadata.json'
+INDEX_FILE = Path(__file__).parent / 'posts-metadata.db'
+
+# Changing the schema, or where posts are saved, causes existing indexes
+# to be rebuilt from scratch
+SCHEMA_VERSION = '2'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    position INTEGER PRIMARY KEY,
+    url TEXT,
+    kind TEXT,
+    slug TEXT,
+    year TEXT,
+    month TEXT,
+    date TEXT,
+    directory TEXT,
+    checksum TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS posts_url ON posts (url);
+CREATE INDEX IF NOT EXISTS posts_slug ON posts (slug);
+CREATE INDEX IF NOT EXISTS posts_year_month ON posts (year, month);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date);
+CREATE INDEX IF NOT EXISTS posts_directory ON posts (directory);
+"""
+
+
+def hash_entry(entry):
+    """Compute a checksum of a metadata entry, independent of key order."""
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class MetadataIndex:
+    """
+    Index of posts-metadata.json stored in SQLite, brought up to date with
+    the JSON file when opened. Lookups return the metadata entries as
+    dictionaries, as they appear in the JSON file.
+    """
+
+    def __init__(self, index_file=INDEX_FILE, metadata_file=METADATA_FILE):
+        self.index_file = Path(index_file)
+        self.metadata_file = Path(metadata_file)
+        self.connection = self.connect()
+
+    def connect(self):
+        """
+        Open the index database, creating it if needed. An index which is
+        corrupt or was created with another schema version is replaced.
+        """
+        try:
+            connection = sqlite3.connect(self.index_file)
+            connection.executescript(SCHEMA)
+            row = connection.execute("SELECT value FROM source WHERE key = 'schema'").fetchone()
+            if row is None or row[0] == SCHEMA_VERSION:
+                return connection
+            connection.close()
+        except sqlite3.DatabaseError:
+            pass
+
+        self.index_file.unlink(missing_ok=True)
+        connection = sqlite3.connect(self.index_file)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def close(self):
+        """Close the index database."""
+        self.connection.close()
+
+    def get_source_info(self):
+        """Get the recorded size, modification time and checksum of the JSON file."""
+        return dict(self.connection.execute("SELECT key, value FROM source"))
+
+    def update(self):
+        """
+        Bring the index up to date with the JSON file. Nothing is read
+        beyond a stat of the JSON file if its size and modification time
+        are unchanged, and only rows for entries which differ are written.
+
+        Returns:
+            int: Number of rows added, changed or removed, or None if the
+                JSON file cannot be loaded
+        """
+        try:
+            stat = self.metadata_file.stat()
+        except FileNotFoundError:
+            print(f"Error: Metadata file '{self.metadata_file}' not found.")
+            return None
+
+        source = self.get_source_info()
+        if source.get('size') == str(stat.st_size) and source.get('mtime_ns') == str(stat.st_mtime_ns):
+            return 0
+
+        content = self.metadata_file.read_bytes()
+        checksum = hashlib.sha256(content).hexdigest()
+
+        changes = 0
+
+        if source.get('checksum') != checksum:
+            try:
+                posts_data = json.loads(content)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Error: Invalid JSON in metadata file: {e}")
+                return None
+
+            changes = self.update_posts(posts_data)
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO source (key, value) VALUES (?, ?)",
+                [('schema', SCHEMA_VERSION), ('size', str(stat.st_size)),
+                 ('mtime_ns', str(stat.st_mtime_ns)), ('checksum', checksum)]
+            )
+
+        return changes
+
+    def update_posts(self, posts_data):
+        """
+        Write the rows for entries which were added or changed, and remove
+        rows for entries no longer present, keyed by position in the list.
+
+        Returns:
+            int: Number of rows added, changed or removed
+        """
+        existing = dict(self.connection.execute("SELECT position, checksum FROM posts"))
+
+        rows = []
+        for position, entry in enumerate(posts_data):
+            checksum = hash_entry(entry)
+            if existing.get(position) == checksum:
+                continue
+
+            url = entry.get('originalUrl')
+            kind, slug, year, month, directory = get_post_location(url) if url else (None,) * 5
+            rows.append((position, url, kind, slug, year, month, entry.get('date'), directory,
+                         checksum, json.dumps(entry)))
+
+        removed = [(position,) for position in existing if position >= len(posts_data)]
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO posts (position, url, kind, slug, year, month, date, directory, checksum, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.connection.executemany("DELETE FROM posts WHERE position = ?", removed)
+
+        return len(rows) + len(removed)
+
+    def query(self, where='', parameters=()):
+        """Get the entries of the rows matching a condition, in metadata order."""
+        cursor = self.connection.execute(f"SELECT data FROM posts {where} ORDER BY position", parameters)
+        return [json.loads(data) for data, in cursor]
+
+    def all_posts(self):
+        """Get all entries, in the order of the JSON file."""
+        return self.query()
+
+    def get_by_url(self, url):
+        """Get the entry for a URL, or None if it is not in the metadata."""
+        posts = self.query("WHERE url = ?", (url,))
+        return posts[0] if posts else None
+
+    def get_by_slug(self, slug):
+        """Get the entries of posts and guides with a slug."""
+        return self.query("WHERE slug = ?", (slug,))
+
+    def get_by_month(self, year, month):
+        """Get the entries of the posts published in a month, going by the URL."""
+        return self.query("WHERE year = ? AND month = ?", (str(year), f"{int(month):02d}"))
+
+    def get_by_date(self, date):
+        """
+        Get the entries of the posts whose date starts with the given
+        prefix, such as '2007-03-06' for a day or '2007' for a year.
+        """
+        return self.query("WHERE date GLOB ?", (f"{date}*",))
+
+    def get_by_directory(self, directory):
+        """
+        Get the entry of the post downloaded to a directory, or None.
+
+        Args:
+            directory (str): Directory relative to src/, such as
+                'posts/2007/03/resistance-is-futile'
+        """
+        posts = self.query("WHERE directory = ?", (directory,))
+        return posts[0] if posts else None
+
+    def get_by_html_path(self, html_file_path, posts_dir):
+        """
+        Get the entry of the post downloaded to an original.html file, or
+        None if the file is not where any post in the metadata is saved.
+
+        Args:
+            html_file_path (Path): Path of the original.html file
+            posts_dir (Path): Base posts directory
+        """
+        try:
+            directory = Path(html_file_path).resolve().parent.relative_to(Path(posts_dir).resolve().parent)
+        except ValueError:
+            return None
+
+        return self.get_by_directory(directory.as_posix())
+
+    def get_html_paths(self, posts_dir):
+        """
+        Get the path of the original.html file of every entry, in the order
+        of the JSON file.
+
+        Args:
+            posts_dir (Path): Base posts directory
+
+        Returns:
+            list: (entry, path) tuples, path being None if the URL does not
+                match the layout of posts or guides
+        """
+        cursor = self.connection.execute("SELECT data, directory FROM posts ORDER BY position")
+        return [
+            (json.loads(data), posts_dir.parent / directory / 'original.html' if directory else None)
+            for data, directory in cursor
+        ]
+
+
+def open_metadata_index(metadata_file=METADATA_FILE, index_file=INDEX_FILE):
+    """
+    Open the index of the metadata, bringing it up to date with the JSON
+    file.
+
+    Returns:
+        MetadataIndex: The index, or None if the JSON file cannot be loaded
+    """
+    index = MetadataIndex(index_file, metadata_file)
+
+    if index.update() is None:
+        index.close()
+        return None
+
+    return index
@@ -0,0 +1,211 @@
+"""
+Where downloaded blog post pages are saved, shared by the threaded
+downloader in download_posts.py, the asyncio downloader in
+async_download.py and the feed ingestion in feed_ingest.py.
+
+Kept separate from download_posts.py so that the other modules do not
+import the script itself, which would load a second copy of it when it
+is run as __main__.
+"""
+
+import json
+from pathlib import Path
+
+from post_paths import get_basename_from_url, get_post_location
+
+
+# Sidecar file next to original.html recording the ETag/Last-Modified
+# validators from the last download, used for conditional refreshes.
+CACHE_FILENAME = 'original.cache.json'
+
+
+def load_cache_entry(subdir, url):
+    """
+    Load the HTTP validators recorded for original.html in subdir.
+    Returns the cache entry dictionary, or None if there is no usable
+    entry for this URL.
+    """
+    cache_path = subdir / CACHE_FILENAME
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache_entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    
+    if not isinstance(cache_entry, dict) or cache_entry.get('url') != url:
+        return None
+    
+    return cache_entry
+
+
+def save_cache_entry(subdir, cache_entry):
+    """Save the HTTP validators for original.html in subdir."""
+    cache_path = subdir / CACHE_FILENAME
+    
+    # Nothing worth recording if the server sent no validators
+    if not cache_entry or not (cache_entry.get('etag') or cache_entry.get('last_modified')):
+        if cache_path.exists():
+            cache_path.unlink()
+        return
+    
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache_entry, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Cannot save cache file '{cache_path}': {e}")
+
+
+def create_directory_if_not_exists(directory_path):
+    """Create directory if it doesn't exist."""
+    try:
+        Path(directory_path).mkdir(parents=True, exist_ok=True)
+        return True
+    except (OSError, PermissionError) as e:
+        print(f"Error: Cannot create directory '{directory_path}': {e}")
+        return False
+
+
+def save_html_content(content, file_path):
+    """Save HTML content to file."""
+    try:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return True
+    except (OSError, PermissionError, UnicodeEncodeError) as e:
+        print(f"Error: Cannot save file '{file_path}': {e}")
+        return False
+
+
+def prepare_post_download(post, posts_dir, refresh=False):
+    """
+    Work out where a post entry from the metadata is saved and whether it
+    needs to be downloaded. Shared by the threaded and asyncio downloaders.
+
+    Returns a tuple (status, messages, target). status is None if the post
+    should be downloaded, otherwise 'skipped' or 'error'. target is a
+    dictionary with the 'url', 'subdir', 'file_path' and 'cache_entry' for
+    the download, or None if it should not be downloaded.
+    """
+    original_url = post.get('originalUrl')
+    title = post.get('title', 'Unknown')
+    messages = []
+
+    if not original_url:
+        messages.append(f"Skipping post with no URL: {title}")
+        return 'skipped', messages, None
+
+    messages.append(f"Processing: {title}")
+    messages.append(f"  URL: {original_url}")
+
+    # Get basename from URL (without .html extension)
+    if not get_basename_from_url(original_url):
+        messages.append("  Warning: Cannot extract basename from URL, skipping")
+        return 'skipped', messages, None
+
+    # Guides are saved to guides/basename/ and posts to posts/YYYY/MM/basename/
+    kind, _, _, _, directory = get_post_location(original_url)
+    if kind is None:
+        messages.append("  Warning: Cannot extract year/month from URL, skipping")
+        return 'skipped', messages, None
+
+    subdir = posts_dir.parent / directory
+    messages.append(f"  Target directory ({kind}): {subdir}")
+
+    # Create directory if it doesn't exist
+    if not create_directory_if_not_exists(subdir):
+        return 'error', messages, None
+
+    # Save as original.html inside the subdirectory
+    file_path = subdir / "original.html"
+
+    # Check if file already exists (normal mode never overwrites)
+    cache_entry = None
+    if file_path.exists():
+        if not refresh:
+            messages.append(f"  File already exists, skipping: {file_path}")
+            return 'skipped', messages, None
+
+        cache_entry = load_cache_entry(subdir, original_url)
+
+    target = {
+        'url': original_url,
+        'subdir': subdir,
+        'file_path': file_path,
+        'cache_entry': cache_entry,
+    }
+
+    return None, messages, target
+
+
+def save_post_download(target, status, html_content, cache_entry, messages):
+    """
+    Save the result of downloading a post prepared by prepare_post_download().
+
+    Returns the final status of the post, one of 'downloaded',
+    'not_modified' or 'error'.
+    """
+    file_path = target['file_path']
+
+    if status == 'not_modified':
+        messages.append(f"  Not modified, keeping: {file_path}")
+        return 'not_modified'
+
+    if status == 'error':
+        messages.append("  Failed to download")
+        return 'error'
+
+    # Save the content
+    if save_html_content(html_content, file_path):
+        save_cache_entry(target['subdir'], cache_entry)
+        messages.append(f"  Saved: {file_path}")
+        return 'downloaded'
+
+    return 'error'
+
+
+def check_journal(post, journal, posts_dir, refresh=False):
+    """
+    Check whether a post was already dealt with by an interrupted run, as
+    recorded in the journal. A post recorded as downloaded is only skipped
+    if its original.html is still in posts_dir. Refreshing checks every
+    post again.
+
+    Returns a tuple (status, messages) with the status 'resumed' if the
+    post can be skipped, otherwise None.
+    """
+    original_url = post.get('originalUrl')
+    if journal is None or refresh or not original_url:
+        return None
+
+    entry = journal.get_completed(original_url)
+    if entry is None:
+        return None
+
+    # Fetch the post again if the file from the earlier run has gone
+    if entry['outcome'] != 'error':
+        directory = get_post_location(original_url)[4]
+        if directory is not None and not (posts_dir.parent / directory / 'original.html').exists():
+            return None
+
+    outcome = entry['outcome']
+    if entry.get('status_code'):
+        outcome = f"{outcome}, HTTP {entry['status_code']}"
+
+    messages = [
+        f"Processing: {post.get('title', 'Unknown')}",
+        f"  URL: {original_url}",
+        f"  Already done according to journal ({outcome}), skipping",
+    ]
+    return 'resumed', messages
+
+
+def record_download(journal, post, status, info=None, duration=None):
+    """Record the outcome of downloading a post in the journal, if any."""
+    original_url = post.get('originalUrl')
+    if journal is None or not original_url:
+        return
+
+    info = info or {}
+    journal.record(original_url, status, info.get('status_code'), info.get('bytes'),
+                   duration, info.get('attempts'))
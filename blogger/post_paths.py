@@ -0,0 +1,92 @@
+"""
+Where the page of a blog post or guide is saved, worked out from its URL.
+
+Shared by the downloaders, the metadata index, the feed ingestion and the
+extractor, so that all of them agree on the directory of every URL and
+skip the same URLs.
+
+Layout of a page's directory, relative to src/:
+  posts/YYYY/MM/<basename>    for http://blog.dscpl.com.au/YYYY/MM/<basename>.html
+  guides/<basename>           for http://blog.dscpl.com.au/p/<basename>.html
+"""
+
+import os
+from urllib.parse import urlparse
+
+
+def extract_year_month_from_url(url):
+    """
+    Extract year and month from URL path.
+    Expected format: http://blog.dscpl.com.au/YYYY/MM/filename.html
+    Returns tuple (year, month) or (None, None) if pattern doesn't match.
+    """
+    parsed = urlparse(url)
+    path_parts = parsed.path.strip('/').split('/')
+    
+    if len(path_parts) >= 2:
+        year = path_parts[0]
+        month = path_parts[1]
+        
+        # Validate that year and month are numeric
+        if year.isdigit() and month.isdigit():
+            return year, month
+    
+    return None, None
+
+
+def is_guide_url(url):
+    """
+    Check if URL is a guide URL (contains /p/ pattern).
+    Expected format: http://blog.dscpl.com.au/p/filename.html
+    Returns True if it's a guide URL, False otherwise.
+    """
+    parsed = urlparse(url)
+    path_parts = parsed.path.strip('/').split('/')
+    
+    if len(path_parts) >= 2 and path_parts[0] == 'p':
+        return True
+    
+    return False
+
+
+def get_filename_from_url(url):
+    """Extract filename from URL."""
+    parsed = urlparse(url)
+    return os.path.basename(parsed.path)
+
+
+def get_basename_from_url(url):
+    """Extract basename (without extension) from URL."""
+    parsed = urlparse(url)
+    filename = os.path.basename(parsed.path)
+    # Remove .html extension if present
+    if filename.endswith('.html'):
+        return filename[:-5]  # Remove last 5 characters (.html)
+    return filename
+
+
+def get_post_location(url):
+    """
+    Work out where the page at a URL is downloaded to.
+
+    Args:
+        url (str): The original URL of the post or guide
+
+    Returns:
+        tuple: (kind, slug, year, month, directory) where kind is 'post' or
+            'guide', year and month are None for guides, and directory is
+            relative to src/. Everything is None if the URL has no file name
+            or does not match either layout, as the downloader skips it.
+    """
+    basename = get_basename_from_url(url)
+    if not basename:
+        return None, None, None, None, None
+    
+    if is_guide_url(url):
+        return 'guide', basename, None, None, f"guides/{basename}"
+    
+    year, month = extract_year_month_from_url(url)
+    if not year or not month:
+        return None, None, None, None, None
+    
+    return 'post', basename, year, month, f"posts/{year}/{month}/{basename}"
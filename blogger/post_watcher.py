@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Polling file watcher used by the watch mode of extract_post.py.
+
+Files matching a set of glob patterns are checked for changes to their
+size or modification time a few times a second. Polling only needs the
+standard library and works the same on every platform and filesystem,
+and checking a few hundred files takes well under a millisecond.
+
+Editors often write a file more than once when saving it, such as
+truncating it and then writing the content, or writing a temporary file
+and renaming it. Changes are therefore debounced: a file is only reported
+once it has stopped changing for a short time, going by its modification
+time, and files which change together are reported together.
+"""
+
+import time
+from pathlib import Path
+
+
+DEFAULT_INTERVAL = 0.25
+DEFAULT_DEBOUNCE = 0.2
+
+
+class PollingWatcher:
+    """
+    Watches the files matching glob patterns for changes, including files
+    created after watching started.
+    """
+
+    def __init__(self, patterns, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+        """
+        Args:
+            patterns (list): (directory, glob pattern) pairs of the files to watch
+            interval (float): Seconds between checks for changes
+            debounce (float): Seconds a file must be unchanged for before
+                it is reported
+        """
+        self.patterns = [(Path(directory), pattern) for directory, pattern in patterns]
+        self.interval = interval
+        self.debounce = debounce
+        self.signatures = self.scan()
+        self.pending = {}
+
+    def scan(self):
+        """
+        Get the size and modification time of each watched file.
+
+        Returns:
+            dict: (st_mtime_ns, st_size) for each path
+        """
+        signatures = {}
+
+        for directory, pattern in self.patterns:
+            for path in directory.glob(pattern):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    # Removed since it was listed
+                    continue
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+
+        return signatures
+
+    def poll(self):
+        """
+        Check the files once, noting any which have changed.
+
+        Returns:
+            list: Paths which have changed and since been unchanged for the
+                debounce time, in sorted order, empty if there are none or
+                another file is still changing
+        """
+        signatures = self.scan()
+
+        for path, signature in signatures.items():
+            if self.signatures.get(path) != signature:
+                self.pending[path] = signature[0] / 1e9
+
+        # Forget removed files, they are noticed again if they reappear
+        for path in list(self.pending):
+            if path not in signatures:
+                del self.pending[path]
+
+        self.signatures = signatures
+
+        # Wait for all the files changing together to settle
+        if not self.pending or time.time() - max(self.pending.values()) < self.debounce:
+            return []
+
+        changed = sorted(self.pending)
+        self.pending.clear()
+        return changed
+
+    def watch(self):
+        """
+        Check the files repeatedly until interrupted.
+
+        Yields:
+            list: Paths of the files which changed, as returned by poll()
+        """
+        while True:
+            changed = self.poll()
+            if changed:
+                yield changed
+            time.sleep(self.interval)
+
+    def __len__(self):
+        return len(self.signatures)
@@ -0,0 +1,145 @@
+"""
+Shared fixtures for the tests of the scripts in blogger/.
+
+The scripts import each other as top-level modules, as they do when run
+from the blogger directory, so that directory is added to the path.
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+
+BLOGGER_DIR = Path(__file__).resolve().parent.parent / 'blogger'
+PROJECT_ROOT = BLOGGER_DIR.parent
+
+sys.path.insert(0, str(BLOGGER_DIR))
+
+
+class StubServer:
+    """
+    Local stand-in HTTP server. Each path is given a list of responses which
+    are returned in turn, the last one being repeated, and every request is
+    recorded with the time it was received.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.delay = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def add(self, path, *responses):
+        """
+        Set the responses for a path, each a body or a tuple of (status,
+        body) or (status, body, headers). A callable is called with the
+        query string of the request and returns a response. A Content-Length
+        header given replaces the real length, to send a truncated body.
+        """
+        self.routes[path] = list(responses)
+
+    def handle(self, request):
+        path, _, query = request.path.partition('?')
+
+        with self.lock:
+            self.requests.append((request.path, time.monotonic(), dict(request.headers)))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            responses = self.routes.get(path)
+            if not responses:
+                response = (404, b'Not found')
+            elif len(responses) > 1:
+                response = responses.pop(0)
+            else:
+                response = responses[0]
+
+        try:
+            if callable(response):
+                response = response(query)
+            if not isinstance(response, tuple):
+                response = (200, response)
+            status, body, headers = (response + ({},))[:3]
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+
+            time.sleep(self.delay)
+
+            request.send_response(status)
+            for name, value in headers.items():
+                request.send_header(name, value)
+            if 'Content-Length' not in headers:
+                request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def request_times(self, path):
+        """Get the times at which a path was requested."""
+        return [when for request_path, when, _ in self.requests if request_path.partition('?')[0] == path]
+
+
+def make_posts(server, count):
+    """Make metadata entries for posts served by the stub server."""
+    posts = []
+    for i in range(count):
+        path = f"/2007/03/post-{i}.html"
+        server.add(path, f"<html><body>Post {i}</body></html>")
+        posts.append({'originalUrl': server.url + path, 'title': f"Post {i}", 'date': '2007-03-06T11:00:00Z'})
+    return posts
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def image_store_dir(tmp_path, monkeypatch):
+    """Use an image store in a temporary directory rather than blogger/image-store."""
+    import image_store
+
+    store_dir = tmp_path / 'image-store'
+    for function in vars(image_store).values():
+        defaults = getattr(function, '__defaults__', None)
+        if defaults and image_store.IMAGE_STORE_DIR in defaults:
+            monkeypatch.setattr(function, '__defaults__', tuple(
+                store_dir if default == image_store.IMAGE_STORE_DIR else default for default in defaults))
+    return store_dir
+
+
+@pytest.fixture(autouse=True)
+def reset_session():
+    """Give each test a shared HTTP session with the default options."""
+    from http_session import configure_session
+
+    configure_session()
+    yield
+    configure_session()
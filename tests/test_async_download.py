@@ -0,0 +1,68 @@
+"""
+Tests of the asyncio downloader in async_download.py against a local
+stand-in server: the per-host limit, Retry-After and where posts are saved.
+"""
+
+import pytest
+
+from conftest import make_posts
+
+pytest.importorskip('aiohttp')
+
+from async_download import get_retry_delay, run_download_all_posts  # noqa: E402
+
+
+def test_posts_are_downloaded_with_per_host_limit(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    posts = make_posts(stub_server, 8)
+    stub_server.delay = 0.1
+
+    stats = run_download_all_posts(posts, posts_dir, concurrency=10, per_host=2, rate=0)
+
+    assert stats == {'downloaded': 8, 'not_modified': 0, 'skipped': 0, 'resumed': 0, 'error': 0}
+    assert stub_server.max_active <= 2
+    for i in range(8):
+        saved = posts_dir / '2007' / '03' / f"post-{i}" / 'original.html'
+        assert saved.read_text(encoding='utf-8') == f"<html><body>Post {i}</body></html>"
+
+
+def test_existing_posts_are_skipped(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    posts = make_posts(stub_server, 3)
+
+    run_download_all_posts(posts, posts_dir, rate=0)
+    stats = run_download_all_posts(posts, posts_dir, rate=0)
+
+    assert stats['skipped'] == 3
+    assert len(stub_server.requests) == 3
+
+
+def test_retry_after_is_honoured(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    path = '/2007/03/busy.html'
+    stub_server.add(path, (429, 'slow down', {'Retry-After': '1'}), 'content')
+    posts = [{'originalUrl': stub_server.url + path, 'title': 'Busy'}]
+
+    stats = run_download_all_posts(posts, posts_dir, rate=0, retries=1)
+
+    times = stub_server.request_times(path)
+    assert stats['downloaded'] == 1
+    assert times[1] - times[0] >= 0.9
+
+
+def test_retries_are_limited(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    path = '/2007/03/down.html'
+    stub_server.add(path, (503, 'busy', {'Retry-After': '0'}))
+    posts = [{'originalUrl': stub_server.url + path, 'title': 'Down'}]
+
+    stats = run_download_all_posts(posts, posts_dir, rate=0, retries=2)
+
+    assert stats['error'] == 1
+    assert len(stub_server.requests) == 3
+    assert not (posts_dir / '2007' / '03' / 'down' / 'original.html').exists()
+
+
+def test_retry_delay_backs_off_without_retry_after():
+    assert get_retry_delay(None, 0, 0.5) == 0.5
+    assert get_retry_delay(None, 2, 0.5) == 2.0
@@ -0,0 +1,77 @@
+"""
+Tests of refreshing downloaded posts with a conditional GET, using the
+ETag and Last-Modified validators kept in the original.cache.json sidecar.
+"""
+
+import json
+import os
+
+from download_posts import download_all_posts
+from post_download import CACHE_FILENAME
+
+
+LAST_MODIFIED = 'Tue, 06 Mar 2007 11:00:00 GMT'
+PATH = '/2007/03/post.html'
+
+
+def make_post(server):
+    return [{'originalUrl': server.url + PATH, 'title': 'Post'}]
+
+
+def post_dir(tmp_path):
+    return tmp_path / 'src' / 'posts' / '2007' / '03' / 'post'
+
+
+def test_validators_are_sent_on_refresh(stub_server, tmp_path):
+    stub_server.add(PATH, (200, 'first', {'ETag': '"v1"', 'Last-Modified': LAST_MODIFIED}), (304, ''))
+    posts_dir = tmp_path / 'src' / 'posts'
+
+    download_all_posts(make_post(stub_server), posts_dir, rate=0)
+    stats = download_all_posts(make_post(stub_server), posts_dir, rate=0, refresh=True)
+
+    headers = stub_server.requests[-1][2]
+    assert stats['not_modified'] == 1
+    assert headers['If-None-Match'] == '"v1"'
+    assert headers['If-Modified-Since'] == LAST_MODIFIED
+
+
+def test_not_modified_keeps_original(stub_server, tmp_path):
+    stub_server.add(PATH, (200, 'first', {'ETag': '"v1"'}), (304, ''))
+    posts_dir = tmp_path / 'src' / 'posts'
+    original = post_dir(tmp_path) / 'original.html'
+
+    download_all_posts(make_post(stub_server), posts_dir, rate=0)
+    os.utime(original, ns=(1_000_000_000, 1_000_000_000))
+    download_all_posts(make_post(stub_server), posts_dir, rate=0, refresh=True)
+
+    assert original.read_text(encoding='utf-8') == 'first'
+    assert original.stat().st_mtime_ns == 1_000_000_000
+
+
+def test_sidecar_for_another_url_is_ignored(stub_server, tmp_path):
+    stub_server.add(PATH, 'changed')
+    subdir = post_dir(tmp_path)
+    subdir.mkdir(parents=True)
+    (subdir / 'original.html').write_text('old', encoding='utf-8')
+    (subdir / CACHE_FILENAME).write_text(
+        json.dumps({'url': 'http://example.com/other.html', 'etag': '"v1"'}), encoding='utf-8')
+
+    stats = download_all_posts(make_post(stub_server), tmp_path / 'src' / 'posts', rate=0, refresh=True)
+
+    assert stats['downloaded'] == 1
+    assert 'If-None-Match' not in stub_server.requests[-1][2]
+    assert (subdir / 'original.html').read_text(encoding='utf-8') == 'changed'
+
+
+def test_response_without_validators_removes_sidecar(stub_server, tmp_path):
+    stub_server.add(PATH, (200, 'first', {'ETag': '"v1"'}), (200, 'second'))
+    posts_dir = tmp_path / 'src' / 'posts'
+    sidecar = post_dir(tmp_path) / CACHE_FILENAME
+
+    download_all_posts(make_post(stub_server), posts_dir, rate=0)
+    assert json.loads(sidecar.read_text(encoding='utf-8'))['etag'] == '"v1"'
+
+    download_all_posts(make_post(stub_server), posts_dir, rate=0, refresh=True)
+
+    assert not sidecar.exists()
+    assert (post_dir(tmp_path) / 'original.html').read_text(encoding='utf-8') == 'second'
@@ -0,0 +1,78 @@
+"""
+Tests of resuming interrupted runs from the download journal.
+"""
+
+from conftest import make_posts
+from download_journal import DownloadJournal
+from download_posts import download_all_posts
+
+
+def test_interrupted_run_is_resumed(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    journal_file = tmp_path / 'journal.jsonl'
+    posts = make_posts(stub_server, 3)
+
+    journal = DownloadJournal(journal_file)
+    download_all_posts(posts, posts_dir, rate=0, journal=journal)
+    journal.close()
+
+    journal = DownloadJournal(journal_file)
+    stats = download_all_posts(posts, posts_dir, rate=0, journal=journal)
+
+    assert stats['resumed'] == 3
+    assert len(stub_server.requests) == 3
+
+
+def test_deleted_file_is_downloaded_again(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    journal_file = tmp_path / 'journal.jsonl'
+    posts = make_posts(stub_server, 2)
+
+    journal = DownloadJournal(journal_file)
+    download_all_posts(posts, posts_dir, rate=0, journal=journal)
+    journal.close()
+    (posts_dir / '2007' / '03' / 'post-0' / 'original.html').unlink()
+
+    journal = DownloadJournal(journal_file)
+    stats = download_all_posts(posts, posts_dir, rate=0, journal=journal)
+
+    assert stats['downloaded'] == 1
+    assert stats['resumed'] == 1
+    assert (posts_dir / '2007' / '03' / 'post-0' / 'original.html').exists()
+
+
+def test_finished_run_is_not_resumed(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    journal_file = tmp_path / 'journal.jsonl'
+    posts = make_posts(stub_server, 2)
+    posts.append({'originalUrl': stub_server.url + '/2007/03/gone.html', 'title': 'Gone'})
+
+    journal = DownloadJournal(journal_file)
+    download_all_posts(posts, posts_dir, rate=0, journal=journal)
+    journal.finish()
+
+    journal = DownloadJournal(journal_file)
+    assert journal.entries == {}
+
+    stats = download_all_posts(posts, posts_dir, rate=0, journal=journal)
+    journal.close()
+
+    # The missing post is tried again, and the journal is started afresh
+    assert stats == {'downloaded': 0, 'not_modified': 0, 'skipped': 2, 'resumed': 0, 'error': 1}
+    assert len(journal_file.read_text(encoding='utf-8').splitlines()) == 3
+
+
+def test_permanent_failures_are_resumed(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    journal_file = tmp_path / 'journal.jsonl'
+    posts = [{'originalUrl': stub_server.url + '/2007/03/gone.html', 'title': 'Gone'}]
+
+    journal = DownloadJournal(journal_file)
+    download_all_posts(posts, posts_dir, rate=0, journal=journal)
+    journal.close()
+
+    stats = download_all_posts(posts, posts_dir, rate=0, journal=DownloadJournal(journal_file))
+    assert stats['resumed'] == 1
+
+    stats = download_all_posts(posts, posts_dir, rate=0, journal=DownloadJournal(journal_file, retry_permanent=True))
+    assert stats['error'] == 1
@@ -0,0 +1,121 @@
+"""
+Tests of the threaded downloader in download_posts.py against a local
+stand-in server: retries with backoff, per-host rate limiting, and the
+skip-if-exists behaviour and statistics.
+"""
+
+import time
+
+from conftest import make_posts
+from http_session import configure_session
+from download_posts import download_all_posts, download_webpage_if_modified, TokenBucket
+
+
+def test_transient_failures_are_retried_with_backoff(stub_server):
+    stub_server.add('/page.html', (503, 'busy'), (503, 'busy'), (503, 'busy'), 'content')
+    configure_session(retries=3, backoff_factor=0.1)
+
+    info = {}
+    status, content, _ = download_webpage_if_modified(stub_server.url + '/page.html', info=info)
+
+    assert status == 'modified'
+    assert content == 'content'
+    assert info['attempts'] == 4
+
+    # urllib3 retries the first failure immediately, then waits
+    # backoff_factor * 2 ** (retry - 1) seconds
+    times = stub_server.request_times('/page.html')
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps[1] >= 0.15
+    assert gaps[2] >= 0.35
+    assert gaps[2] > gaps[1]
+
+
+def test_retries_are_limited(stub_server):
+    stub_server.add('/page.html', (503, 'busy'))
+    configure_session(retries=2, backoff_factor=0)
+
+    info = {}
+    status, content, _ = download_webpage_if_modified(stub_server.url + '/page.html', info=info)
+
+    assert status == 'error'
+    assert content is None
+    assert info == {'status_code': 503, 'bytes': 4, 'attempts': 3}
+    assert len(stub_server.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub_server):
+    configure_session(retries=3, backoff_factor=0)
+
+    status, _, _ = download_webpage_if_modified(stub_server.url + '/missing.html')
+
+    assert status == 'error'
+    assert len(stub_server.requests) == 1
+
+
+def test_retry_after_is_honoured(stub_server):
+    stub_server.add('/page.html', (429, 'slow down', {'Retry-After': '1'}), 'content')
+    configure_session(retries=1, backoff_factor=0)
+
+    status, _, _ = download_webpage_if_modified(stub_server.url + '/page.html')
+
+    times = stub_server.request_times('/page.html')
+    assert status == 'modified'
+    assert times[1] - times[0] >= 0.9
+
+
+def test_download_all_posts_then_skip_existing(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    posts = make_posts(stub_server, 6)
+    posts.append({'originalUrl': stub_server.url + '/2007/03/gone.html', 'title': 'Gone'})
+
+    stats = download_all_posts(posts, posts_dir, workers=4, rate=0)
+
+    assert stats == {'downloaded': 6, 'not_modified': 0, 'skipped': 0, 'resumed': 0, 'error': 1}
+    for i in range(6):
+        saved = posts_dir / '2007' / '03' / f"post-{i}" / 'original.html'
+        assert saved.read_text(encoding='utf-8') == f"<html><body>Post {i}</body></html>"
+
+    requests_made = len(stub_server.requests)
+    stats = download_all_posts(posts, posts_dir, workers=4, rate=0)
+
+    assert stats == {'downloaded': 0, 'not_modified': 0, 'skipped': 6, 'resumed': 0, 'error': 1}
+    assert len(stub_server.requests) == requests_made + 1
+
+
+def test_workers_download_concurrently(stub_server, tmp_path):
+    stub_server.delay = 0.2
+    posts = make_posts(stub_server, 8)
+
+    start = time.monotonic()
+    stats = download_all_posts(posts, tmp_path / 'posts', workers=4, rate=0)
+    elapsed = time.monotonic() - start
+
+    assert stats['downloaded'] == 8
+    assert stub_server.max_active > 1
+    assert stub_server.max_active <= 4
+    assert elapsed < 8 * 0.2
+
+
+def test_requests_to_a_host_are_rate_limited(stub_server, tmp_path):
+    posts = make_posts(stub_server, 6)
+
+    download_all_posts(posts, tmp_path / 'posts', workers=6, rate=10, burst=1)
+
+    # One request straight away, then one every 0.1 seconds
+    times = sorted(when for _, when, _ in stub_server.requests)
+    assert times[-1] - times[0] >= 0.45
+
+
+def test_token_bucket_allows_a_burst():
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    burst = time.monotonic() - start
+    bucket.acquire()
+    waited = time.monotonic() - start
+
+    assert burst < 0.05
+    assert waited >= 0.08
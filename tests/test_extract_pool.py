@@ -0,0 +1,87 @@
+"""
+Tests of processing posts in a pool of worker processes with
+extract_post.process_posts_in_pool().
+"""
+
+import os
+import time
+
+from http_session import configure_session, get_session_options
+from extract_post import process_posts_in_pool
+
+
+def fake_process(html_file_path, overwrite, parser, profile):
+    """Stand in for processing a post, killing the worker for crash.html."""
+    if html_file_path.endswith('crash.html'):
+        os._exit(1)
+    if html_file_path.endswith('error.html'):
+        raise ValueError('bad post')
+    return True, f"Processed {html_file_path}\n", 2, [], {'parse': 0.0}, None
+
+
+def report_session_options(html_file_path, overwrite, parser, profile):
+    """Report the HTTP session options of the worker."""
+    return True, repr(get_session_options()), 0, [], {}, None
+
+
+def test_results_are_in_order():
+    paths = [f"post-{i}.html" for i in range(10)]
+
+    results = list(process_posts_in_pool(paths, 3, process=fake_process))
+
+    assert [path for path, _ in results] == paths
+    assert all(result[0] for _, result in results)
+
+
+def test_a_dying_worker_only_fails_its_post():
+    paths = [f"post-{i}.html" for i in range(5)] + ['crash.html'] + [f"post-{i}.html" for i in range(5, 12)]
+
+    results = dict(process_posts_in_pool(paths, 4, process=fake_process))
+
+    assert len(results) == len(paths)
+    assert results['crash.html'][0] is False
+    assert 'worker process died' in results['crash.html'][1]
+    assert [path for path, result in results.items() if not result[0]] == ['crash.html']
+
+
+def test_several_dying_workers():
+    paths = ['crash.html', 'post-1.html', 'post-2.html', 'other-crash.html', 'post-4.html', 'error.html']
+
+    results = list(process_posts_in_pool(paths, 2, process=fake_process))
+
+    assert [path for path, _ in results] == paths
+    assert [path for path, result in results if not result[0]] == ['crash.html', 'other-crash.html', 'error.html']
+    assert 'bad post' in results[-1][1][1]
+
+
+def test_workers_use_the_session_options():
+    configure_session(pool_size=3, retries=7)
+
+    [(_, result)] = process_posts_in_pool(['post.html'], 2, process=report_session_options)
+
+    assert result[1] == repr({'pool_size': 3, 'retries': 7})
+
+
+def test_worker_dying_during_submission(monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+
+    submit = ProcessPoolExecutor.submit
+    submitted = []
+
+    def slow_submit(self, *args, **kwargs):
+        # Hold back the second post of the first pool until its first post
+        # has killed the worker, so that submitting it fails
+        submitted.append(args[1])
+        if len(submitted) == 2:
+            deadline = time.monotonic() + 10
+            while not self._broken and time.monotonic() < deadline:
+                time.sleep(0.01)
+        return submit(self, *args, **kwargs)
+
+    monkeypatch.setattr(ProcessPoolExecutor, 'submit', slow_submit)
+    paths = ['crash.html'] + [f"post-{i}.html" for i in range(5)]
+
+    results = list(process_posts_in_pool(paths, 2, process=fake_process))
+
+    assert [path for path, _ in results] == paths
+    assert [path for path, result in results if not result[0]] == ['crash.html']
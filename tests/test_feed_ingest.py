@@ -0,0 +1,146 @@
+"""
+Tests of the feed ingestion in feed_ingest.py against a local stand-in
+for the Blogger JSON feeds: paging, the regenerated metadata, and that
+pages downloaded from the blog are never replaced.
+"""
+
+import json
+from urllib.parse import parse_qs
+
+from http_session import configure_session
+from feed_ingest import FEED_PAGE_MARKER, ingest_feed
+
+
+def make_entry(server, kind, slug, title, published=None, content='<p>Content</p>'):
+    """Make a JSON feed entry for a post or guide served by the stub server."""
+    if kind == 'post':
+        url = f"{server.url}/2007/03/{slug}.html"
+        entry_id = f"tag:blogger.com,1999:blog-123.post-{len(slug)}"
+    else:
+        url = f"{server.url}/p/{slug}.html"
+        entry_id = f"tag:blogger.com,1999:blog-123.page-{len(slug)}"
+
+    entry = {
+        'id': {'$t': entry_id},
+        'link': [{'rel': 'alternate', 'href': url}],
+        'title': {'$t': title},
+        'content': {'$t': content},
+        'author': [{'name': {'$t': 'Graham Dumpleton'}}],
+        'category': [{'term': 'python'}],
+    }
+    if published:
+        entry['published'] = {'$t': published}
+    return entry
+
+
+def add_feed(server, path, entries):
+    """Serve entries as a paged JSON feed, honouring max-results and start-index."""
+    def respond(query):
+        params = parse_qs(query)
+        start = int(params['start-index'][0]) - 1
+        size = int(params['max-results'][0])
+        feed = {
+            'title': {'$t': 'Graham Dumpleton'},
+            'openSearch$totalResults': {'$t': str(len(entries))},
+            'entry': entries[start:start + size],
+        }
+        return 200, json.dumps({'feed': feed}), {'Content-Type': 'application/json'}
+
+    server.add(path, respond)
+
+
+def add_blog(server, count=5, content='<p>Content</p>'):
+    """Serve a blog with count posts, newest first as Blogger lists them, and one guide."""
+    posts = [
+        make_entry(server, 'post', f"post-{i}", f"Post {i}", f"2007-03-{i + 10:02d}T22:00:00.000+11:00", content)
+        for i in reversed(range(count))
+    ]
+    add_feed(server, '/feeds/posts/default', posts)
+    add_feed(server, '/feeds/pages/default', [make_entry(server, 'guide', 'guide', 'Guide &amp; notes')])
+
+
+def feed_requests(server, path):
+    """Get the start-index of each request for a feed."""
+    return [parse_qs(request.partition('?')[2])['start-index'][0]
+            for request, _, _ in server.requests if request.partition('?')[0] == path]
+
+
+def test_feed_is_paged(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    add_blog(stub_server, 5)
+
+    stats = ingest_feed(stub_server.url, posts_dir, tmp_path / 'metadata.json', page_size=2)
+
+    assert stats == {'downloaded': 6, 'not_modified': 0, 'skipped': 0, 'error': 0}
+    assert feed_requests(stub_server, '/feeds/posts/default') == ['1', '3', '5']
+    assert feed_requests(stub_server, '/feeds/pages/default') == ['1']
+    for i in range(5):
+        page = posts_dir / '2007' / '03' / f"post-{i}" / 'original.html'
+        assert page.read_text(encoding='utf-8').startswith(FEED_PAGE_MARKER)
+    assert (tmp_path / 'src' / 'guides' / 'guide' / 'original.html').exists()
+
+
+def test_metadata_is_regenerated(stub_server, tmp_path):
+    metadata_file = tmp_path / 'metadata.json'
+    add_blog(stub_server, 2)
+
+    ingest_feed(stub_server.url, tmp_path / 'src' / 'posts', metadata_file)
+
+    assert json.loads(metadata_file.read_text(encoding='utf-8')) == [
+        {'originalUrl': f"{stub_server.url}/2007/03/post-0.html", 'title': 'Post 0', 'date': '2007-03-10T11:00:00Z'},
+        {'originalUrl': f"{stub_server.url}/2007/03/post-1.html", 'title': 'Post 1', 'date': '2007-03-11T11:00:00Z'},
+        {'originalUrl': f"{stub_server.url}/p/guide.html", 'title': 'Guide &amp; notes'},
+    ]
+
+    # Unchanged metadata is not rewritten
+    mtime = metadata_file.stat().st_mtime_ns
+    ingest_feed(stub_server.url, tmp_path / 'src' / 'posts', metadata_file)
+    assert metadata_file.stat().st_mtime_ns == mtime
+
+
+def test_downloaded_page_is_never_replaced(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    page = posts_dir / '2007' / '03' / 'post-0' / 'original.html'
+    page.parent.mkdir(parents=True)
+    page.write_text('<html>Downloaded with comments</html>', encoding='utf-8')
+    add_blog(stub_server, 1)
+
+    for refresh in (False, True):
+        stats = ingest_feed(stub_server.url, posts_dir, tmp_path / 'metadata.json', refresh=refresh)
+
+        assert stats['skipped'] == 1
+        assert page.read_text(encoding='utf-8') == '<html>Downloaded with comments</html>'
+
+
+def test_refresh_replaces_changed_feed_pages(stub_server, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+    page = posts_dir / '2007' / '03' / 'post-0' / 'original.html'
+    add_blog(stub_server, 1, '<p>First</p>')
+    ingest_feed(stub_server.url, posts_dir, tmp_path / 'metadata.json')
+
+    add_blog(stub_server, 1, '<p>Edited</p>')
+    stats = ingest_feed(stub_server.url, posts_dir, tmp_path / 'metadata.json')
+    assert stats['skipped'] == 2
+    assert '<p>First</p>' in page.read_text(encoding='utf-8')
+
+    stats = ingest_feed(stub_server.url, posts_dir, tmp_path / 'metadata.json', refresh=True)
+    assert stats == {'downloaded': 1, 'not_modified': 1, 'skipped': 0, 'error': 0}
+    assert '<p>Edited</p>' in page.read_text(encoding='utf-8')
+
+
+def test_empty_feed_keeps_metadata(stub_server, tmp_path):
+    metadata_file = tmp_path / 'metadata.json'
+    add_feed(stub_server, '/feeds/posts/default', [])
+    add_feed(stub_server, '/feeds/pages/default', [])
+
+    assert ingest_feed(stub_server.url, tmp_path / 'src' / 'posts', metadata_file) is None
+    assert not metadata_file.exists()
+
+
+def test_feed_error_keeps_metadata(stub_server, tmp_path):
+    metadata_file = tmp_path / 'metadata.json'
+    stub_server.add('/feeds/posts/default', (500, 'error'))
+    configure_session(retries=0)
+
+    assert ingest_feed(stub_server.url, tmp_path / 'src' / 'posts', metadata_file) is None
+    assert not metadata_file.exists()
@@ -0,0 +1,60 @@
+"""
+Tests of downloading post images into the download cache with
+extract_post.download_image(), against a local stand-in server.
+"""
+
+import pytest
+
+import image_store
+from extract_post import download_image
+
+
+IMAGE = b'\x89PNG complete image'
+
+
+def stored_files(store_dir):
+    """Get the images in the cache, including partial ones left in its temporary directory."""
+    return sorted(path.name for directory in ('objects', 'tmp') for path in (store_dir / directory).rglob('*')
+                  if path.is_file())
+
+
+def test_truncated_image_is_fetched_again(stub_server, tmp_path, image_store_dir):
+    # The server closes the connection part way through the first response
+    stub_server.add('/photo.png',
+                    (200, IMAGE[:5], {'Content-Length': str(len(IMAGE)), 'Connection': 'close'}),
+                    IMAGE)
+    output_dir = tmp_path / 'post'
+    output_dir.mkdir()
+
+    assert download_image(stub_server.url + '/photo.png', output_dir) is None
+    assert list(output_dir.iterdir()) == []
+    assert stored_files(image_store_dir) == []
+
+    filename = download_image(stub_server.url + '/photo.png', output_dir)
+
+    assert (output_dir / filename).read_bytes() == IMAGE
+    assert len(stored_files(image_store_dir)) == 1
+
+
+def test_incomplete_post_image_is_replaced(stub_server, tmp_path, image_store_dir, capsys):
+    stub_server.add('/photo.png', IMAGE)
+    output_dir = tmp_path / 'post'
+    output_dir.mkdir()
+
+    filename = download_image(stub_server.url + '/photo.png', output_dir)
+    (output_dir / filename).write_bytes(IMAGE[:5])
+    capsys.readouterr()
+
+    assert download_image(stub_server.url + '/photo.png', output_dir) == filename
+
+    assert 'Image is incomplete, downloading again' in capsys.readouterr().out
+    assert (output_dir / filename).read_bytes() == IMAGE
+
+
+def test_short_stream_leaves_no_partial_file(tmp_path):
+    store_dir = tmp_path / 'store'
+
+    with pytest.raises(IOError, match='received 5 of'):
+        image_store.add_image_stream([IMAGE[:5]], '.png', len(IMAGE), store_dir)
+
+    assert stored_files(store_dir) == []
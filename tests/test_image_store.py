@@ -0,0 +1,78 @@
+"""
+Tests of the image download cache in image_store.py.
+"""
+
+import os
+
+import image_store
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = tmp_path / 'store'
+
+    first = image_store.add_image(b'image', '.png', store)
+    second = image_store.add_image(b'image', '.png', store)
+
+    assert first == second
+    assert len(list((store / 'objects').glob('*/*'))) == 1
+    assert not list((store / 'tmp').iterdir())
+
+
+def test_post_copies_are_independent(tmp_path):
+    store = tmp_path / 'store'
+    record = image_store.add_image(b'image', '.png', store)
+    first = tmp_path / 'first' / 'image.png'
+    second = tmp_path / 'second' / 'image.png'
+
+    image_store.copy_file(image_store.get_record_path(record, store), first)
+    image_store.copy_file(image_store.get_record_path(record, store), second)
+    first.write_bytes(b'edited')
+
+    assert second.read_bytes() == b'image'
+    assert image_store.get_record_path(record, store).read_bytes() == b'image'
+    assert image_store.is_image_complete(second, record)
+    assert not image_store.is_image_complete(first, record)
+
+
+def test_url_records(tmp_path):
+    store = tmp_path / 'store'
+    record = image_store.add_image(b'image', '.png', store)
+
+    image_store.record_url('http://example.com/a.png', record, store)
+
+    assert image_store.lookup_url('http://example.com/a.png', store)['sha256'] == record['sha256']
+    assert image_store.lookup_url('http://example.com/b.png', store) is None
+
+
+def test_import_replaces_hard_links_with_copies(tmp_path):
+    store = tmp_path / 'store'
+    first = tmp_path / 'posts' / 'a' / 'image.png'
+    second = tmp_path / 'posts' / 'b' / 'image.png'
+    first.parent.mkdir(parents=True)
+    second.parent.mkdir(parents=True)
+    first.write_bytes(b'image')
+    os.link(first, second)
+
+    assert image_store.import_image_files([tmp_path / 'posts'], store) == 1
+
+    assert first.stat().st_nlink == 1
+    assert second.stat().st_nlink == 1
+    assert first.read_bytes() == second.read_bytes() == b'image'
+
+
+def test_cache_usage(tmp_path):
+    store = tmp_path / 'store'
+    posts = tmp_path / 'posts'
+    for post, content in [('a', b'shared'), ('b', b'shared'), ('c', b'unique image')]:
+        (posts / post).mkdir(parents=True)
+        (posts / post / 'image.png').write_bytes(content)
+    image_store.import_image_files([posts], store)
+
+    usage = image_store.get_cache_usage([posts], store)
+
+    assert usage == {
+        'images': 2,
+        'cached_bytes': len(b'shared') + len(b'unique image'),
+        'post_images': 3,
+        'post_bytes': 2 * len(b'shared') + len(b'unique image'),
+    }
@@ -0,0 +1,72 @@
+"""
+Tests of skipping posts which are unchanged since they were last extracted,
+as recorded in the extraction manifest.
+"""
+
+import sys
+
+import pytest
+
+import extract_post
+import metadata_index
+from feed_ingest import render_page
+
+
+@pytest.fixture
+def post_with_image(stub_server, tmp_path, monkeypatch, image_store_dir):
+    """A post with one image served by the stub server, and its own manifest."""
+    post = {
+        'url': 'http://blog.dscpl.com.au/2007/03/post.html',
+        'title': 'Post',
+        'content': f"<p>Text</p><img src='{stub_server.url}/images/photo.png'/>",
+        'published': '2007-03-06T22:00:00.000+11:00',
+        'author': 'Graham Dumpleton',
+        'author_url': None,
+        'labels': [],
+        'blog_id': '1',
+        'post_id': '2',
+    }
+    html_file = tmp_path / 'src' / 'posts' / '2007' / '03' / 'post' / 'original.html'
+    html_file.parent.mkdir(parents=True)
+    html_file.write_text(render_page(post, 'post', 'Blog', 'http://blog.dscpl.com.au'), encoding='utf-8')
+
+    monkeypatch.setattr(extract_post, 'MANIFEST_FILE', tmp_path / 'extract-manifest.json')
+    monkeypatch.setattr(metadata_index, 'open_metadata_index', lambda: None)
+    return html_file
+
+
+def run_extractor(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, 'argv', ['extract_post.py', *map(str, args)])
+    extract_post.main()
+    return capsys.readouterr().out
+
+
+def test_unchanged_post_is_skipped(stub_server, post_with_image, monkeypatch, capsys):
+    stub_server.add('/images/photo.png', (200, b'image', {'Content-Type': 'image/png'}))
+
+    run_extractor(monkeypatch, capsys, post_with_image)
+    output = run_extractor(monkeypatch, capsys, post_with_image)
+
+    assert 'Unchanged since last extraction' in output
+    assert len(stub_server.request_times('/images/photo.png')) == 1
+
+
+def test_failed_image_is_tried_again(stub_server, post_with_image, monkeypatch, capsys):
+    # Client errors are not retried within a run
+    stub_server.add('/images/photo.png', (404, 'missing'), (200, b'image', {'Content-Type': 'image/png'}))
+
+    output = run_extractor(monkeypatch, capsys, post_with_image)
+
+    assert 'Failed images, will be tried again next run: 1' in output
+    assert not list(post_with_image.parent.glob('*.png'))
+    assert f"{stub_server.url}/images/photo.png" in (post_with_image.parent / 'index.md').read_text(encoding='utf-8')
+
+    output = run_extractor(monkeypatch, capsys, post_with_image)
+
+    assert 'Unchanged since last extraction' not in output
+    assert [image.read_bytes() for image in post_with_image.parent.glob('*.png')] == [b'image']
+    assert len(stub_server.request_times('/images/photo.png')) == 2
+
+    output = run_extractor(monkeypatch, capsys, post_with_image)
+
+    assert 'Unchanged since last extraction' in output
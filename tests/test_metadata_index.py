@@ -0,0 +1,108 @@
+"""
+Tests of the SQLite index of the posts metadata in metadata_index.py, and
+of working out where posts are saved with post_paths.py.
+"""
+
+import json
+import os
+
+import pytest
+
+from metadata_index import open_metadata_index
+from post_download import prepare_post_download
+from post_paths import get_post_location
+
+
+POSTS = [
+    {'originalUrl': 'http://blog.dscpl.com.au/2007/03/resistance-is-futile.html',
+     'title': 'Resistance is futile.', 'date': '2007-03-06T11:00:00Z'},
+    {'originalUrl': 'http://blog.dscpl.com.au/2007/03/reloading-of-python-code-into-web.html',
+     'title': 'Reloading of Python code into web applications.', 'date': '2007-03-30T02:02:00Z'},
+    {'originalUrl': 'http://blog.dscpl.com.au/2007/04/tracing.html',
+     'title': 'Tracing', 'date': '2007-04-02T10:00:00Z'},
+    {'originalUrl': 'http://blog.dscpl.com.au/p/tracing.html', 'title': 'Tracing guide'},
+]
+
+
+def write_metadata(metadata_file, posts):
+    metadata_file.write_text(json.dumps(posts, indent=2), encoding='utf-8')
+
+
+@pytest.fixture
+def metadata_file(tmp_path):
+    metadata_file = tmp_path / 'posts-metadata.json'
+    write_metadata(metadata_file, POSTS)
+    return metadata_file
+
+
+def test_lookups(metadata_file, tmp_path):
+    index = open_metadata_index(metadata_file, tmp_path / 'index.db')
+    posts_dir = tmp_path / 'src' / 'posts'
+
+    assert index.all_posts() == POSTS
+    assert index.get_by_url(POSTS[1]['originalUrl']) == POSTS[1]
+    assert index.get_by_url('http://blog.dscpl.com.au/2007/03/missing.html') is None
+    assert index.get_by_slug('tracing') == [POSTS[2], POSTS[3]]
+    assert index.get_by_month(2007, 3) == POSTS[:2]
+    assert index.get_by_date('2007-04') == [POSTS[2]]
+    assert index.get_by_directory('guides/tracing') == POSTS[3]
+    assert index.get_by_html_path(posts_dir / '2007' / '04' / 'tracing' / 'original.html', posts_dir) == POSTS[2]
+    assert index.get_html_paths(posts_dir)[3] == (POSTS[3], tmp_path / 'src' / 'guides' / 'tracing' / 'original.html')
+    index.close()
+
+
+def test_incremental_update(metadata_file, tmp_path):
+    index_file = tmp_path / 'index.db'
+    index = open_metadata_index(metadata_file, index_file)
+
+    # Only the rows of entries which were changed, added or removed are written
+    edited = [dict(POSTS[0], title='Edited'), *POSTS[1:]]
+    write_metadata(metadata_file, edited)
+    assert index.update() == 1
+    assert index.get_by_url(POSTS[0]['originalUrl'])['title'] == 'Edited'
+
+    added = edited + [{'originalUrl': 'http://blog.dscpl.com.au/2007/05/new.html', 'title': 'New'}]
+    write_metadata(metadata_file, added)
+    assert index.update() == 1
+    assert index.get_by_month(2007, 5) == added[-1:]
+
+    write_metadata(metadata_file, added[:2])
+    assert index.update() == 3
+    assert index.get_by_slug('tracing') == []
+
+    # A file which is touched but not changed only has its checksum read
+    os.utime(metadata_file, ns=(1, 1))
+    assert index.update() == 0
+    index.close()
+
+    index = open_metadata_index(metadata_file, index_file)
+    assert index.all_posts() == added[:2]
+    index.close()
+
+
+@pytest.mark.parametrize('url', [
+    'http://blog.dscpl.com.au/2007/03/',
+    'http://blog.dscpl.com.au/2007/03/foo/',
+    'http://blog.dscpl.com.au/p/foo/',
+    'http://blog.dscpl.com.au/about.html',
+    'http://blog.dscpl.com.au/2007/foo.html',
+])
+def test_skipped_urls_have_no_location(url, tmp_path):
+    status, _, target = prepare_post_download({'originalUrl': url}, tmp_path / 'src' / 'posts')
+
+    assert (status, target) == ('skipped', None)
+    assert get_post_location(url) == (None, None, None, None, None)
+
+
+@pytest.mark.parametrize('url, directory', [
+    ('http://blog.dscpl.com.au/2007/03/resistance-is-futile.html', 'posts/2007/03/resistance-is-futile'),
+    ('http://blog.dscpl.com.au/p/tracing.html', 'guides/tracing'),
+])
+def test_index_and_downloader_agree(url, directory, tmp_path):
+    posts_dir = tmp_path / 'src' / 'posts'
+
+    status, _, target = prepare_post_download({'originalUrl': url}, posts_dir)
+
+    assert status is None
+    assert get_post_location(url)[4] == directory
+    assert target['subdir'] == posts_dir.parent / directory
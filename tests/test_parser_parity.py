@@ -0,0 +1,78 @@
+"""
+Parity tests of the parser backends of extract_post.py.
+
+A sample of the checked-in posts is extracted with every installed
+BeautifulSoup tree builder, with both targeted and full parsing, and the
+data.json produced must be identical to the checked-in file. The index.md
+files were edited by hand after conversion, so the Markdown produced by
+each backend is compared with that of html.parser instead.
+"""
+
+import json
+import shutil
+
+import pytest
+
+from conftest import PROJECT_ROOT
+from extract_post import PARSER_BACKENDS, extract_post_data, render_markdown, select_parser
+
+
+def sample_posts():
+    """
+    Get a sample of the checked-in posts: every eighth post, the guides,
+    and the largest pages, which have the most comments.
+    """
+    posts = sorted((PROJECT_ROOT / 'src' / 'posts').glob('*/*/*/original.html'))
+    guides = sorted((PROJECT_ROOT / 'src' / 'guides').glob('*/original.html'))
+    largest = sorted(posts, key=lambda path: path.stat().st_size)[-3:]
+    sample = dict.fromkeys(posts[::8] + guides + largest)
+    return [path.parent.relative_to(PROJECT_ROOT).as_posix() for path in sample]
+
+
+BACKENDS = [
+    pytest.param(backend, marks=pytest.mark.skipif(select_parser(backend) is None, reason=f"{backend} not installed"))
+    for backend in PARSER_BACKENDS
+]
+
+
+@pytest.fixture(scope='module')
+def extracted(tmp_path_factory):
+    """
+    Extract a post with a backend, from a copy of its directory so that the
+    checked-in images are found and nothing is downloaded or written to the
+    source tree. Results are cached for the tests of each post.
+    """
+    results = {}
+
+    def extract(directory, backend, targeted):
+        key = (directory, backend, targeted)
+        if key not in results:
+            copy = tmp_path_factory.mktemp('post') / 'post'
+            shutil.copytree(PROJECT_ROOT / directory, copy)
+            results[key] = extract_post_data(copy / 'original.html', parser=backend, targeted=targeted)
+        return results[key]
+
+    return extract
+
+
+@pytest.mark.parametrize('targeted', [True, False], ids=['targeted', 'full'])
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('directory', sample_posts())
+def test_backend_matches_checked_in_data(directory, backend, targeted, extracted):
+    post_data = extracted(directory, backend, targeted)
+
+    expected = (PROJECT_ROOT / directory / 'data.json').read_text(encoding='utf-8')
+    assert json.dumps(post_data, indent=2, ensure_ascii=False) == expected
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('directory', sample_posts())
+def test_backend_matches_html_parser_markdown(directory, backend, extracted):
+    markdown = render_markdown(extracted(directory, backend, True))
+
+    assert markdown == render_markdown(extracted(directory, 'html.parser', True))
+
+
+def test_default_backend_is_fastest_installed():
+    assert select_parser('auto') == next(backend for backend in PARSER_BACKENDS if select_parser(backend))
+    assert select_parser('html.parser') == 'html.parser'
@@ -0,0 +1,101 @@
+"""
+Tests of the polling file watcher in post_watcher.py and the watch mode of
+extract_post.py: change detection and debouncing of repeated writes.
+"""
+
+import shutil
+import threading
+import time
+
+import extract_post
+from conftest import PROJECT_ROOT
+from post_watcher import PollingWatcher
+
+
+def poll_for(watcher, seconds):
+    """Poll a watcher for a time, returning every non-empty report."""
+    reports = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        changed = watcher.poll()
+        if changed:
+            reports.append(changed)
+        time.sleep(0.01)
+    return reports
+
+
+def test_unchanged_files_are_not_reported(tmp_path):
+    (tmp_path / 'original.html').write_text('first', encoding='utf-8')
+    watcher = PollingWatcher([(tmp_path, '*.html')], interval=0.01, debounce=0.1)
+
+    assert len(watcher) == 1
+    assert poll_for(watcher, 0.3) == []
+
+
+def test_writes_within_the_debounce_time_are_reported_once(tmp_path):
+    html_file = tmp_path / 'original.html'
+    html_file.write_text('first', encoding='utf-8')
+    watcher = PollingWatcher([(tmp_path, '*.html')], interval=0.01, debounce=0.2)
+
+    html_file.write_text('', encoding='utf-8')
+    assert watcher.poll() == []
+    time.sleep(0.05)
+    html_file.write_text('second version', encoding='utf-8')
+
+    assert poll_for(watcher, 0.6) == [[html_file]]
+
+
+def test_new_and_removed_files(tmp_path):
+    watcher = PollingWatcher([(tmp_path, '*.html')], interval=0.01, debounce=0.1)
+
+    created = tmp_path / 'created.html'
+    created.write_text('new', encoding='utf-8')
+    removed = tmp_path / 'removed.html'
+    removed.write_text('gone soon', encoding='utf-8')
+    assert watcher.poll() == []
+    removed.unlink()
+
+    assert poll_for(watcher, 0.4) == [[created]]
+
+
+def test_watch_mode_extracts_once_per_save(tmp_path, monkeypatch):
+    post = tmp_path / 'post'
+    shutil.copytree(PROJECT_ROOT / 'src/posts/2007/03/reloading-of-python-code-into-web', post)
+    html_file = post / 'original.html'
+    content = html_file.read_text(encoding='utf-8')
+    monkeypatch.setattr(extract_post, 'MANIFEST_FILE', tmp_path / 'extract-manifest.json')
+
+    processed = []
+    process_single_post = extract_post.process_single_post
+
+    def counting_process(html_file_path, *args):
+        processed.append(html_file_path)
+        return process_single_post(html_file_path, *args)
+
+    monkeypatch.setattr(extract_post, 'process_single_post', counting_process)
+
+    # Poll for a second and then stop watching, as Ctrl+C would
+    def watch_for_a_second(self):
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            changed = self.poll()
+            if changed:
+                yield changed
+            time.sleep(self.interval)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(PollingWatcher, 'watch', watch_for_a_second)
+
+    # Save the file as an editor might, truncating it and then writing it
+    def save():
+        time.sleep(0.2)
+        html_file.write_text('', encoding='utf-8')
+        time.sleep(0.05)
+        html_file.write_text(content + '\n<!-- edited -->\n', encoding='utf-8')
+
+    saver = threading.Thread(target=save)
+    saver.start()
+    extract_post.watch_posts([(post, 'original.html')], interval=0.02)
+    saver.join()
+
+    assert processed == [html_file]
@@ -0,0 +1,38 @@
+"""
+Tests of the Markdown post-processing stages of extract_post.py.
+"""
+
+import pytest
+
+from extract_post import convert_blog_urls, iter_blog_url_paragraphs, iter_lines, postprocess_markdown
+
+
+def convert_by_paragraph(content):
+    return ''.join(iter_blog_url_paragraphs(iter_lines(content)))
+
+
+@pytest.mark.parametrize('content', [
+    'See [this post](http://blog.dscpl.com.au/2014/12/hosting-python-wsgi.html).',
+    'First paragraph.\n\nSee http://blog.dscpl.com.au/p/decorators-and-monkey-patching.html\n\nLast.\n',
+    'See [the first\n\nand second parts](http://blog.dscpl.com.au/2015/12/running-ipython.html) of it.',
+    'A [stray bracket.\n\nThen [a link\n\nover paragraphs](http://blog.dscpl.com.au/2007/03/resistance-is-futile.html)\n\nEnd.',
+    '[closed]\n\n[open\n\n\n\ntext](https://blog.dscpl.com.au/p/using-python-with-docker.html)\n\n'
+    'and http://blog.dscpl.com.au/2019/01/administration-features.html\n',
+    'Never closed [ at all\n\nhttp://blog.dscpl.com.au/2007/03/resistance-is-futile.html\n\n',
+    '\n\n\n',
+    '',
+])
+def test_paragraphs_match_whole_document(content):
+    assert convert_by_paragraph(content) == convert_blog_urls(content)
+
+
+def test_link_text_spanning_paragraphs_is_converted():
+    content = 'See [the first\n\nand second parts](http://blog.dscpl.com.au/2015/12/running-ipython.html).'
+
+    assert postprocess_markdown(content) == 'See [the first\n\nand second parts](/posts/2015/12/running-ipython/).'
+
+
+def test_quoted_code_is_converted_to_code_block():
+    content = 'Run:\n\n> \n>     pip install mod_wsgi\n\nDone.'
+
+    assert '```' in postprocess_markdown(content)
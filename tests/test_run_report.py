@@ -0,0 +1,47 @@
+"""
+Tests of the stage timings and run report of extract_post.py.
+"""
+
+import shutil
+
+from conftest import PROJECT_ROOT
+from extract_post import StageTimer, extract_post_data, make_run_report, write_run_report
+
+
+class CountingTimer(StageTimer):
+    """Stage timer which counts the laps of each stage."""
+
+    def __init__(self):
+        super().__init__()
+        self.laps = {}
+
+    def lap(self, stage):
+        self.laps[stage] = self.laps.get(stage, 0) + 1
+        super().lap(stage)
+
+
+def test_each_stage_is_lapped_once(tmp_path):
+    post = tmp_path / 'post'
+    shutil.copytree(PROJECT_ROOT / 'src/posts/2007/03/reloading-of-python-code-into-web', post)
+    timer = CountingTimer()
+
+    extract_post_data(post / 'original.html', timer=timer)
+
+    assert timer.laps == {'parse': 1, 'metadata': 1, 'images': 1, 'body': 1, 'comments': 1}
+
+
+def test_report_directory_is_created(tmp_path):
+    report_file = tmp_path / 'missing' / 'dir' / 'report.json'
+    report = make_run_report({'successful': 0}, [], 1.0)
+
+    assert write_run_report(report_file, report)
+    assert report_file.exists()
+    assert not list(report_file.parent.glob('*.tmp'))
+
+
+def test_report_write_failure_is_a_warning(tmp_path, capsys):
+    blocker = tmp_path / 'file'
+    blocker.write_text('not a directory')
+
+    assert not write_run_report(blocker / 'report.json', make_run_report({}, [], 1.0))
+    assert 'Warning: Cannot save run report' in capsys.readouterr().out
@@ -0,0 +1,52 @@
+"""
+Startup time budget of extract_post.py, which editor hooks start on every
+save. A copy of the scripts is used so that the manifest recording the
+unchanged post is not the one in the working tree.
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BLOGGER_DIR, PROJECT_ROOT
+from benchmark import DEFERRED_MODULES, STARTUP_BUDGET_MS, measure_startup
+
+
+POST = 'src/posts/2007/03/reloading-of-python-code-into-web'
+
+
+@pytest.fixture(scope='module')
+def project(tmp_path_factory):
+    """Copy the scripts and a post which the manifest records as extracted."""
+    root = tmp_path_factory.mktemp('project')
+    shutil.copytree(BLOGGER_DIR, root / 'blogger', ignore=shutil.ignore_patterns(
+        '__pycache__', 'extract-*', 'image-store', 'download-journal.jsonl', 'posts-metadata.db'))
+    shutil.copytree(PROJECT_ROOT / POST, root / POST)
+
+    subprocess.run([sys.executable, '-c',
+                    'import extract_post; '
+                    'manifest = extract_post.load_manifest(extract_post.MANIFEST_FILE); '
+                    f"extract_post.update_manifest_entry(manifest, extract_post.Path('../{POST}/original.html')); "
+                    'extract_post.save_manifest(manifest, extract_post.MANIFEST_FILE)'],
+                   cwd=root / 'blogger', check=True)
+    return root
+
+
+@pytest.mark.parametrize('command', [
+    pytest.param(['extract_post.py', '--help'], id='help'),
+    pytest.param(['extract_post.py', f"../{POST}/original.html"], id='unchanged-post'),
+])
+def test_startup_is_within_budget(project, command):
+    # The first run builds the metadata index
+    result = subprocess.run([sys.executable] + command, cwd=project / 'blogger', capture_output=True, text=True)
+    assert result.returncode == 0
+    if len(command) > 1 and command[1] != '--help':
+        assert 'Unchanged since last extraction' in result.stdout
+
+    times, (modules, _) = measure_startup(command, project / 'blogger', 5)
+
+    assert [module for module in DEFERRED_MODULES if module in modules] == []
+    assert statistics.median(times) < STARTUP_BUDGET_MS
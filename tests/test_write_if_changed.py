@@ -0,0 +1,67 @@
+"""
+Tests of only replacing output files whose content changes, which the
+watcher and incremental site builds depend on to skip unchanged posts.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from conftest import PROJECT_ROOT
+from extract_post import process_single_post, write_if_changed
+
+
+def test_unchanged_file_is_kept(tmp_path):
+    output = tmp_path / 'data.json'
+    assert write_if_changed(output, '{"title": "Post"}\n')
+    os.utime(output, ns=(1_000_000_000, 1_000_000_000))
+    before = output.stat()
+
+    assert not write_if_changed(output, '{"title": "Post"}\n')
+
+    after = output.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_changed_file_is_replaced_atomically(tmp_path):
+    output = tmp_path / 'index.md'
+    write_if_changed(output, 'first')
+    before = output.stat()
+
+    with open(output, encoding='utf-8') as reader:
+        assert write_if_changed(output, 'second')
+
+        # A reader of the old file still sees all of it, as the new file
+        # was written separately and renamed over it
+        assert reader.read() == 'first'
+
+    assert output.read_text(encoding='utf-8') == 'second'
+    assert output.stat().st_ino != before.st_ino
+    assert [path.name for path in tmp_path.iterdir()] == ['index.md']
+
+
+def test_failed_write_keeps_original(tmp_path):
+    output = tmp_path / 'index.md'
+    write_if_changed(output, 'first')
+
+    with pytest.raises(UnicodeEncodeError):
+        write_if_changed(output, 'unencodable \ud800')
+
+    assert output.read_text(encoding='utf-8') == 'first'
+    assert [path.name for path in tmp_path.iterdir()] == ['index.md']
+
+
+def test_reprocessed_post_keeps_outputs(tmp_path):
+    post = tmp_path / 'post'
+    shutil.copytree(PROJECT_ROOT / 'src/posts/2007/03/reloading-of-python-code-into-web', post)
+    outputs = [post / 'data.json', post / 'index.md']
+
+    # Extract the post once so its outputs are up to date, whatever was checked in
+    process_single_post(post / 'original.html')
+    before = [(path.stat().st_ino, path.stat().st_mtime_ns) for path in outputs]
+
+    success, files_changed, _ = process_single_post(post / 'original.html')
+
+    assert (success, files_changed) == (True, 0)
+    assert [(path.stat().st_ino, path.stat().st_mtime_ns) for path in outputs] == before